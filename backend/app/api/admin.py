@@ -0,0 +1,304 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from app.core import config, metrics
+from app.core.database import scatter
+from app.core.profiler import ProfiledRoute, profiler
+from app.models.booking import BookingStatus
+from app.models.booking_event import ActorRole
+from app.models.search import SearchKind
+from app.schemas.booking import (
+    BookingSummaryResponse,
+    BulkActionResponse,
+    ConsistencyViolationResponse,
+    QueueEntryResponse,
+    QueueStatsResponse,
+    SearchResponse,
+)
+from app.services import (
+    archive_service,
+    auditor_service,
+    bulk_service,
+    outbox_service,
+    queue_service,
+    search_service,
+    summary_service,
+    sweeper_service,
+)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def require_admin(actor_role: ActorRole) -> ActorRole:
+    """
+    Admin-only guard. Role is passed as a query param (no auth middleware yet).
+    """
+    if actor_role != ActorRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
+    return actor_role
+
+
+@router.get("/admin/metrics")
+def get_metrics(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Snapshot of in-process counters and gauges.
+    Role: ADMIN ONLY.
+    """
+    return metrics.snapshot()
+
+
+@router.post("/admin/sweeper/run")
+def run_sweeper(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Runs one pass of the assignment timeout sweeper on every shard, immediately.
+    Role: ADMIN ONLY.
+    """
+    return sweeper_service.run_sweep()
+
+
+@router.get("/admin/violations", response_model=List[ConsistencyViolationResponse])
+def get_violations(
+    include_resolved: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+    actor_role: ActorRole = Depends(require_admin),
+):
+    """
+    Invariant violations recorded by the consistency auditor, newest first.
+    Role: ADMIN ONLY.
+    """
+    return auditor_service.list_violations_all_shards(
+        include_resolved=include_resolved, limit=limit, offset=offset
+    )
+
+
+@router.post("/admin/auditor/run")
+def run_auditor(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Audits everything touched since each shard's last checkpoint, immediately.
+    Role: ADMIN ONLY.
+    """
+    return auditor_service.run_audit()
+
+
+@router.post("/admin/archiver/run")
+def run_archiver(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Archives terminal bookings past the retention window on every shard, immediately.
+    Role: ADMIN ONLY.
+    """
+    return archive_service.run_archiver()
+
+
+@router.get("/admin/outbox")
+def get_outbox_stats(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Pending/dead webhook notifications and delivery lag, per shard.
+    Role: ADMIN ONLY.
+    """
+    return scatter(outbox_service.outbox_stats)
+
+
+@router.post("/admin/outbox/dispatch")
+def dispatch_outbox(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Delivers due webhook notifications on every shard, immediately.
+    Role: ADMIN ONLY.
+    """
+    return outbox_service.run_dispatcher()
+
+
+@router.post("/admin/outbox/requeue-dead")
+def requeue_dead_outbox(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Re-queues dead-lettered webhook notifications on every shard.
+    Role: ADMIN ONLY.
+    """
+    return {"requeued": sum(scatter(outbox_service.requeue_dead))}
+
+
+@router.get("/admin/queue", response_model=QueueStatsResponse)
+def get_queue(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Dispatch queue depth, priority mix, overdue count and age percentiles.
+    Served from the in-memory queue; the bookings table is not scanned.
+    Role: ADMIN ONLY.
+    """
+    return queue_service.get_queue_stats()
+
+
+@router.get("/admin/queue/next", response_model=List[QueueEntryResponse])
+def get_queue_next(actor_role: ActorRole, limit: int = 10):
+    """
+    Next-most-urgent PENDING bookings, for whatever assigns providers.
+    Role: SYSTEM or ADMIN.
+    """
+    if actor_role not in [ActorRole.SYSTEM, ActorRole.ADMIN]:
+        raise HTTPException(
+            status_code=403, detail="Only SYSTEM or ADMIN can read the dispatch queue."
+        )
+    return queue_service.get_next_bookings(limit)
+
+
+@router.get("/admin/bookings/summary", response_model=List[BookingSummaryResponse])
+def get_booking_summaries(
+    status: Optional[BookingStatus] = None,
+    provider_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    before_at: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    actor_role: ActorRole = Depends(require_admin),
+):
+    """
+    Dashboard rows (customer/provider names, status, last transition, retries),
+    most recent transition first. Next page: before_at/before_id of the last row.
+    Role: ADMIN ONLY.
+    """
+    return summary_service.list_summaries(
+        status=status,
+        provider_id=provider_id,
+        customer_id=customer_id,
+        before_at=before_at,
+        before_id=before_id,
+        limit=limit,
+    )
+
+
+@router.get("/admin/search", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[SearchKind] = None,
+    fuzzy: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    actor_role: ActorRole = Depends(require_admin),
+):
+    """
+    Customers and providers by name, best match first, with their active bookings.
+    Every word is a prefix ("jo sm"); fuzzy=true also tolerates typos and substrings.
+    Role: ADMIN ONLY.
+    """
+    return search_service.search(q, kind=kind, fuzzy=fuzzy, limit=limit, offset=offset)
+
+
+class ProfilerCaptureRequest(BaseModel):
+    # Fraction of all requests to sample, on top of routes and the header
+    sample_rate: float = 0.0
+    # Path prefixes sampled on every request, e.g. ["/bookings"]
+    routes: List[str] = []
+    interval_ms: float = config.PROFILER_INTERVAL_MS
+    duration_seconds: float = 60
+
+
+@router.post("/admin/profiler/start")
+def start_profiler(
+    request: ProfilerCaptureRequest, actor_role: ActorRole = Depends(require_admin)
+):
+    """
+    Starts a sampling capture; it stops by itself after duration_seconds.
+    Requests sent with the PROFILER_HEADER header are always sampled.
+    Role: ADMIN ONLY.
+    """
+    return profiler.start(
+        request.sample_rate,
+        request.routes,
+        request.interval_ms,
+        request.duration_seconds,
+    )
+
+
+@router.post("/admin/profiler/stop")
+def stop_profiler(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Stops the running capture. Its samples stay downloadable until the next start.
+    Role: ADMIN ONLY.
+    """
+    return profiler.stop()
+
+
+@router.get("/admin/profiler")
+def get_profiler(actor_role: ActorRole = Depends(require_admin)):
+    """
+    Capture state and sampled requests/stack samples per route.
+    Role: ADMIN ONLY.
+    """
+    return profiler.status()
+
+
+@router.get("/admin/profiler/stacks", response_class=PlainTextResponse)
+def download_profile(
+    route: Optional[str] = None, actor_role: ActorRole = Depends(require_admin)
+):
+    """
+    Collapsed stacks of one route, named by endpoint (e.g. "bookings.get_booking"),
+    or of all routes; ready for flamegraph.pl or speedscope.
+    Role: ADMIN ONLY.
+    """
+    filename = "profile.folded" if route is None else "route.folded"
+    return PlainTextResponse(
+        profiler.collapsed(route),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Bulk Recovery Endpoints (Inline request model as per api convention)
+class BulkActionRequest(BaseModel):
+    actor_role: ActorRole
+    actor_id: int
+    booking_ids: Optional[List[int]] = None
+    status: Optional[List[BookingStatus]] = None
+    provider_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    def filters(self) -> dict:
+        return {
+            "booking_ids": self.booking_ids,
+            "statuses": self.status,
+            "provider_id": self.provider_id,
+            "created_from": self.created_from,
+            "created_to": self.created_to,
+        }
+
+
+@router.post("/admin/bookings/bulk/force-cancel", response_model=BulkActionResponse)
+def bulk_force_cancel(request: BulkActionRequest):
+    """
+    Force-cancel every booking matching the filter or ID list.
+    Role: ADMIN ONLY.
+    """
+    require_admin(request.actor_role)
+    return bulk_service.run_on_all_shards(
+        bulk_service.bulk_force_cancel, actor_id=request.actor_id, **request.filters()
+    )
+
+
+@router.post("/admin/bookings/bulk/mark-failed", response_model=BulkActionResponse)
+def bulk_mark_failed(request: BulkActionRequest):
+    """
+    Mark every booking matching the filter or ID list as FAILED.
+    Role: ADMIN ONLY.
+    """
+    require_admin(request.actor_role)
+    return bulk_service.run_on_all_shards(
+        bulk_service.bulk_mark_failed, actor_id=request.actor_id, **request.filters()
+    )
+
+
+@router.post("/admin/bookings/bulk/retry", response_model=BulkActionResponse)
+def bulk_retry(request: BulkActionRequest):
+    """
+    Retry every REJECTED/FAILED booking matching the filter or ID list.
+    Role: ADMIN or SYSTEM.
+    """
+    return bulk_service.run_on_all_shards(
+        bulk_service.bulk_retry,
+        actor_role=request.actor_role,
+        actor_id=request.actor_id,
+        **request.filters(),
+    )
@@ -2,48 +2,83 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.core.database import SessionLocal
+from app.api.deps import get_customer_db, get_db
+from app.core import config
 from app.schemas.booking import (
+    BookingIntakeResponse,
     CreateBookingRequest,
     BookingResponse,
     BookingEventResponse,
 )
-from app.services import booking_service
+from app.core.profiler import ProfiledRoute
+from app.core.serialization import Serializer
+from app.services import booking_service, read_service
+from app.services.intake_service import booking_intake
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
+# Built once at import; endpoints return finished JSON responses
+booking_serializer = Serializer(BookingResponse)
+events_serializer = Serializer(List[BookingEventResponse])
+intake_serializer = Serializer(BookingIntakeResponse)
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+def _queued(result: dict):
+    response = intake_serializer.response(result, status_code=202)
+    response.headers["Location"] = result["location"]
+    response.headers["Retry-After"] = "1"
+    return response
 
-@router.post("/", response_model=BookingResponse)
-def create_booking(request: CreateBookingRequest, db: Session = Depends(get_db)):
+
+def _queued_reference(booking_id: int) -> dict:
+    return {"id": booking_id, "status": "QUEUED", "location": f"/bookings/{booking_id}"}
+
+
+@router.post(
+    "/",
+    response_model=BookingResponse,
+    responses={202: {"model": BookingIntakeResponse}},
+)
+def create_booking(
+    request: CreateBookingRequest, db: Session = Depends(get_customer_db)
+):
     """
     Create a new booking as a customer.
+    With INTAKE_ASYNC_ENABLED, answers 202 with the booking ID; poll its Location.
     """
-    return booking_service.create_booking(db, request)
+    if config.INTAKE_ASYNC_ENABLED:
+        return _queued(booking_intake.accept(request))
+    return booking_serializer.response(booking_service.create_booking(db, request))
 
 
-@router.get("/{booking_id}", response_model=BookingResponse)
+@router.get(
+    "/{booking_id}",
+    response_model=BookingResponse,
+    responses={202: {"model": BookingIntakeResponse}},
+)
 def get_booking(booking_id: int, db: Session = Depends(get_db)):
     """
     Get booking details by ID.
+    Answers 202 while an asynchronously created booking is still queued.
     """
-    return booking_service.get_booking_by_id(db, booking_id)
+    if booking_intake.is_pending(booking_id):
+        return _queued(_queued_reference(booking_id))
+    return booking_serializer.response(read_service.get_booking(db, booking_id))
 
 
-@router.get("/{booking_id}/events", response_model=List[BookingEventResponse])
+@router.get(
+    "/{booking_id}/events",
+    response_model=List[BookingEventResponse],
+    responses={202: {"model": BookingIntakeResponse}},
+)
 def get_booking_events(booking_id: int, db: Session = Depends(get_db)):
     """
     Get all state change events for a specific booking.
+    Answers 202 while an asynchronously created booking is still queued.
     """
-    return booking_service.get_booking_events(db, booking_id)
+    if booking_intake.is_pending(booking_id):
+        return _queued(_queued_reference(booking_id))
+    return events_serializer.response(read_service.get_booking_events(db, booking_id))
 
 
 # Request Models for Cancellation (Inline to avoid schema churn)
@@ -79,8 +114,10 @@ def cancel_booking(
             detail="Only customers can perform this action via this endpoint.",
         )
 
-    return booking_service.cancel_booking_by_customer(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.cancel_booking_by_customer(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
 
 
@@ -99,8 +136,10 @@ def cancel_booking_admin(
             status_code=403, detail="Only admins can perform this action."
         )
 
-    return booking_service.cancel_booking_by_admin(
-        db, booking_id=booking_id, actor_id=request.actor_id, reason=request.reason
+    return booking_serializer.response(
+        booking_service.cancel_booking_by_admin(
+            db, booking_id=booking_id, actor_id=request.actor_id, reason=request.reason
+        )
     )
 
 
@@ -132,11 +171,13 @@ def retry_booking(
             status_code=403, detail="Only ADMIN or SYSTEM can retry bookings."
         )
 
-    return booking_service.retry_booking(
-        db,
-        booking_id=booking_id,
-        actor_role=request.actor_role,
-        actor_id=request.actor_id,
+    return booking_serializer.response(
+        booking_service.retry_booking(
+            db,
+            booking_id=booking_id,
+            actor_role=request.actor_role,
+            actor_id=request.actor_id,
+        )
     )
 
 
@@ -152,8 +193,10 @@ def force_cancel_booking(
 
         raise HTTPException(status_code=403, detail="Only ADMIN can force cancel.")
 
-    return booking_service.admin_force_cancel(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.admin_force_cancel(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
 
 
@@ -169,6 +212,8 @@ def mark_booking_failed(
 
         raise HTTPException(status_code=403, detail="Only ADMIN can mark failed.")
 
-    return booking_service.admin_mark_failed(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.admin_mark_failed(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
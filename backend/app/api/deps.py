@@ -0,0 +1,26 @@
+from fastapi import Request
+
+from app.core.database import shard_for_booking, shard_for_customer, shard_session
+from app.schemas.booking import CreateBookingRequest
+
+
+# Dependency to get DB session, routed to the shard owning the booking in the path
+def get_db(request: Request):
+    booking_id = request.path_params.get("booking_id")
+    shard = 0
+    if booking_id is not None and str(booking_id).isdigit():
+        shard = shard_for_booking(int(booking_id))
+    db = shard_session(shard)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency to get DB session for a new booking, routed by customer (actor_id)
+def get_customer_db(request: CreateBookingRequest):
+    db = shard_session(shard_for_customer(request.actor_id))
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,23 +1,35 @@
 from fastapi import APIRouter, Depends, Body
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
 
-from app.core.database import SessionLocal
+from app.api.deps import get_db
+from app.core.profiler import ProfiledRoute
+from app.core.serialization import Serializer
 from app.models.booking_event import ActorRole
-from app.schemas.booking import BookingResponse
-from app.services import booking_service
-from pydantic import BaseModel
-
-router = APIRouter()
-
-
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from app.schemas.booking import (
+    AvailableProvidersResponse,
+    BookingResponse,
+    CandidatesResponse,
+    ProviderStatsResponse,
+    TransitionBatchResponse,
+    WorkingHoursEntry,
+)
+from app.services import (
+    booking_service,
+    matching_service,
+    provider_stats_service,
+    read_service,
+    schedule_service,
+    transition_service,
+)
+from pydantic import BaseModel, Field
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Built once at import; endpoints return finished JSON responses
+booking_serializer = Serializer(BookingResponse)
+bookings_serializer = Serializer(List[BookingResponse])
 
 
 # Request Models (Inline as per plan to avoid schemas clutter/modifications)
@@ -41,11 +53,13 @@ def assign_provider(
     Assign a provider to a booking.
     Role: SYSTEM or ADMIN.
     """
-    return booking_service.assign_provider(
-        db,
-        booking_id=booking_id,
-        provider_id=request.provider_id,
-        actor_role=request.actor_role,
+    return booking_serializer.response(
+        booking_service.assign_provider(
+            db,
+            booking_id=booking_id,
+            provider_id=request.provider_id,
+            actor_role=request.actor_role,
+        )
     )
 
 
@@ -54,11 +68,19 @@ class ProviderDTO(BaseModel):
     id: int
     name: str
     availability: str  # "AVAILABLE" or "BUSY"
+    skills: Optional[List[str]] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    service_radius_km: Optional[float] = None
 
     class Config:
         from_attributes = True
 
 
+provider_serializer = Serializer(ProviderDTO)
+providers_serializer = Serializer(List[ProviderDTO])
+
+
 @router.get("/admin/providers", response_model=List[ProviderDTO])
 def get_all_providers(
     actor_role: ActorRole,  # Passed as query param for simplicity or header if we had auth middleware
@@ -73,20 +95,26 @@ def get_all_providers(
 
         raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
 
-    from app.models.provider import Provider
-
-    providers = db.query(Provider).all()
-    results = []
+    busy_ids = booking_service.get_busy_provider_ids(db)
+    providers = read_service.list_providers(db)
     for p in providers:
-        is_busy = booking_service.is_provider_busy(db, p.id)
-        results.append(
-            ProviderDTO(
-                id=p.id,
-                name=p.name,
-                availability="BUSY" if is_busy else "AVAILABLE",
-            )
-        )
-    return results
+        p["availability"] = "BUSY" if p["id"] in busy_ids else "AVAILABLE"
+    return providers_serializer.response(providers)
+
+
+@router.get("/admin/providers/stats", response_model=ProviderStatsResponse)
+def get_provider_stats(actor_role: ActorRole):
+    """
+    Per-provider throughput leaderboard: counts and rates over the last
+    PROVIDER_STATS_WINDOW_DAYS, median time-to-accept and current load.
+    Served from a cache refreshed in the background.
+    Role: ADMIN ONLY.
+    """
+    if actor_role != ActorRole.ADMIN:
+        from fastapi import HTTPException
+
+        raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
+    return provider_stats_service.get_provider_stats()
 
 
 # 2. VIEW ASSIGNED BOOKINGS (STRICT FILTER)
@@ -96,7 +124,9 @@ def get_provider_bookings(provider_id: int, db: Session = Depends(get_db)):
     Get bookings assigned to provider.
     STRICT FILTER: Only ASSIGNED and IN_PROGRESS.
     """
-    return booking_service.get_assigned_bookings_for_provider(db, provider_id)
+    return bookings_serializer.response(
+        read_service.get_provider_bookings(db, provider_id)
+    )
 
 
 # 3. ACCEPT BOOKING
@@ -119,8 +149,10 @@ def accept_booking(
 
     # Service layer `provider_accept_booking` takes `actor_id` (provider_id).
 
-    return booking_service.provider_accept_booking(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.provider_accept_booking(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
 
 
@@ -136,8 +168,10 @@ def reject_booking(
         raise HTTPException(
             status_code=403, detail="Only providers can perform this action"
         )
-    return booking_service.provider_reject_booking(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.provider_reject_booking(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
 
 
@@ -157,8 +191,10 @@ def complete_booking(
             status_code=403, detail="Only providers can perform this action"
         )
 
-    return booking_service.complete_booking(
-        db, booking_id=booking_id, actor_id=request.actor_id
+    return booking_serializer.response(
+        booking_service.complete_booking(
+            db, booking_id=booking_id, actor_id=request.actor_id
+        )
     )
 
 
@@ -178,13 +214,170 @@ def force_assign_provider(
             status_code=403, detail="Only ADMIN can perform force assignment."
         )
 
-    return booking_service.admin_force_assign(
+    return booking_serializer.response(
+        booking_service.admin_force_assign(
+            db,
+            booking_id=booking_id,
+            provider_id=request.provider_id,
+            actor_id=(
+                request.actor_id if request.actor_id else 0
+            ),  # Should rely on implicit actor_id if provided or default
+            # Plan said AssignProviderRequest. actor_id should be present for ADMIN actions usually.
+            # But schema has it as Optional. Let's assume passed.
+        )
+    )
+
+
+# 7. PROVIDER CALENDARS & AVAILABILITY
+class WorkingHoursRequest(BaseModel):
+    actor_role: ActorRole
+    hours: List[WorkingHoursEntry]
+
+
+@router.get(
+    "/admin/providers/{provider_id}/calendar", response_model=List[WorkingHoursEntry]
+)
+def get_provider_calendar(
+    provider_id: int, actor_role: ActorRole, db: Session = Depends(get_db)
+):
+    """
+    Weekly working hours of a provider (UTC minutes of the day).
+    Role: ADMIN ONLY.
+    """
+    if actor_role != ActorRole.ADMIN:
+        from fastapi import HTTPException
+
+        raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
+    return schedule_service.get_working_hours(db, provider_id)
+
+
+@router.put(
+    "/admin/providers/{provider_id}/calendar", response_model=List[WorkingHoursEntry]
+)
+def set_provider_calendar(
+    provider_id: int, request: WorkingHoursRequest, db: Session = Depends(get_db)
+):
+    """
+    Replaces a provider's weekly working hours. An empty list means always available.
+    Role: ADMIN ONLY.
+    """
+    if request.actor_role != ActorRole.ADMIN:
+        from fastapi import HTTPException
+
+        raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
+    return schedule_service.set_working_hours(
         db,
-        booking_id=booking_id,
-        provider_id=request.provider_id,
-        actor_id=(
-            request.actor_id if request.actor_id else 0
-        ),  # Should rely on implicit actor_id if provided or default
-        # Plan said AssignProviderRequest. actor_id should be present for ADMIN actions usually.
-        # But schema has it as Optional. Let's assume passed.
+        provider_id,
+        [(h.weekday, h.start_minute, h.end_minute) for h in request.hours],
+    )
+
+
+@router.get("/providers/available", response_model=AvailableProvidersResponse)
+def get_available_providers(
+    start: datetime, end: datetime, actor_role: ActorRole, limit: int = 100
+):
+    """
+    Providers whose calendar covers [start, end) and who have no overlapping
+    scheduled booking. Served from the in-memory schedule index.
+    Role: SYSTEM or ADMIN.
+    """
+    if actor_role not in [ActorRole.SYSTEM, ActorRole.ADMIN]:
+        from fastapi import HTTPException
+
+        raise HTTPException(
+            status_code=403, detail="Only SYSTEM or ADMIN can search availability."
+        )
+    return schedule_service.get_available_providers(start, end, limit=limit)
+
+
+# 8. SKILL & LOCATION MATCHING
+class ProviderProfileRequest(BaseModel):
+    actor_role: ActorRole
+    skills: List[str] = []
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    service_radius_km: Optional[float] = Field(None, gt=0)
+
+
+@router.put("/admin/providers/{provider_id}/profile", response_model=ProviderDTO)
+def set_provider_profile(
+    provider_id: int, request: ProviderProfileRequest, db: Session = Depends(get_db)
+):
+    """
+    Replaces a provider's skills, location and service radius.
+    Role: ADMIN ONLY.
+    """
+    if request.actor_role != ActorRole.ADMIN:
+        from fastapi import HTTPException
+
+        raise HTTPException(status_code=403, detail="Forbidden: Admin access only")
+    provider = matching_service.update_provider_profile(
+        db,
+        provider_id,
+        skills=request.skills,
+        latitude=request.latitude,
+        longitude=request.longitude,
+        service_radius_km=request.service_radius_km,
+    )
+    return provider_serializer.response(
+        ProviderDTO(
+            id=provider.id,
+            name=provider.name,
+            availability=(
+                "BUSY"
+                if provider.id in booking_service.get_busy_provider_ids(db)
+                else "AVAILABLE"
+            ),
+            skills=provider.skills,
+            latitude=provider.latitude,
+            longitude=provider.longitude,
+            service_radius_km=provider.service_radius_km,
+        )
+    )
+
+
+@router.get("/bookings/{booking_id}/candidates", response_model=CandidatesResponse)
+def get_booking_candidates(
+    booking_id: int,
+    actor_role: ActorRole,
+    k: int = 5,
+    db: Session = Depends(get_db),
+):
+    """
+    The k nearest free providers with the booking's required skill, nearest first.
+    Served from the in-memory match index.
+    Role: SYSTEM or ADMIN.
+    """
+    if actor_role not in [ActorRole.SYSTEM, ActorRole.ADMIN]:
+        from fastapi import HTTPException
+
+        raise HTTPException(
+            status_code=403, detail="Only SYSTEM or ADMIN can request candidates."
+        )
+    k = max(1, min(k, 50))
+    return matching_service.get_candidates(db, booking_id, k=k)
+
+
+# 9. BATCHED PROVIDER ACTIONS (offline replay)
+class TransitionItem(BaseModel):
+    booking_id: int
+    action: str  # "accept", "reject" or "complete"
+    actor_role: ActorRole
+    actor_id: int
+
+
+class TransitionBatchRequest(BaseModel):
+    items: List[TransitionItem]
+
+
+@router.post("/transitions/batch", response_model=TransitionBatchResponse)
+def apply_transition_batch(request: TransitionBatchRequest):
+    """
+    Applies queued provider actions in order, with the same rules as
+    accept/reject/complete. Returns one result per item, in order; a failed
+    item does not stop the ones after it.
+    Role: PROVIDER.
+    """
+    return transition_service.apply_batch(
+        [item.model_dump() for item in request.items]
     )
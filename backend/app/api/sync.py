@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import APIRouter
+
+from app.core.profiler import ProfiledRoute
+from app.core.serialization import Serializer
+from app.schemas.booking import SyncResponse
+from app.services import sync_service
+
+router = APIRouter(route_class=ProfiledRoute)
+
+sync_serializer = Serializer(SyncResponse)
+
+
+@router.get("/sync", response_model=SyncResponse)
+def sync(
+    scope: str,
+    actor_id: int,
+    since_event_id: Optional[str] = None,
+    compact: bool = False,
+    limit: int = 500,
+):
+    """
+    Delta sync for offline clients: bookings of a customer (scope=customer) or
+    provider (scope=provider) changed since the cursor, and the next cursor.
+    Omit since_event_id for a full initial sync; repeat while has_more.
+    With compact=true, bookings the client already has only carry their
+    mutable fields (status, provider_id, priority, updated_at).
+    """
+    limit = max(1, min(limit, 500))
+    return sync_serializer.response(
+        sync_service.get_delta(
+            scope, actor_id, since=since_event_id, limit=limit, compact=compact
+        ),
+        exclude_unset=True,
+    )
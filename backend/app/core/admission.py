@@ -0,0 +1,225 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from app.core import config, metrics
+
+# Route classes, in priority order when the server is saturated
+WRITE = "write"
+READ = "read"
+ADMIN = "admin"
+# Bucket class for SYSTEM calls on any route (automated dispatch, sweeps)
+SYSTEM = "system"
+
+_EXEMPT_PATHS = ("/health", "/docs", "/redoc", "/openapi.json")
+_BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Takes one token. Returns 0 on success, else seconds until one is available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets per (route class, actor), LRU-bounded so idle actors are forgotten.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, int]], max_keys: int):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, route_class: str, actor: tuple) -> float:
+        """
+        Returns 0 if the request may proceed, else the Retry-After in seconds.
+        """
+        rate, burst = self.limits[route_class]
+        if rate <= 0:
+            return 0.0
+        key = (route_class, actor)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """
+    Route class of a request, or None if it is never limited.
+    """
+    if path in _EXEMPT_PATHS or method in ("OPTIONS", "HEAD"):
+        return None
+    if path.startswith("/admin"):
+        return ADMIN
+    if method == "GET":
+        return READ
+    return WRITE
+
+
+def actor_key(scope: dict, body: bytes) -> tuple:
+    """
+    (actor_role, actor_id) from the query string or JSON body. Roles are not
+    authenticated, so requests without an actor ID, and SYSTEM calls, are
+    keyed by client address instead: ("client", ip) or ("SYSTEM", ip).
+    """
+    params = parse_qs(scope.get("query_string", b"").decode())
+    role = params.get("actor_role", [None])[0]
+    actor_id = params.get("actor_id", [None])[0]
+    if (role is None or actor_id is None) and body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict):
+            role = role or payload.get("actor_role")
+            actor_id = actor_id if actor_id is not None else payload.get("actor_id")
+    if role == "SYSTEM" or actor_id is None:
+        client = scope.get("client")
+        return ("SYSTEM" if role == "SYSTEM" else "client", client[0] if client else None)
+    return (role, str(actor_id))
+
+
+class AdmissionMiddleware:
+    """
+    Sheds load before it reaches the threadpool:
+    - 429 when an actor exceeds its token bucket for the route class
+      (SYSTEM callers share one larger bucket per client address instead)
+    - 503 when the server already has ADMISSION_MAX_IN_FLIGHT requests;
+      reads and admin calls are shed earlier, leaving ADMISSION_WRITE_RESERVE
+      slots for booking transitions
+    Both carry a Retry-After header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limiter = RateLimiter(
+            {
+                WRITE: (config.RATE_LIMIT_WRITE_PER_SECOND, config.RATE_LIMIT_WRITE_BURST),
+                READ: (config.RATE_LIMIT_READ_PER_SECOND, config.RATE_LIMIT_READ_BURST),
+                ADMIN: (config.RATE_LIMIT_ADMIN_PER_SECOND, config.RATE_LIMIT_ADMIN_BURST),
+                SYSTEM: (config.RATE_LIMIT_SYSTEM_PER_SECOND, config.RATE_LIMIT_SYSTEM_BURST),
+            },
+            max_keys=config.ADMISSION_MAX_TRACKED_ACTORS,
+        )
+        # Only touched from the event loop thread, so no lock is needed
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        route_class = None
+        if scope["type"] == "http" and config.ADMISSION_ENABLED:
+            route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 1. Global concurrency: cheapest check first
+        limit = config.ADMISSION_MAX_IN_FLIGHT
+        if route_class != WRITE:
+            limit -= config.ADMISSION_WRITE_RESERVE
+        if self.in_flight >= limit:
+            metrics.incr(f"admission.shed.{route_class}")
+            await self._reject(
+                scope, receive, send, 503, "Server is overloaded, retry later.",
+                config.ADMISSION_RETRY_AFTER_SECONDS,
+            )
+            return
+
+        # 2. Per-actor rate limit (the body is buffered to read the actor)
+        body = b""
+        if scope["method"] in _BODY_METHODS:
+            body, receive = await buffer_body(receive)
+        actor = actor_key(scope, body)
+        bucket_class = SYSTEM if actor[0] == "SYSTEM" else route_class
+        retry_after = self.limiter.check(bucket_class, actor)
+        if retry_after:
+            metrics.incr(f"admission.rate_limited.{route_class}")
+            await self._reject(
+                scope, receive, send, 429, "Rate limit exceeded.",
+                max(1, math.ceil(retry_after)),
+            )
+            return
+
+        # 3. Admit
+        self.in_flight += 1
+        metrics.set_gauge("admission.in_flight", self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("admission.in_flight", self.in_flight)
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code, detail, retry_after):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+
+async def buffer_body(receive):
+    """
+    Reads the whole request body and returns it with a `receive` that replays it.
+    """
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client went away; let the app see the disconnect
+            async def replay_disconnect(message=message):
+                return message
+
+            return b"", replay_disconnect
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
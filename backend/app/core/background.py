@@ -0,0 +1,69 @@
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Runs `fn` every `interval_seconds` on a daemon thread until stopped.
+    Exceptions are logged and never kill the loop.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> object:
+        return self.fn()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.fn()
+            except Exception:
+                logger.exception("Background worker %s failed", self.name)
+
+
+# Workers started and stopped with the application lifespan
+_workers: dict[str, PeriodicWorker] = {}
+
+
+def register_worker(worker: PeriodicWorker) -> PeriodicWorker:
+    _workers[worker.name] = worker
+    return worker
+
+
+def get_worker(name: str) -> PeriodicWorker | None:
+    return _workers.get(name)
+
+
+def start_workers() -> None:
+    for worker in _workers.values():
+        worker.start()
+
+
+def stop_workers() -> None:
+    for worker in _workers.values():
+        worker.stop()
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BoundedSet:
+    """
+    Thread-safe set with LRU eviction once `maxsize` entries are held.
+    Used for in-process "we have already seen this ID" lookups.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._items:
+                return False
+            self._items.move_to_end(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: Hashable) -> None:
+        with self._lock:
+            self._items[key] = None
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class CachedValue(Generic[T]):
+    """
+    Result of `compute()`, served until it is `ttl_seconds` old.
+    A background worker calls refresh() well within the TTL, so get() only
+    computes on a cold start or when the worker has fallen behind.
+    Concurrent callers share one computation.
+    """
+
+    def __init__(self, compute: Callable[[], T], ttl_seconds: float):
+        self.compute = compute
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[T] = None
+        self._computed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def age(self) -> Optional[float]:
+        if self._computed_at is None:
+            return None
+        return time.monotonic() - self._computed_at
+
+    def refresh(self) -> T:
+        with self._lock:
+            value = self.compute()
+            self._value, self._computed_at = value, time.monotonic()
+            return value
+
+    def get(self) -> T:
+        age = self.age()
+        if age is not None and age < self.ttl_seconds:
+            return self._value
+        with self._lock:
+            # Someone else may have refreshed while we waited for the lock
+            age = self.age()
+            if age is not None and age < self.ttl_seconds:
+                return self._value
+            value = self.compute()
+            self._value, self._computed_at = value, time.monotonic()
+            return value
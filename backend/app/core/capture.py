@@ -0,0 +1,209 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Optional
+
+from app.core import config, metrics
+from app.core.admission import actor_key, buffer_body
+
+logger = logging.getLogger(__name__)
+
+# Production traffic capture for replay_traffic.py, off unless CAPTURE_ENABLED.
+# CaptureMiddleware records each request (method, path, query, JSON body,
+# actor) with its original status and latency; the "traffic-capture" worker
+# appends them as gzip NDJSON to CAPTURE_DIR, starting a new file every
+# CAPTURE_ROTATE_BYTES / CAPTURE_ROTATE_SECONDS. The event loop only copies
+# bytes into a buffer; decoding and compression happen in the worker.
+
+_BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+def _sampled(actor: tuple) -> bool:
+    # Whole actors are sampled, so replay keeps every actor's full sequence
+    if config.CAPTURE_SAMPLE_RATE >= 1:
+        return True
+    bucket = zlib.crc32(repr(actor).encode()) % 10_000
+    return bucket < config.CAPTURE_SAMPLE_RATE * 10_000
+
+
+def _json_or_text(raw: bytes):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", "replace")
+
+
+def _record(entry: tuple) -> dict:
+    """
+    The NDJSON line for a buffered request (runs in the worker thread).
+    """
+    method, path, query, body, actor, started, duration, status, response = entry
+    record = {
+        "ts": round(started, 6),
+        "method": method,
+        "path": path,
+        "query": query,
+        "body": _json_or_text(body),
+        "actor": f"{actor[0]}:{actor[1]}",
+        "status": status,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    # ID of whatever a successful POST created/returned, so replay can map it
+    payload = _json_or_text(response) if response else None
+    if isinstance(payload, dict) and "id" in payload:
+        record["id"] = payload["id"]
+    return record
+
+
+class CaptureWriter:
+    """
+    Buffers captured requests and appends them to rotating gzip NDJSON files.
+    Each flush adds one gzip member, so files stay readable while being written.
+    """
+
+    def __init__(self):
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._sequence = 0
+
+    def add(self, entry: tuple) -> None:
+        if len(self._buffer) >= config.CAPTURE_MAX_BUFFERED:
+            metrics.incr("capture.dropped")
+            return
+        self._buffer.append(entry)
+
+    def _current_path(self) -> str:
+        now = time.time()
+        if (
+            self._path is None
+            or now - self._opened_at >= config.CAPTURE_ROTATE_SECONDS
+            or (
+                os.path.exists(self._path)
+                and os.path.getsize(self._path) >= config.CAPTURE_ROTATE_BYTES
+            )
+        ):
+            os.makedirs(config.CAPTURE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+            self._sequence += 1
+            self._path = os.path.join(
+                config.CAPTURE_DIR,
+                f"capture-{stamp}-{os.getpid()}-{self._sequence}.ndjson.gz",
+            )
+            self._opened_at = now
+            self._prune()
+        return self._path
+
+    def _prune(self) -> None:
+        files = sorted(
+            (
+                os.path.join(config.CAPTURE_DIR, name)
+                for name in os.listdir(config.CAPTURE_DIR)
+                if name.startswith("capture-") and name.endswith(".ndjson.gz")
+            ),
+            key=os.path.getmtime,
+        )
+        for path in files[: max(len(files) - config.CAPTURE_MAX_FILES + 1, 0)]:
+            os.remove(path)
+
+    def flush(self) -> int:
+        """
+        Writes out every buffered request. Returns the number written.
+        """
+        with self._lock:
+            lines = []
+            while self._buffer:
+                entry = self._buffer.popleft()
+                # One at a time: a record that cannot be encoded is dropped alone
+                try:
+                    lines.append(json.dumps(_record(entry), default=str) + "\n")
+                except Exception:
+                    logger.exception("Could not encode captured request")
+                    metrics.incr("capture.encode_errors")
+            if not lines:
+                return 0
+            with gzip.open(self._current_path(), "at", encoding="utf-8") as f:
+                f.write("".join(lines))
+        metrics.incr("capture.requests", len(lines))
+        return len(lines)
+
+
+writer = CaptureWriter()
+
+
+class CaptureMiddleware:
+    """
+    Records requests for replay, with their original status and latency.
+    Paths under CAPTURE_EXCLUDE_PREFIXES (admin and docs by default) are skipped.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(
+            config.CAPTURE_EXCLUDE_PREFIXES
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 1. Body and actor (the body is replayed to the app)
+        body = b""
+        if scope["method"] in _BODY_METHODS:
+            body, receive = await buffer_body(receive)
+        actor = actor_key(scope, body)
+        if not _sampled(actor):
+            await self.app(scope, receive, send)
+            return
+        if len(body) > config.CAPTURE_MAX_BODY_BYTES:
+            metrics.incr("capture.skipped_large")
+            await self.app(scope, receive, send)
+            return
+
+        # 2. Status, and the response body of POSTs (for created IDs)
+        status = {"code": None}
+        response = []
+        keep_response = scope["method"] == "POST"
+
+        async def capture_send(message):
+            nonlocal keep_response
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif (
+                keep_response
+                and message["type"] == "http.response.body"
+                and 200 <= (status["code"] or 0) < 300
+            ):
+                response.append(message.get("body", b""))
+                if sum(map(len, response)) > config.CAPTURE_MAX_BODY_BYTES:
+                    response.clear()
+                    keep_response = False
+            await send(message)
+
+        started = time.time()
+        clock = time.perf_counter()
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            # 3. Hand the raw bytes to the writer; nothing is encoded here
+            writer.add(
+                (
+                    scope["method"],
+                    scope["path"],
+                    scope.get("query_string", b"").decode("latin-1"),
+                    body,
+                    actor,
+                    started,
+                    time.perf_counter() - clock,
+                    status["code"] or 500,
+                    b"".join(response),
+                )
+            )
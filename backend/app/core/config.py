@@ -0,0 +1,186 @@
+import os
+
+# Runtime settings, overridable through environment variables.
+# Kept as plain module constants; import the module (not the names) where
+# tests or tools need to patch a value at runtime.
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Assignment timeout sweeper
+SWEEPER_ENABLED = _env_bool("SWEEPER_ENABLED", True)
+SWEEPER_INTERVAL_SECONDS = _env_float("SWEEPER_INTERVAL_SECONDS", 30)
+SWEEPER_BATCH_SIZE = _env_int("SWEEPER_BATCH_SIZE", 500)
+ASSIGNED_TIMEOUT_SECONDS = _env_int("ASSIGNED_TIMEOUT_SECONDS", 15 * 60)
+IN_PROGRESS_TIMEOUT_SECONDS = _env_int("IN_PROGRESS_TIMEOUT_SECONDS", 8 * 60 * 60)
+SWEEPER_AUTO_RETRY = _env_bool("SWEEPER_AUTO_RETRY", True)
+
+# Bulk admin operations
+BULK_CHUNK_SIZE = _env_int("BULK_CHUNK_SIZE", 1000)
+
+# Event replay / state rebuild
+REPLAY_CHUNK_SIZE = _env_int("REPLAY_CHUNK_SIZE", 50_000)
+REPLAY_CHECKPOINT_EVERY = _env_int("REPLAY_CHECKPOINT_EVERY", 1_000_000)
+REPLAY_SNAPSHOT_PATH = os.getenv("REPLAY_SNAPSHOT_PATH", "./replay_snapshot.bin")
+
+# Consistency auditor
+AUDITOR_ENABLED = _env_bool("AUDITOR_ENABLED", True)
+AUDITOR_INTERVAL_SECONDS = _env_float("AUDITOR_INTERVAL_SECONDS", 60)
+AUDITOR_BATCH_EVENTS = _env_int("AUDITOR_BATCH_EVENTS", 10_000)
+
+# Hot/cold archival of terminal bookings (SQLite only; empty path disables)
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH", "./sql_app_archive.db")
+ARCHIVER_ENABLED = _env_bool("ARCHIVER_ENABLED", True)
+ARCHIVER_INTERVAL_SECONDS = _env_float("ARCHIVER_INTERVAL_SECONDS", 60 * 60)
+ARCHIVE_RETENTION_DAYS = _env_int("ARCHIVE_RETENTION_DAYS", 90)
+ARCHIVE_BATCH_SIZE = _env_int("ARCHIVE_BATCH_SIZE", 1000)
+
+# Hash sharding of bookings/events/customers across SQLite files (1 = off)
+SHARD_COUNT = _env_int("SHARD_COUNT", 1)
+
+# Transactional outbox / webhook notifications
+# Comma-separated URLs; every booking event is POSTed to each of them.
+WEBHOOK_TARGETS = [
+    url.strip() for url in os.getenv("WEBHOOK_TARGETS", "").split(",") if url.strip()
+]
+OUTBOX_ENABLED = _env_bool("OUTBOX_ENABLED", bool(WEBHOOK_TARGETS))
+OUTBOX_INTERVAL_SECONDS = _env_float("OUTBOX_INTERVAL_SECONDS", 1)
+OUTBOX_BATCH_SIZE = _env_int("OUTBOX_BATCH_SIZE", 200)
+OUTBOX_CONCURRENCY = _env_int("OUTBOX_CONCURRENCY", 8)
+OUTBOX_MAX_ATTEMPTS = _env_int("OUTBOX_MAX_ATTEMPTS", 10)
+OUTBOX_BACKOFF_BASE_SECONDS = _env_float("OUTBOX_BACKOFF_BASE_SECONDS", 1)
+OUTBOX_BACKOFF_MAX_SECONDS = _env_float("OUTBOX_BACKOFF_MAX_SECONDS", 300)
+OUTBOX_LEASE_SECONDS = _env_float("OUTBOX_LEASE_SECONDS", 60)
+WEBHOOK_TIMEOUT_SECONDS = _env_float("WEBHOOK_TIMEOUT_SECONDS", 5)
+
+# Admission control: per-actor token buckets and a global in-flight cap
+ADMISSION_ENABLED = _env_bool("ADMISSION_ENABLED", True)
+# Defaults match AnyIO's 40 worker threads, so admitted requests rarely queue
+ADMISSION_MAX_IN_FLIGHT = _env_int("ADMISSION_MAX_IN_FLIGHT", 40)
+# Slots only writes may use, so transitions still get through when reads saturate
+ADMISSION_WRITE_RESERVE = _env_int("ADMISSION_WRITE_RESERVE", 8)
+ADMISSION_RETRY_AFTER_SECONDS = _env_int("ADMISSION_RETRY_AFTER_SECONDS", 1)
+ADMISSION_MAX_TRACKED_ACTORS = _env_int("ADMISSION_MAX_TRACKED_ACTORS", 100_000)
+RATE_LIMIT_WRITE_PER_SECOND = _env_float("RATE_LIMIT_WRITE_PER_SECOND", 10)
+RATE_LIMIT_WRITE_BURST = _env_int("RATE_LIMIT_WRITE_BURST", 20)
+RATE_LIMIT_READ_PER_SECOND = _env_float("RATE_LIMIT_READ_PER_SECOND", 20)
+RATE_LIMIT_READ_BURST = _env_int("RATE_LIMIT_READ_BURST", 40)
+RATE_LIMIT_ADMIN_PER_SECOND = _env_float("RATE_LIMIT_ADMIN_PER_SECOND", 5)
+RATE_LIMIT_ADMIN_BURST = _env_int("RATE_LIMIT_ADMIN_BURST", 10)
+# SYSTEM callers (dispatch, sweeps): one bucket per client address, any route
+RATE_LIMIT_SYSTEM_PER_SECOND = _env_float("RATE_LIMIT_SYSTEM_PER_SECOND", 200)
+RATE_LIMIT_SYSTEM_BURST = _env_int("RATE_LIMIT_SYSTEM_BURST", 400)
+
+# Retries of service transactions that hit SQLite lock contention
+# sqlite3 waits this long for a lock before raising "database is locked".
+# Short, because every writer (requests and background jobs) retries on top.
+SQLITE_BUSY_TIMEOUT_SECONDS = _env_float("SQLITE_BUSY_TIMEOUT_SECONDS", 1)
+DB_RETRY_MAX_ATTEMPTS = _env_int("DB_RETRY_MAX_ATTEMPTS", 5)
+DB_RETRY_BACKOFF_BASE_SECONDS = _env_float("DB_RETRY_BACKOFF_BASE_SECONDS", 0.02)
+DB_RETRY_BACKOFF_MAX_SECONDS = _env_float("DB_RETRY_BACKOFF_MAX_SECONDS", 0.5)
+DB_RETRY_DEADLINE_SECONDS = _env_float("DB_RETRY_DEADLINE_SECONDS", 5)
+
+# Scheduled bookings: in-memory provider calendar cache lifetime
+CALENDAR_CACHE_TTL_SECONDS = _env_float("CALENDAR_CACHE_TTL_SECONDS", 5)
+# Immediate bookings have no end time: a provider busy with one cannot take
+# scheduled windows starting within this many seconds (0: only windows under way)
+IMMEDIATE_BOOKING_HOLD_SECONDS = _env_int("IMMEDIATE_BOOKING_HOLD_SECONDS", 60 * 60)
+
+# Pending-booking dispatch queue
+MAX_REQUEST_PRIORITY = _env_int("MAX_REQUEST_PRIORITY", 10)
+# Added to a booking's priority each time it is retried back to PENDING
+RETRY_PRIORITY_BOOST = _env_int("RETRY_PRIORITY_BOOST", 1)
+
+# Provider matching: spatial grid of providers per skill
+MATCH_GRID_CELL_DEGREES = _env_float("MATCH_GRID_CELL_DEGREES", 0.05)  # ~5.5 km
+MATCH_MAX_RADIUS_KM = _env_float("MATCH_MAX_RADIUS_KM", 100)
+# Candidate lookups reuse the index for this long before re-reading the event log
+MATCH_REFRESH_INTERVAL_SECONDS = _env_float("MATCH_REFRESH_INTERVAL_SECONDS", 0.5)
+PROVIDER_CACHE_TTL_SECONDS = _env_float("PROVIDER_CACHE_TTL_SECONDS", 5)
+
+# Batched provider transitions (POST /transitions/batch)
+TRANSITION_BATCH_MAX_ITEMS = _env_int("TRANSITION_BATCH_MAX_ITEMS", 500)
+# Items committed together; a lock retry re-runs one chunk
+TRANSITION_BATCH_CHUNK_SIZE = _env_int("TRANSITION_BATCH_CHUNK_SIZE", 100)
+
+# Sampling profiler (admin-started captures); off means no middleware or route wrapping
+PROFILER_ENABLED = _env_bool("PROFILER_ENABLED", False)
+# Wall-clock stack sampling period of a capture, unless the capture overrides it
+PROFILER_INTERVAL_MS = _env_float("PROFILER_INTERVAL_MS", 5)
+# Requests carrying this header (any value but "0") are always sampled
+PROFILER_HEADER = os.getenv("PROFILER_HEADER", "X-Profile")
+PROFILER_MAX_DURATION_SECONDS = _env_float("PROFILER_MAX_DURATION_SECONDS", 300)
+
+# Local tracing: spans for requests, booking_service calls and SQL statements
+TRACING_ENABLED = _env_bool("TRACING_ENABLED", False)
+# Fraction of requests traced; upstream-sampled traceparent headers are always traced
+TRACE_SAMPLE_RATE = _env_float("TRACE_SAMPLE_RATE", 0.01)
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.json")
+TRACE_FLUSH_INTERVAL_SECONDS = _env_float("TRACE_FLUSH_INTERVAL_SECONDS", 1)
+# Spans waiting for the exporter; more are dropped instead of growing memory
+TRACE_MAX_BUFFERED_SPANS = _env_int("TRACE_MAX_BUFFERED_SPANS", 100_000)
+TRACE_MAX_STATEMENT_LENGTH = _env_int("TRACE_MAX_STATEMENT_LENGTH", 500)
+
+# Traffic capture for replay_traffic.py (gzip NDJSON, rotated)
+CAPTURE_ENABLED = _env_bool("CAPTURE_ENABLED", False)
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "captures")
+# Fraction of actors captured (all of an actor's requests, or none)
+CAPTURE_SAMPLE_RATE = _env_float("CAPTURE_SAMPLE_RATE", 1.0)
+CAPTURE_EXCLUDE_PREFIXES = tuple(
+    prefix
+    for prefix in os.getenv(
+        "CAPTURE_EXCLUDE_PREFIXES", "/admin,/health,/docs,/redoc,/openapi.json"
+    ).split(",")
+    if prefix
+)
+CAPTURE_FLUSH_INTERVAL_SECONDS = _env_float("CAPTURE_FLUSH_INTERVAL_SECONDS", 1)
+CAPTURE_ROTATE_BYTES = _env_int("CAPTURE_ROTATE_BYTES", 64 * 1024 * 1024)
+CAPTURE_ROTATE_SECONDS = _env_float("CAPTURE_ROTATE_SECONDS", 3600)
+# Oldest files are deleted beyond this many
+CAPTURE_MAX_FILES = _env_int("CAPTURE_MAX_FILES", 48)
+CAPTURE_MAX_BUFFERED = _env_int("CAPTURE_MAX_BUFFERED", 100_000)
+# Larger request bodies are not captured
+CAPTURE_MAX_BODY_BYTES = _env_int("CAPTURE_MAX_BODY_BYTES", 64 * 1024)
+
+# Asynchronous booking intake: POST /bookings/ journals the booking and answers
+# 202 with its ID; a worker inserts journaled bookings in batches
+INTAKE_ASYNC_ENABLED = _env_bool("INTAKE_ASYNC_ENABLED", False)
+INTAKE_DIR = os.getenv("INTAKE_DIR", "booking_intake")
+# Bookings per insert transaction
+INTAKE_BATCH_SIZE = _env_int("INTAKE_BATCH_SIZE", 500)
+INTAKE_FLUSH_INTERVAL_SECONDS = _env_float("INTAKE_FLUSH_INTERVAL_SECONDS", 0.2)
+# Booking IDs reserved per shard at a time
+INTAKE_ID_BLOCK_SIZE = _env_int("INTAKE_ID_BLOCK_SIZE", 1000)
+# fsync the journal before answering 202 (grouped across concurrent requests)
+INTAKE_FSYNC = _env_bool("INTAKE_FSYNC", True)
+
+# Admin name search: trigrams per fuzzy query, rarest first (more = more typo
+# tolerance, slower on large tables)
+SEARCH_FUZZY_TERMS = _env_int("SEARCH_FUZZY_TERMS", 3)
+# Fuzzy queries also rerank up to this many names per index that share each query
+# word's first 2 letters, by edit distance (catches "alcie" -> "Alice")
+SEARCH_TYPO_CANDIDATES = _env_int("SEARCH_TYPO_CANDIDATES", 500)
+
+# Provider leaderboard (GET /admin/providers/stats), refreshed in the background
+PROVIDER_STATS_ENABLED = _env_bool("PROVIDER_STATS_ENABLED", True)
+PROVIDER_STATS_WINDOW_DAYS = _env_int("PROVIDER_STATS_WINDOW_DAYS", 30)
+PROVIDER_STATS_REFRESH_SECONDS = _env_float("PROVIDER_STATS_REFRESH_SECONDS", 60)
+# Older results are recomputed on request (only if the refresh falls behind)
+PROVIDER_STATS_TTL_SECONDS = _env_float("PROVIDER_STATS_TTL_SECONDS", 300)
+
+# booking_summary read model for admin dashboards, kept in step with every
+# transition; rebuild with rebuild_summary.py after turning it back on
+BOOKING_SUMMARY_ENABLED = _env_bool("BOOKING_SUMMARY_ENABLED", True)
@@ -1,16 +1,219 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import contextvars
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+from app.core import config
 
 # SQLite database URL
 # check_same_thread is set to False for SQLite
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={
+        "check_same_thread": False,
+        "timeout": config.SQLITE_BUSY_TIMEOUT_SECONDS,
+    },
 )
 
+# Cold storage for archived bookings, ATTACHed to every connection so hot and
+# archive tables can be moved between in a single transaction.
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_ENABLED = bool(config.ARCHIVE_DATABASE_PATH) and engine.dialect.name == "sqlite"
+
+
+def _attach_archive(bind, archive_path: str) -> None:
+    @event.listens_for(bind, "connect")
+    def _attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(
+            f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,)
+        )
+
+
+def shard_path(path: str, shard: int) -> str:
+    # ./sql_app.db -> ./sql_app_shard2.db (shard 0 keeps the original file)
+    if shard == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_shard{shard}{ext}"
+
+
+# Sharding: bookings, events and customers are partitioned across SHARD_COUNT
+# SQLite files by customer_id hash. Shard 0 is the main database, which also
+# holds the globally visible providers table. Booking (and event) IDs in shard
+# k start at k * SHARD_ID_SPAN, so a booking ID alone identifies its shard.
+SHARD_COUNT = max(1, config.SHARD_COUNT)
+SHARD_ID_SPAN = 1 << 40
+GLOBAL_TABLES = ("providers", "provider_working_hours")
+
+shard_engines = [engine] + [
+    create_engine(
+        f"sqlite:///{shard_path(engine.url.database, shard)}",
+        connect_args={
+            "check_same_thread": False,
+            "timeout": config.SQLITE_BUSY_TIMEOUT_SECONDS,
+        },
+    )
+    for shard in range(1, SHARD_COUNT)
+]
+
+if ARCHIVE_ENABLED:
+    for _shard, _engine in enumerate(shard_engines):
+        _attach_archive(_engine, shard_path(config.ARCHIVE_DATABASE_PATH, _shard))
+
+
 # Create a configurable Session class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
+
+_shard_sessionmakers = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    for shard_engine in shard_engines
+]
+_scatter_pool = ThreadPoolExecutor(max_workers=SHARD_COUNT, thread_name_prefix="shard")
+
+T = TypeVar("T")
+
+
+def shard_for_customer(customer_id: int) -> int:
+    """
+    Shard owning a customer's bookings. crc32 keeps it stable across processes.
+    """
+    if SHARD_COUNT == 1:
+        return 0
+    return zlib.crc32(str(customer_id).encode()) % SHARD_COUNT
+
+
+def shard_for_booking(booking_id: int) -> int:
+    """
+    Shard encoded in a booking ID. Unknown shards route to 0 (and 404 there).
+    """
+    shard = booking_id // SHARD_ID_SPAN
+    return shard if 0 <= shard < SHARD_COUNT else 0
+
+
+def shard_session(shard: int) -> Session:
+    """
+    Session for one shard. Providers and calendars always resolve to the main database.
+    """
+    from app.models.provider import Provider
+    from app.models.provider_working_hours import ProviderWorkingHours
+
+    return _shard_sessionmakers[shard](
+        binds={Provider: engine, ProviderWorkingHours: engine}, info={"shard": shard}
+    )
+
+
+def scatter(fn: Callable[[Session], T]) -> list[T]:
+    """
+    Runs `fn` with a session on every shard (in parallel) and returns the
+    results in shard order. `db.info["shard"]` tells `fn` which shard it is on. Each session is closed afterwards, so returned
+    ORM objects must already have everything they need loaded.
+    """
+
+    def run(shard: int) -> T:
+        with shard_session(shard) as db:
+            return fn(db)
+
+    if SHARD_COUNT == 1:
+        return [run(0)]
+    # Each shard runs in a copy of the caller's context (keeps trace spans nested)
+    futures = [
+        _scatter_pool.submit(contextvars.copy_context().run, run, shard)
+        for shard in range(SHARD_COUNT)
+    ]
+    return [future.result() for future in futures]
+
+
+def ensure_indexes(bind=engine, metadata: MetaData = None) -> None:
+    """
+    Creates indexes declared on models that are missing from existing tables.
+    `create_all` only creates indexes together with new tables.
+    """
+    metadata = metadata if metadata is not None else Base.metadata
+    inspector = inspect(bind)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def ensure_columns(bind=engine, metadata: MetaData = None) -> None:
+    """
+    Adds nullable model columns that are missing from existing tables.
+    Stand-in for migrations in dev; only handles additive, nullable changes.
+    """
+    metadata = metadata if metadata is not None else Base.metadata
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in inspector.get_table_names(schema=table.schema):
+                continue
+            existing = {
+                c["name"] for c in inspector.get_columns(table.name, schema=table.schema)
+            }
+            prefix = f'"{table.schema}".' if table.schema else ""
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {prefix}"{table.name}" '
+                    f'ADD COLUMN "{column.name}" {column_type}'
+                )
+
+
+def init_database(bind, shard: int = 0) -> None:
+    """
+    Creates or upgrades the schema of one shard (0 = main database).
+    """
+    from app.models.archive import archive_metadata
+    from app.models.booking_summary import create_summary_triggers
+    from app.models.search import SEARCHABLE_TABLES, create_search_indexes
+
+    tables = Base.metadata.sorted_tables
+    if shard > 0:
+        # Providers (and their calendars) are global and only live in the main database
+        tables = [t for t in tables if t.name not in GLOBAL_TABLES]
+    Base.metadata.create_all(bind=bind, tables=tables)
+    ensure_columns(bind=bind)
+    ensure_indexes(bind=bind)
+    # FTS5 name search over the customers/providers tables this shard holds
+    create_search_indexes(
+        bind, [t.name for t in tables if t.name in SEARCHABLE_TABLES]
+    )
+    # Customer/provider renames reach this shard's booking_summary rows
+    create_summary_triggers(bind, [t.name for t in tables])
+
+    if shard > 0:
+        # Start this shard's ID sequences at shard * SHARD_ID_SPAN
+        with bind.begin() as conn:
+            for table_name in ("bookings", "booking_events"):
+                params = {"name": table_name, "base": shard * SHARD_ID_SPAN}
+                conn.execute(
+                    text(
+                        "UPDATE sqlite_sequence SET seq = :base "
+                        "WHERE name = :name AND seq < :base"
+                    ),
+                    params,
+                )
+                conn.execute(
+                    text(
+                        "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :base "
+                        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                    ),
+                    params,
+                )
+
+    if ARCHIVE_ENABLED:
+        archive_metadata.create_all(bind=bind)
+        ensure_columns(bind=bind, metadata=archive_metadata)
+        ensure_indexes(bind=bind, metadata=archive_metadata)
@@ -0,0 +1,101 @@
+import heapq
+from typing import Any, Hashable, Iterator
+
+
+class IndexedHeap:
+    """
+    Binary min-heap of (key, item) with a position index, so an item's key can
+    be changed or the item removed in O(log n). Not thread-safe.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[Any, Hashable]] = []
+        self._pos: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._pos
+
+    def key(self, item: Hashable) -> Any:
+        return self._heap[self._pos[item]][0]
+
+    def push(self, item: Hashable, key: Any) -> None:
+        """
+        Inserts `item`, or moves it if it is already present.
+        """
+        if item in self._pos:
+            i = self._pos[item]
+            old_key = self._heap[i][0]
+            self._heap[i] = (key, item)
+            if key < old_key:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+            return
+        self._heap.append((key, item))
+        self._pos[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def remove(self, item: Hashable) -> None:
+        i = self._pos.pop(item, None)
+        if i is None:
+            return
+        last = self._heap.pop()
+        if i == len(self._heap):
+            return
+        self._heap[i] = last
+        self._pos[last[1]] = i
+        self._sift_up(i)
+        self._sift_down(self._pos[last[1]])
+
+    def peek(self, n: int) -> Iterator[tuple[Any, Hashable]]:
+        """
+        Yields the `n` smallest entries in order without removing them,
+        in O(n log n) regardless of the heap size.
+        """
+        heap = self._heap
+        if not heap or n <= 0:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier and n > 0:
+            entry, i = heapq.heappop(frontier)
+            yield entry
+            n -= 1
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._pos.clear()
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][1]] = i
+        self._pos[heap[j][1]] = j
+
+    def _sift_up(self, i: int) -> None:
+        heap = self._heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i] < heap[parent]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i: int) -> None:
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and heap[child] < heap[smallest]:
+                    smallest = child
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
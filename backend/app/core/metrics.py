@@ -0,0 +1,43 @@
+import threading
+
+# Minimal in-process metrics registry.
+# Counters only ever go up; gauges hold the last reported value.
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+
+
+def incr(name: str, amount: float = 1) -> None:
+    """
+    Increments a counter, creating it on first use.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name: str, value: float) -> None:
+    """
+    Sets a gauge to its latest value.
+    """
+    with _lock:
+        _gauges[name] = value
+
+
+def get_counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> dict:
+    """
+    Returns a point-in-time copy of all metrics.
+    """
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
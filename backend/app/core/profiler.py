@@ -0,0 +1,305 @@
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+
+from app.core import config, metrics
+
+# Sampling wall-clock profiler, off unless PROFILER_ENABLED is set.
+# ProfilerMiddleware picks the requests to profile; ProfiledRoute marks the
+# thread running their endpoint; a sampler thread reads those threads' stacks
+# with sys._current_frames() and counts them per route as collapsed stacks
+# ("outer;inner;leaf <count>", the input of flamegraph.pl and speedscope).
+
+# Set by the middleware for selected requests; copied into the worker thread
+_selected: ContextVar[bool] = ContextVar("profiler_selected", default=False)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Profiler:
+    """
+    One capture at a time: which requests to sample, the threads currently
+    running a sampled endpoint, and the stacks collected per route.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.sample_rate = 0.0
+        self.routes: tuple[str, ...] = ()
+        self.interval = config.PROFILER_INTERVAL_MS / 1000
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        # thread ident -> (route key, endpoint code object the stack is cut at)
+        self._threads: dict[int, tuple[str, object]] = {}
+        self._stacks: dict[str, Counter] = {}
+        self._requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # Capture control (admin endpoints)
+
+    def start(
+        self,
+        sample_rate: float,
+        routes: list[str],
+        interval_ms: float,
+        duration_seconds: float,
+    ) -> dict:
+        """
+        Starts a fresh capture, discarding the previous results.
+        Raises 409 if the profiler is disabled or already capturing.
+        """
+        if not config.PROFILER_ENABLED:
+            raise HTTPException(
+                status_code=409,
+                detail="Profiler is disabled; start the server with PROFILER_ENABLED=1.",
+            )
+        with self._lock:
+            if self.active:
+                raise HTTPException(status_code=409, detail="A capture is already running.")
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+            self.routes = tuple(routes)
+            self.interval = max(interval_ms, 1) / 1000
+            self._stacks = {}
+            self._requests = Counter()
+            self.started_at = time.monotonic()
+            self.stopped_at = None
+            self.deadline = self.started_at + min(
+                duration_seconds, config.PROFILER_MAX_DURATION_SECONDS
+            )
+            self._stop.clear()
+            self.active = True
+        self._sampler = threading.Thread(
+            target=self._run, name="profiler-sampler", daemon=True
+        )
+        self._sampler.start()
+        metrics.incr("profiler.captures")
+        return self.status()
+
+    def stop(self) -> dict:
+        """
+        Ends the capture; the collected stacks stay downloadable.
+        """
+        self._stop.set()
+        sampler = self._sampler
+        if sampler is not None and sampler is not threading.current_thread():
+            sampler.join()
+        with self._lock:
+            if self.active:
+                self.active = False
+                self.stopped_at = time.monotonic()
+        return self.status()
+
+    def status(self) -> dict:
+        with self._lock:
+            end = time.monotonic() if self.active else self.stopped_at
+            return {
+                "enabled": config.PROFILER_ENABLED,
+                "active": self.active,
+                "sample_rate": self.sample_rate,
+                "routes": list(self.routes),
+                "interval_ms": round(self.interval * 1000, 3),
+                "elapsed_seconds": (
+                    round(end - self.started_at, 3) if self.started_at else None
+                ),
+                "remaining_seconds": (
+                    round(max(self.deadline - time.monotonic(), 0), 3)
+                    if self.active
+                    else None
+                ),
+                "per_route": {
+                    route: {
+                        "requests": self._requests[route],
+                        "samples": sum(self._stacks.get(route, {}).values()),
+                    }
+                    for route in sorted(self._requests)
+                },
+            }
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """
+        Collapsed stacks of one route, or of every route with the route as
+        the root frame. Raises 404 for a route with no samples.
+        """
+        with self._lock:
+            if route is not None:
+                if route not in self._stacks:
+                    raise HTTPException(
+                        status_code=404, detail=f"No samples for route '{route}'."
+                    )
+                items = list(self._stacks[route].items())
+            else:
+                items = [
+                    (f"{name};{stack}", count)
+                    for name, stacks in self._stacks.items()
+                    for stack, count in stacks.items()
+                ]
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(items))
+
+    # Request side
+
+    def select(self, scope: dict) -> bool:
+        """
+        Whether to sample this request: PROFILER_HEADER set, a path under one
+        of the capture's route prefixes, or the capture's sample rate.
+        """
+        if not self.active:
+            return False
+        if time.monotonic() >= self.deadline:
+            return False
+        header = config.PROFILER_HEADER.lower().encode()
+        for name, value in scope.get("headers", ()):
+            if name == header and value not in (b"", b"0"):
+                return True
+        path = scope["path"]
+        if any(path.startswith(prefix) for prefix in self.routes):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def enter(self, route: str, code) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = (route, code)
+            self._requests[route] += 1
+        return ident
+
+    def leave(self, ident: int) -> None:
+        with self._lock:
+            self._threads.pop(ident, None)
+
+    # Sampler thread
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if time.monotonic() >= self.deadline:
+                with self._lock:
+                    self.active = False
+                    self.stopped_at = time.monotonic()
+                return
+            self._sample()
+
+    def _sample(self):
+        with self._lock:
+            threads = list(self._threads.items())
+        if not threads:
+            return
+        frames = sys._current_frames()
+        samples = []
+        for ident, (route, code) in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                samples.append((route, _collapse(frame, code)))
+        with self._lock:
+            for route, stack in samples:
+                if stack:
+                    self._stacks.setdefault(route, Counter())[stack] += 1
+        metrics.incr("profiler.samples", len(samples))
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_BACKEND_DIR):
+        filename = os.path.relpath(filename, _BACKEND_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame, root_code) -> str:
+    """
+    "outer;...;leaf" from the endpoint down; frames above it (threadpool,
+    FastAPI plumbing) are left out.
+    """
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+profiler = Profiler()
+
+
+class ProfilerMiddleware:
+    """
+    Marks selected requests for the sampler. When no capture is running this
+    is one attribute check per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.active or not profiler.select(scope):
+            await self.app(scope, receive, send)
+            return
+        token = _selected.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _selected.reset(token)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose endpoint registers its thread with the profiler while it
+    runs a selected request. A plain APIRoute when PROFILER_ENABLED is off.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if config.PROFILER_ENABLED:
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _profiled(endpoint):
+    # The signature is read through __wrapped__, so dependencies are unchanged.
+    # Some FastAPI versions re-create included routes: wrap the original once.
+    endpoint = getattr(endpoint, "__profiled__", endpoint)
+    code = endpoint.__code__
+    # Keyed by endpoint ("bookings.get_booking"): the router prefix is not known here
+    route = f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            if not _selected.get():
+                return await endpoint(*args, **kwargs)
+            # Shares the event loop thread: samples may include other coroutines
+            ident = profiler.enter(route, code)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.leave(ident)
+
+        async_wrapper.__profiled__ = endpoint
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        if not _selected.get():
+            return endpoint(*args, **kwargs)
+        ident = profiler.enter(route, code)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.leave(ident)
+
+    wrapper.__profiled__ = endpoint
+    return wrapper
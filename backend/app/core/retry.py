@@ -0,0 +1,83 @@
+import functools
+import random
+import time
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+
+T = TypeVar("T")
+
+# Primary result codes (extended codes carry them in the low byte)
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+# Postgres serialization failure / deadlock detected
+_PG_RETRYABLE = ("40001", "40P01")
+
+
+def backoff_seconds(attempt: int, base: float, cap: float) -> float:
+    """
+    Capped exponential backoff with full jitter for the given 1-based attempt.
+    """
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def is_retryable(exc: OperationalError) -> bool:
+    """
+    True only for lock/busy errors, where re-running the transaction is safe.
+    """
+    orig = exc.orig
+    code = getattr(orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (_SQLITE_BUSY, _SQLITE_LOCKED)
+    if getattr(orig, "pgcode", None) in _PG_RETRYABLE:
+        return True
+    return "database is locked" in str(orig).lower()
+
+
+def retry_on_lock(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Re-runs a service unit of work `fn(db, ...)` when it fails on lock
+    contention. The session is rolled back and `fn` starts over, so every
+    read and validation is repeated. Gives up with 503 after
+    DB_RETRY_MAX_ATTEMPTS retries or DB_RETRY_DEADLINE_SECONDS.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(db: Session, *args, **kwargs) -> T:
+        deadline = time.monotonic() + config.DB_RETRY_DEADLINE_SECONDS
+        attempt = 0
+        while True:
+            try:
+                result = fn(db, *args, **kwargs)
+            except OperationalError as e:
+                db.rollback()
+                if not is_retryable(e):
+                    raise
+                attempt += 1
+                delay = backoff_seconds(
+                    attempt,
+                    config.DB_RETRY_BACKOFF_BASE_SECONDS,
+                    config.DB_RETRY_BACKOFF_MAX_SECONDS,
+                )
+                if (
+                    attempt > config.DB_RETRY_MAX_ATTEMPTS
+                    or time.monotonic() + delay > deadline
+                ):
+                    metrics.incr("db.retry.gave_up")
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Database is busy, retry later.",
+                        headers={"Retry-After": "1"},
+                    ) from e
+                metrics.incr("db.retry.retries")
+                time.sleep(delay)
+                continue
+            if attempt:
+                metrics.incr("db.retry.recovered")
+            return result
+
+    return wrapper
@@ -0,0 +1,50 @@
+from typing import Any
+
+from fastapi.datastructures import Default
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by pydantic-core's Rust encoder instead of json.dumps.
+    Output matches JSONResponse for JSON-compatible content (compact separators,
+    non-ASCII kept as UTF-8). Pre-encoded bytes are sent as they are.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+# App-wide default. Wrapped in Default() so FastAPI keeps its own dump_json
+# fast path for routes with a response_model.
+DEFAULT_RESPONSE_CLASS = Default(FastJSONResponse)
+
+
+class Serializer:
+    """
+    A response type's TypeAdapter, built once: validates endpoint results
+    (ORM objects or dicts) and dumps them straight to JSON bytes.
+    """
+
+    def __init__(self, response_type: Any):
+        self.adapter = TypeAdapter(response_type)
+
+    def dump(self, value: Any, **dump_options) -> bytes:
+        return self.adapter.dump_json(
+            self.adapter.validate_python(value, from_attributes=True), **dump_options
+        )
+
+    def response(
+        self, value: Any, status_code: int = 200, **dump_options
+    ) -> FastJSONResponse:
+        """
+        The finished response. Validation and encoding run in the calling
+        (worker) thread instead of a second threadpool hop plus the event loop.
+        """
+        return FastJSONResponse(
+            self.dump(value, **dump_options), status_code=status_code
+        )
@@ -0,0 +1,270 @@
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+
+T = TypeVar("T")
+
+# Local request tracing, off unless TRACING_ENABLED is set.
+# TracingMiddleware opens a root span for sampled requests; @traced service
+# functions, SQL statements and session commits open child spans. Finished
+# spans are buffered in memory and appended to TRACE_FILE by the
+# "trace-exporter" worker, in the Trace Event Format read by Perfetto
+# (ui.perfetto.dev) and chrome://tracing: one "complete" event per span,
+# with trace/span/parent IDs in its args.
+
+TRACE_ID_HEADER = "X-Trace-Id"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Innermost open span of the current request; None when it is not sampled.
+# Copied into threadpool workers, so endpoint and service spans nest under it.
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "category",
+        "attributes",
+        "start_us",
+        "start_ns",
+    )
+
+    def __init__(
+        self,
+        trace_id: str,
+        parent_id: Optional[str],
+        name: str,
+        category: str,
+        attributes: Optional[dict] = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.attributes = attributes or {}
+        self.start_us = time.time_ns() // 1000
+        self.start_ns = time.perf_counter_ns()
+
+    def child(self, name: str, category: str, attributes: Optional[dict] = None) -> "Span":
+        return Span(self.trace_id, self.span_id, name, category, attributes)
+
+    def end(self) -> None:
+        exporter.add(
+            {
+                "name": self.name,
+                "cat": self.category,
+                "ph": "X",
+                "ts": self.start_us,
+                "dur": (time.perf_counter_ns() - self.start_ns) // 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {
+                    "trace_id": self.trace_id,
+                    "span_id": self.span_id,
+                    "parent_id": self.parent_id,
+                    **self.attributes,
+                },
+            }
+        )
+
+
+class TraceExporter:
+    """
+    Bounded buffer of finished spans, appended to TRACE_FILE on flush.
+    Spans beyond TRACE_MAX_BUFFERED_SPANS are dropped, never blocked on.
+    """
+
+    def __init__(self):
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+
+    def add(self, event: dict) -> None:
+        if len(self._buffer) >= config.TRACE_MAX_BUFFERED_SPANS:
+            metrics.incr("tracing.spans.dropped")
+            return
+        self._buffer.append(event)
+
+    def flush(self) -> int:
+        """
+        Writes out every buffered span. Returns the number written.
+        """
+        with self._lock:
+            events = []
+            while self._buffer:
+                events.append(self._buffer.popleft())
+            if not events:
+                return 0
+            new_file = (
+                not os.path.exists(config.TRACE_FILE)
+                or os.path.getsize(config.TRACE_FILE) == 0
+            )
+            with open(config.TRACE_FILE, "a", encoding="utf-8") as f:
+                # The format allows the closing "]" to be left off, so the file stays appendable
+                if new_file:
+                    f.write("[\n")
+                f.writelines(json.dumps(e, default=str) + ",\n" for e in events)
+        metrics.incr("tracing.spans.exported", len(events))
+        return len(events)
+
+
+exporter = TraceExporter()
+
+
+def traced(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Runs `fn` in a child span named after it when the request is sampled.
+    Put it above @retry_on_lock so the span covers every attempt.
+    """
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs) -> T:
+        parent = _current.get()
+        if parent is None:
+            return fn(*args, **kwargs)
+        span = parent.child(name, "service")
+        token = _current.set(span)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    return wrapper
+
+
+# SQL statements and commits
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if parent is not None:
+        context._trace_span = parent.child(
+            statement.split(None, 1)[0].upper() if statement else "SQL",
+            "sql",
+            {"db.statement": statement[: config.TRACE_MAX_STATEMENT_LENGTH]},
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.attributes["db.rows"] = cursor.rowcount
+        span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.attributes["error"] = repr(exception_context.original_exception)
+        span.end()
+
+
+def _before_commit(session):
+    parent = _current.get()
+    if parent is not None:
+        # Covers the flush and the database commit
+        session.info["_trace_commit"] = parent.child("session.commit", "sql")
+
+
+def _end_commit(session):
+    span = session.info.pop("_trace_commit", None)
+    if span is not None:
+        span.end()
+
+
+def instrument_engines(engines) -> None:
+    for bind in engines:
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+        event.listen(bind, "handle_error", _handle_error)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _end_commit)
+    event.listen(Session, "after_rollback", _end_commit)
+
+
+# HTTP requests
+
+
+def _incoming_parent(scope: dict) -> tuple[Optional[str], Optional[str], bool]:
+    """
+    (trace ID, parent span ID, sampled) from a W3C traceparent header, if any.
+    """
+    for name, value in scope.get("headers", ()):
+        if name == b"traceparent":
+            match = _TRACEPARENT.match(value.decode("latin-1").strip().lower())
+            if match:
+                trace_id, parent_id, flags = match.groups()
+                return trace_id, parent_id, bool(int(flags, 16) & 1)
+    return None, None, False
+
+
+class TracingMiddleware:
+    """
+    Gives every request a trace ID, returned in the X-Trace-Id header.
+    Requests sampled upstream (traceparent) or at TRACE_SAMPLE_RATE get a
+    root span; the rest only pay for the ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, sampled = _incoming_parent(scope)
+        if trace_id is None:
+            trace_id = f"{random.getrandbits(128):032x}"
+            sampled = random.random() < config.TRACE_SAMPLE_RATE
+        header = (TRACE_ID_HEADER.lower().encode(), trace_id.encode())
+        status = {}
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        if not sampled:
+            await self.app(scope, receive, send_with_trace_id)
+            return
+
+        span = Span(
+            trace_id,
+            parent_id,
+            f"{scope['method']} {scope['path']}",
+            "http",
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        token = _current.set(span)
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            _current.reset(token)
+            span.attributes["http.status_code"] = status.get("code")
+            route = scope.get("route")
+            if route is not None:
+                span.attributes["http.route"] = getattr(route, "path", None)
+            span.end()
+            metrics.incr("tracing.requests.sampled")
@@ -1,31 +1,177 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.core.database import engine, Base
+from app.core import capture, config, tracing
+from app.core.background import (
+    PeriodicWorker,
+    register_worker,
+    start_workers,
+    stop_workers,
+)
+from app.core.database import (
+    ARCHIVE_ENABLED,
+    init_database,
+    scatter,
+    shard_engines,
+)
+from app.core.serialization import DEFAULT_RESPONSE_CLASS
 
 # Import models to ensure they are registered with Base.metadata
 from app.models.customer import Customer
 from app.models.provider import Provider
+from app.models.provider_working_hours import ProviderWorkingHours
 from app.models.booking import Booking
 from app.models.booking_event import BookingEvent
+from app.models.booking_summary import BookingSummary
+from app.models.consistency_violation import ConsistencyViolation
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.outbox_message import OutboxMessage
 
 # Create tables on startup (for Phase 1 simplicity, no migrations yet)
-Base.metadata.create_all(bind=engine)
+for shard, shard_engine in enumerate(shard_engines):
+    init_database(shard_engine, shard)
+
+from app.services import (
+    archive_service,
+    auditor_service,
+    outbox_service,
+    provider_stats_service,
+    queue_service,
+    summary_service,
+    sweeper_service,
+)
+from app.services.intake_service import booking_intake
+
+if config.SWEEPER_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "assignment-sweeper",
+            config.SWEEPER_INTERVAL_SECONDS,
+            sweeper_service.run_sweep,
+        )
+    )
+
+if config.AUDITOR_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "consistency-auditor",
+            config.AUDITOR_INTERVAL_SECONDS,
+            auditor_service.run_audit,
+        )
+    )
+
+if config.ARCHIVER_ENABLED and ARCHIVE_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "booking-archiver",
+            config.ARCHIVER_INTERVAL_SECONDS,
+            archive_service.run_archiver,
+        )
+    )
+
+if config.TRACING_ENABLED:
+    tracing.instrument_engines(shard_engines)
+    register_worker(
+        PeriodicWorker(
+            "trace-exporter",
+            config.TRACE_FLUSH_INTERVAL_SECONDS,
+            tracing.exporter.flush,
+        )
+    )
+
+if config.CAPTURE_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "traffic-capture",
+            config.CAPTURE_FLUSH_INTERVAL_SECONDS,
+            capture.writer.flush,
+        )
+    )
+
+if config.INTAKE_ASYNC_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "booking-intake",
+            config.INTAKE_FLUSH_INTERVAL_SECONDS,
+            booking_intake.run_writer,
+        )
+    )
+
+if config.PROVIDER_STATS_ENABLED:
+    register_worker(
+        PeriodicWorker(
+            "provider-stats",
+            config.PROVIDER_STATS_REFRESH_SECONDS,
+            provider_stats_service.provider_stats.refresh,
+        )
+    )
+
+if config.OUTBOX_ENABLED and config.WEBHOOK_TARGETS:
+    register_worker(
+        PeriodicWorker(
+            "outbox-dispatcher",
+            config.OUTBOX_INTERVAL_SECONDS,
+            outbox_service.run_dispatcher,
+        )
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Persist bookings journaled but not inserted before the last shutdown
+    if booking_intake.recover():
+        booking_intake.run_writer()
+    # Fill booking_summary on shards that have bookings but no summary rows yet
+    if config.BOOKING_SUMMARY_ENABLED:
+        scatter(summary_service.backfill)
+    # Rebuild the in-memory dispatch queue before serving traffic
+    queue_service.pending_queue.refresh()
+    # Background workers live for the lifetime of the server process
+    start_workers()
+    yield
+    stop_workers()
+    if config.INTAKE_ASYNC_ENABLED:
+        booking_intake.run_writer()
+    if config.TRACING_ENABLED:
+        tracing.exporter.flush()
+    if config.CAPTURE_ENABLED:
+        capture.writer.flush()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=DEFAULT_RESPONSE_CLASS)
 
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.capture import CaptureMiddleware
+from app.core.profiler import ProfilerMiddleware
+from app.core.tracing import TRACE_ID_HEADER, TracingMiddleware
 
+if config.PROFILER_ENABLED:
+    # Innermost: shed and rate-limited requests are never sampled
+    app.add_middleware(ProfilerMiddleware)
+# Added first so it runs inside CORS: rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+if config.TRACING_ENABLED:
+    # Outside admission control, so shed requests still get a trace ID
+    app.add_middleware(TracingMiddleware)
+if config.CAPTURE_ENABLED:
+    # Outermost: records the status clients actually got, 429/503 included
+    app.add_middleware(CaptureMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[TRACE_ID_HEADER],  # Readable by browser clients
 )
 
-from app.api import bookings, providers
+from app.api import admin, bookings, providers, sync
 
 app.include_router(bookings.router, prefix="/bookings", tags=["bookings"])
 app.include_router(providers.router, tags=["providers"])
+app.include_router(admin.router, tags=["admin"])
+app.include_router(sync.router, tags=["sync"])
 
 
 @app.get("/health")
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Index, MetaData, Table
+
+from app.core.database import ARCHIVE_SCHEMA
+from app.models.booking import Booking
+from app.models.booking_event import BookingEvent
+
+# Archive copies of the hot tables, living in the ATTACHed archive database.
+# Kept out of Base.metadata so create_all on the main database never touches them.
+archive_metadata = MetaData()
+
+
+def _archive_copy(table: Table) -> Table:
+    """
+    Same columns and indexes as `table`, minus foreign keys: SQLite cannot
+    reference tables in another database file.
+    """
+    archived = Table(
+        table.name,
+        archive_metadata,
+        *[
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in table.columns
+        ],
+        schema=ARCHIVE_SCHEMA,
+    )
+    for index in table.indexes:
+        Index(index.name, *[archived.c[c.name] for c in index.columns])
+    return archived
+
+
+archived_bookings = _archive_copy(Booking.__table__)
+archived_booking_events = _archive_copy(BookingEvent.__table__)
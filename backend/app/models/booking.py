@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Enum, DateTime, Float, Index, String
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.models.base import TimestampMixin
@@ -17,12 +17,36 @@ class BookingStatus(str, enum.Enum):
 
 class Booking(Base, TimestampMixin):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Lets the timeout sweeper find stale ASSIGNED/IN_PROGRESS rows without a scan
+        Index("ix_bookings_status_updated_at", "status", "updated_at"),
+        # Busy checks and per-provider lookups
+        Index("ix_bookings_provider_id_status", "provider_id", "status"),
+        # Per-customer listings and delta sync
+        Index("ix_bookings_customer_id", "customer_id"),
+        # Never reuse IDs (archived bookings, shard ID ranges); new tables only
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     provider_id = Column(Integer, ForeignKey("providers.id"), nullable=True)
     status = Column(Enum(BookingStatus), default=BookingStatus.PENDING, nullable=False)
 
+    # Requested service window (UTC). NULL for immediate, unscheduled bookings.
+    scheduled_start = Column(DateTime, nullable=True)
+    scheduled_end = Column(DateTime, nullable=True)
+
+    # Dispatch urgency: higher priority first, then the earliest deadline.
+    # NULL priority (rows older than the column) counts as 0.
+    priority = Column(Integer, nullable=True, default=0)
+    dispatch_deadline = Column(DateTime, nullable=True)
+
+    # Matching requirements: skill the provider must have, and service location
+    required_skill = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
     # Relationships
     customer = relationship("Customer", back_populates="bookings")
     provider = relationship("Provider", back_populates="bookings")
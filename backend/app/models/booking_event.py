@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, ForeignKey, Enum, String
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Index, String
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.models.base import TimestampMixin
@@ -15,9 +15,17 @@ class ActorRole(str, enum.Enum):
 
 class BookingEvent(Base, TimestampMixin):
     __tablename__ = "booking_events"
+    __table_args__ = (
+        # Delta sync: every booking a provider has ever held
+        Index("ix_booking_events_provider_id", "provider_id"),
+        # Never reuse IDs (archived events, shard ID ranges); new tables only
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False)
+    booking_id = Column(
+        Integer, ForeignKey("bookings.id"), nullable=False, index=True
+    )
 
     from_status = Column(Enum(BookingStatus), nullable=True)
     to_status = Column(Enum(BookingStatus), nullable=False)
@@ -27,5 +35,10 @@ class BookingEvent(Base, TimestampMixin):
         Integer, nullable=True
     )  # Nullable because SYSTEM or ADMIN might not have an ID in this context yet
 
+    # Provider holding the booking after this transition (None once released).
+    # Makes the log sufficient to rebuild bookings.provider_id on replay.
+    # NULL on events written before the column existed.
+    provider_id = Column(Integer, nullable=True)
+
     # Relationship
     booking = relationship("Booking", back_populates="events")
@@ -0,0 +1,68 @@
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String, text
+from app.core.database import Base
+from app.models.booking import BookingStatus
+from app.models.booking_event import ActorRole
+
+
+class BookingSummary(Base):
+    """
+    Denormalized admin dashboard row per live booking (read model).
+    Written by summary_service, in the transaction of each transition, and by
+    the rename triggers below; rebuild with rebuild_summary.py.
+    """
+
+    __tablename__ = "booking_summary"
+    __table_args__ = (
+        # Dashboard lists, newest activity first, optionally by status/provider/customer.
+        # The primary key is the rowid, so each index is also ordered by booking_id.
+        Index("ix_booking_summary_last_transition_at", "last_transition_at"),
+        Index("ix_booking_summary_status_last", "status", "last_transition_at"),
+        Index("ix_booking_summary_provider_last", "provider_id", "last_transition_at"),
+        Index("ix_booking_summary_customer_last", "customer_id", "last_transition_at"),
+    )
+
+    booking_id = Column(Integer, primary_key=True, autoincrement=False)
+    customer_id = Column(Integer, nullable=False)
+    customer_name = Column(String, nullable=True)
+    provider_id = Column(Integer, nullable=True)
+    provider_name = Column(String, nullable=True)
+    status = Column(Enum(BookingStatus), nullable=False)
+    priority = Column(Integer, nullable=True)
+    scheduled_start = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+    last_transition_at = Column(DateTime, nullable=False)
+    last_actor_role = Column(Enum(ActorRole), nullable=False)
+    last_actor_id = Column(Integer, nullable=True)
+    # REJECTED/FAILED -> PENDING transitions (manual, bulk or sweeper auto-retry)
+    retries = Column(Integer, nullable=False, default=0)
+    transitions = Column(Integer, nullable=False, default=0)
+
+
+# Renames reach existing rows through triggers on the name tables, like the
+# FTS5 name indexes (app/models/search.py). Customers share a shard with their
+# bookings; providers live in the main database, so on other shards a provider
+# rename shows on the booking's next transition or after rebuild_summary.py.
+_NAME_COLUMNS = {
+    "customers": ("customer_name", "customer_id"),
+    "providers": ("provider_name", "provider_id"),
+}
+
+
+def create_summary_triggers(bind, tables: list[str]) -> None:
+    """
+    Creates the missing rename triggers for the name tables this shard holds.
+    """
+    with bind.begin() as conn:
+        for table in tables:
+            if table not in _NAME_COLUMNS:
+                continue
+            name_column, id_column = _NAME_COLUMNS[table]
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_summary_au "
+                    f"AFTER UPDATE OF name ON {table} BEGIN "
+                    f"UPDATE booking_summary SET {name_column} = new.name "
+                    f"WHERE {id_column} = new.id; END"
+                )
+            )
@@ -0,0 +1,25 @@
+import enum
+from sqlalchemy import Column, Integer, Enum, String, DateTime, Index
+from app.core.database import Base
+from app.models.base import TimestampMixin
+
+
+class ViolationKind(str, enum.Enum):
+    STATUS_EVENT_MISMATCH = "STATUS_EVENT_MISMATCH"
+    PROVIDER_DOUBLE_BOOKED = "PROVIDER_DOUBLE_BOOKED"
+    TERMINAL_WITH_PROVIDER = "TERMINAL_WITH_PROVIDER"
+
+
+class ConsistencyViolation(Base, TimestampMixin):
+    __tablename__ = "consistency_violations"
+    __table_args__ = (
+        # Open violations per subject, for de-duplication and resolution
+        Index("ix_consistency_violations_open", "resolved_at", "kind", "booking_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(Enum(ViolationKind), nullable=False)
+    booking_id = Column(Integer, nullable=True)  # Set for booking-level invariants
+    provider_id = Column(Integer, nullable=True)  # Set for provider-level invariants
+    detail = Column(String, nullable=False)
+    resolved_at = Column(DateTime, nullable=True)  # NULL while still violated
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+from app.models.base import TimestampMixin
+
+
+class JobCheckpoint(Base, TimestampMixin):
+    """
+    High-water mark into booking_events for incremental background jobs.
+    """
+
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
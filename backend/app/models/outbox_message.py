@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.database import Base
+from app.models.base import TimestampMixin
+
+
+class OutboxMessage(Base, TimestampMixin):
+    """
+    A booking event waiting to be delivered to the webhook targets.
+    Written in the same transaction as the event; deleted once delivered.
+    """
+
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # Due messages for the dispatcher
+        Index("ix_outbox_messages_due", "dead_at", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, nullable=False)  # No FK: events may be archived
+    booking_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON body sent to every target
+
+    attempts = Column(Integer, nullable=False, default=0)
+    # Also used as a lease: claiming a message pushes this into the future
+    next_attempt_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    last_error = Column(String, nullable=True)
+    dead_at = Column(DateTime, nullable=True)  # Set after OUTBOX_MAX_ATTEMPTS
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Float, Integer, JSON, String
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.models.base import TimestampMixin
@@ -10,5 +10,15 @@ class Provider(Base, TimestampMixin):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
 
+    # Matching profile (all optional): lowercase skill names, home location
+    # and how far the provider travels (NULL radius = no limit)
+    skills = Column(JSON, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    service_radius_km = Column(Float, nullable=True)
+
     # Relationship to bookings
     bookings = relationship("Booking", back_populates="provider")
+    working_hours = relationship(
+        "ProviderWorkingHours", back_populates="provider", cascade="all, delete-orphan"
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from app.models.base import TimestampMixin
+
+
+class ProviderWorkingHours(Base, TimestampMixin):
+    """
+    One working range of a provider's weekly calendar, in UTC minutes of the day.
+    A provider without any rows is available around the clock.
+    """
+
+    __tablename__ = "provider_working_hours"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider_id = Column(Integer, ForeignKey("providers.id"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_minute = Column(Integer, nullable=False)  # 0..1439
+    end_minute = Column(Integer, nullable=False)  # 1..1440, exclusive
+
+    provider = relationship("Provider", back_populates="working_hours")
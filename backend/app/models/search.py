@@ -0,0 +1,78 @@
+import enum
+
+from sqlalchemy import text
+
+# FTS5 name indexes over customers (every shard) and providers (main database).
+# Both are external-content tables: they store only the index and read names
+# from the base table. Triggers on the base table keep them in sync, so every
+# write path (ORM, bulk insert-ignore, seeding scripts) is covered.
+#
+# {table}_fts          words, diacritics folded, 2/3-char prefix indexes (prefix search)
+# {table}_fts_trigram  trigrams (substring and typo-tolerant search)
+# {table}_fts_trigram_vocab  rows containing each trigram (picks the rarest ones)
+
+SEARCHABLE_TABLES = ("customers", "providers")
+
+
+class SearchKind(str, enum.Enum):
+    CUSTOMER = "customer"
+    PROVIDER = "provider"
+
+
+_INDEXES = {
+    "fts": "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'",
+    "fts_trigram": "tokenize = 'trigram'",
+}
+
+
+def index_name(table: str, kind: str) -> str:
+    return f"{table}_{kind}"
+
+
+def _ddl(table: str) -> list[str]:
+    statements = [
+        f"CREATE VIRTUAL TABLE {index_name(table, kind)} USING fts5("
+        f"name, content = '{table}', content_rowid = 'id', {options})"
+        for kind, options in _INDEXES.items()
+    ]
+    trigrams = index_name(table, "fts_trigram")
+    statements.append(
+        f"CREATE VIRTUAL TABLE {trigrams}_vocab USING fts5vocab({trigrams}, row)"
+    )
+    inserts = "".join(
+        f"INSERT INTO {index_name(table, kind)} (rowid, name) VALUES (new.id, new.name);"
+        for kind in _INDEXES
+    )
+    deletes = "".join(
+        f"INSERT INTO {index_name(table, kind)} ({index_name(table, kind)}, rowid, name) "
+        f"VALUES ('delete', old.id, old.name);"
+        for kind in _INDEXES
+    )
+    statements += [
+        f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN {inserts} END",
+        f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {deletes} END",
+        f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF name ON {table} "
+        f"BEGIN {deletes}{inserts} END",
+    ]
+    return statements
+
+
+def create_search_indexes(bind, tables: list[str]) -> None:
+    """
+    Creates missing name indexes and their triggers, and fills new indexes
+    from rows already in the table.
+    """
+    with bind.begin() as conn:
+        existing = set(
+            conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            ).scalars()
+        )
+        for table in tables:
+            if index_name(table, "fts") in existing:
+                continue
+            for statement in _ddl(table):
+                conn.exec_driver_sql(statement)
+            for kind in _INDEXES:
+                name = index_name(table, kind)
+                conn.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
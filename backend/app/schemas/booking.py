@@ -1,14 +1,27 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.core.config import MAX_REQUEST_PRIORITY
 from app.models.booking import BookingStatus
 from app.models.booking_event import ActorRole
+from app.models.consistency_violation import ViolationKind
+from app.models.search import SearchKind
 
 
 class CreateBookingRequest(BaseModel):
     customer_name: str
     actor_role: ActorRole
     actor_id: int
+    # Optional service window (UTC); omit both for an immediate booking
+    scheduled_start: Optional[datetime] = None
+    scheduled_end: Optional[datetime] = None
+    # Dispatch urgency; deadline defaults to scheduled_start for scheduled bookings
+    priority: int = Field(default=0, ge=0, le=MAX_REQUEST_PRIORITY)
+    dispatch_deadline: Optional[datetime] = None
+    # Matching: required provider skill and service location
+    required_skill: Optional[str] = None
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
 
 
 class BookingEventResponse(BaseModel):
@@ -18,6 +31,7 @@ class BookingEventResponse(BaseModel):
     to_status: BookingStatus
     actor_role: ActorRole
     actor_id: Optional[int]
+    provider_id: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -29,9 +43,184 @@ class BookingResponse(BaseModel):
     status: BookingStatus
     customer_id: int
     provider_id: Optional[int]
+    scheduled_start: Optional[datetime] = None
+    scheduled_end: Optional[datetime] = None
+    priority: Optional[int] = None
+    dispatch_deadline: Optional[datetime] = None
+    required_skill: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     events: List[BookingEventResponse] = []
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class BookingIntakeResponse(BaseModel):
+    id: int
+    # QUEUED until the intake writer has inserted it
+    status: str
+    location: str
+
+
+class SearchHitResponse(BaseModel):
+    kind: SearchKind
+    id: int
+    name: str
+    # Similarity to the query, 0-1: higher is a better match (see search_service)
+    score: float
+    # PENDING, ASSIGNED and IN_PROGRESS bookings, on any shard
+    active_booking_ids: List[int]
+
+
+class SearchResponse(BaseModel):
+    query: str
+    fuzzy: bool
+    limit: int
+    offset: int
+    results: List[SearchHitResponse]
+
+
+class BookingSummaryResponse(BaseModel):
+    booking_id: int
+    customer_id: int
+    customer_name: Optional[str] = None
+    provider_id: Optional[int] = None
+    provider_name: Optional[str] = None
+    status: BookingStatus
+    priority: Optional[int] = None
+    scheduled_start: Optional[datetime] = None
+    created_at: datetime
+    last_transition_at: datetime
+    last_actor_role: ActorRole
+    last_actor_id: Optional[int] = None
+    retries: int
+    transitions: int
+
+
+class BulkActionResponse(BaseModel):
+    action: str
+    matched: int
+    changed: int
+    skipped: Dict[str, int]
+
+
+class ConsistencyViolationResponse(BaseModel):
+    id: int
+    kind: ViolationKind
+    booking_id: Optional[int]
+    provider_id: Optional[int]
+    detail: str
+    created_at: datetime
+    updated_at: datetime
+    resolved_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class WorkingHoursEntry(BaseModel):
+    weekday: int  # 0 = Monday ... 6 = Sunday
+    start_minute: int  # UTC minutes of the day, inclusive
+    end_minute: int  # exclusive, up to 1440
+
+    class Config:
+        from_attributes = True
+
+
+class AvailableProvidersResponse(BaseModel):
+    start: datetime
+    end: datetime
+    count: int
+    provider_ids: List[int]
+
+
+class QueueEntryResponse(BaseModel):
+    booking_id: int
+    priority: int
+    dispatch_deadline: Optional[datetime]
+    queued_at: datetime
+
+
+class QueueStatsResponse(BaseModel):
+    depth: int
+    by_priority: Dict[int, int]
+    overdue: int
+    age_seconds: Dict[str, float]
+    oldest_booking_id: Optional[int]
+
+
+class ProviderStatsEntry(BaseModel):
+    provider_id: int
+    name: str
+    assigned: int
+    accepted: int
+    rejected: int
+    completed: int
+    # Of the bookings assigned in the window; None without assignments
+    acceptance_rate: Optional[float] = None
+    rejection_rate: Optional[float] = None
+    median_seconds_to_accept: Optional[float] = None
+    # ASSIGNED + IN_PROGRESS right now
+    active_bookings: int
+
+
+class ProviderStatsResponse(BaseModel):
+    generated_at: datetime
+    window_days: int
+    # Seconds since generated_at was computed
+    age_seconds: float
+    providers: List[ProviderStatsEntry]
+
+
+class ProviderCandidate(BaseModel):
+    provider_id: int
+    distance_km: float
+
+
+class CandidatesResponse(BaseModel):
+    booking_id: int
+    required_skill: Optional[str]
+    candidates: List[ProviderCandidate]
+
+
+class SyncBookingResponse(BaseModel):
+    # Compact mode only sends id, last_event_id and the mutable fields for
+    # bookings the client already has; new bookings are always sent in full.
+    id: int
+    last_event_id: int
+    status: Optional[BookingStatus] = None
+    customer_id: Optional[int] = None
+    provider_id: Optional[int] = None
+    scheduled_start: Optional[datetime] = None
+    scheduled_end: Optional[datetime] = None
+    priority: Optional[int] = None
+    dispatch_deadline: Optional[datetime] = None
+    required_skill: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class SyncResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    bookings: List[SyncBookingResponse]
+
+
+class TransitionResult(BaseModel):
+    booking_id: int
+    action: str
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    booking_status: Optional[BookingStatus] = None
+
+
+class TransitionBatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: List[TransitionResult]
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import ARCHIVE_ENABLED, scatter
+from app.core.retry import retry_on_lock
+from app.models.archive import archived_booking_events, archived_bookings
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import BookingEvent
+from app.services import summary_service
+
+# Only bookings that can never transition again are archived.
+# FAILED is retryable, but not once it is older than the retention window.
+ARCHIVABLE_STATUSES = (
+    BookingStatus.COMPLETED,
+    BookingStatus.CANCELLED,
+    BookingStatus.FAILED,
+)
+
+
+def _copy_rows(db: Session, source, target, where) -> None:
+    # Explicit column list, so the copy survives column order differences
+    columns = [c.name for c in target.columns]
+    db.execute(
+        insert(target).from_select(
+            columns, select(*[source.c[name] for name in columns]).where(where)
+        )
+    )
+
+
+@retry_on_lock
+def _archive_batch(db: Session, cutoff: datetime) -> tuple[int, int, int]:
+    """
+    Moves one batch in one transaction and commits. One retryable unit: a
+    lock error re-selects the batch from scratch.
+    Returns (candidates, bookings moved, events moved).
+    """
+    hot_bookings = Booking.__table__
+    hot_events = BookingEvent.__table__
+
+    # SQLite hands out max(rowid) + 1 for new rows, so the newest booking and
+    # the owner of the newest event stay hot; otherwise an archived ID
+    # could be reused.
+    newest_booking_id = db.scalar(select(func.max(Booking.id))) or 0
+    newest_event_owner = db.scalar(
+        select(BookingEvent.booking_id).order_by(BookingEvent.id.desc()).limit(1)
+    )
+    pinned = [newest_booking_id, newest_event_owner or 0]
+
+    # 1. Candidates via ix_bookings_status_updated_at
+    candidate_ids = db.scalars(
+        select(Booking.id)
+        .where(
+            Booking.status.in_(ARCHIVABLE_STATUSES),
+            Booking.updated_at < cutoff,
+            Booking.id.not_in(pinned),
+        )
+        .limit(config.ARCHIVE_BATCH_SIZE)
+    ).all()
+    if not candidate_ids:
+        return 0, 0, 0
+
+    # 2. Copy bookings, re-checking the predicate (a FAILED booking may have
+    # been retried since step 1), then copy exactly those bookings' events
+    _copy_rows(
+        db,
+        hot_bookings,
+        archived_bookings,
+        (hot_bookings.c.id.in_(candidate_ids))
+        & (hot_bookings.c.status.in_(ARCHIVABLE_STATUSES))
+        & (hot_bookings.c.updated_at < cutoff),
+    )
+    moved_ids = db.scalars(
+        select(archived_bookings.c.id).where(archived_bookings.c.id.in_(candidate_ids))
+    ).all()
+    if not moved_ids:
+        db.rollback()
+        return len(candidate_ids), 0, 0
+    _copy_rows(
+        db, hot_events, archived_booking_events, hot_events.c.booking_id.in_(moved_ids)
+    )
+
+    # 3. Drop them from the hot tables
+    events_moved = db.execute(
+        delete(hot_events).where(hot_events.c.booking_id.in_(moved_ids))
+    ).rowcount
+    db.execute(delete(hot_bookings).where(hot_bookings.c.id.in_(moved_ids)))
+    summary_service.forget(db, moved_ids)
+    db.commit()
+    return len(candidate_ids), len(moved_ids), events_moved
+
+
+def archive_terminal_bookings(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Moves terminal bookings older than ARCHIVE_RETENTION_DAYS, with their
+    events, into the archive database. One transaction per batch.
+    """
+    if not ARCHIVE_ENABLED:
+        return {"bookings_archived": 0, "events_archived": 0}
+
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = now - timedelta(days=config.ARCHIVE_RETENTION_DAYS)
+    result = {"bookings_archived": 0, "events_archived": 0}
+
+    while True:
+        candidates, bookings_moved, events_moved = _archive_batch(db, cutoff)
+        if not bookings_moved:
+            break
+        result["bookings_archived"] += bookings_moved
+        result["events_archived"] += events_moved
+        if candidates < config.ARCHIVE_BATCH_SIZE:
+            break
+
+    metrics.incr("archiver.bookings_archived", result["bookings_archived"])
+    metrics.incr("archiver.events_archived", result["events_archived"])
+    return result
+
+
+def get_archived_booking(db: Session, booking_id: int) -> Optional[Booking]:
+    """
+    Loads an archived booking with its events as transient (never added to the
+    session) ORM objects, so callers can serialize it like a live booking.
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+    row = (
+        db.execute(select(archived_bookings).where(archived_bookings.c.id == booking_id))
+        .mappings()
+        .first()
+    )
+    if row is None:
+        return None
+    events = (
+        db.execute(
+            select(archived_booking_events)
+            .where(archived_booking_events.c.booking_id == booking_id)
+            .order_by(archived_booking_events.c.created_at, archived_booking_events.c.id)
+        )
+        .mappings()
+        .all()
+    )
+    booking = Booking(**row)
+    booking.events = [BookingEvent(**event) for event in events]
+    return booking
+
+
+def is_archived(booking: Booking) -> bool:
+    """
+    True for bookings returned by `get_archived_booking`.
+    """
+    return inspect(booking).transient
+
+
+def run_archiver() -> list[dict]:
+    """
+    Entry point for the background worker. Runs on every shard.
+    """
+    return scatter(archive_terminal_bookings)
@@ -0,0 +1,347 @@
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import SHARD_COUNT, scatter, shard_session
+from app.core.retry import retry_on_lock
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import BookingEvent
+from app.models.consistency_violation import ConsistencyViolation, ViolationKind
+from app.services.checkpoint_service import get_checkpoint, set_checkpoint
+
+AUDITOR_JOB = "consistency-auditor"
+
+ACTIVE_STATUSES = (BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS)
+# COMPLETED keeps its provider as a historical record (see complete_booking)
+TERMINAL_STATUSES = (
+    BookingStatus.CANCELLED,
+    BookingStatus.FAILED,
+    BookingStatus.REJECTED,
+)
+BOOKING_KINDS = (
+    ViolationKind.STATUS_EVENT_MISMATCH,
+    ViolationKind.TERMINAL_WITH_PROVIDER,
+)
+
+# Serializes provider violation writes in the main database
+_provider_lock = threading.Lock()
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def _chunks(ids: list[int]):
+    for i in range(0, len(ids), _IN_CHUNK):
+        yield ids[i : i + _IN_CHUNK]
+
+
+def _check_bookings(db: Session, booking_ids: list[int]) -> tuple[dict, set[int]]:
+    """
+    Booking-level invariants. Returns (violations keyed by (kind, booking_id,
+    provider_id), current provider IDs of the checked bookings).
+    """
+    found: dict[tuple, str] = {}
+    providers: set[int] = set()
+    for ids in _chunks(booking_ids):
+        last_event = (
+            select(
+                BookingEvent.booking_id,
+                func.max(BookingEvent.id).label("last_id"),
+            )
+            .where(BookingEvent.booking_id.in_(ids))
+            .group_by(BookingEvent.booking_id)
+            .subquery()
+        )
+        rows = db.execute(
+            select(Booking.id, Booking.status, Booking.provider_id, BookingEvent.to_status)
+            .join(last_event, last_event.c.booking_id == Booking.id)
+            .join(BookingEvent, BookingEvent.id == last_event.c.last_id)
+            .where(Booking.id.in_(ids))
+        ).all()
+        for booking_id, status, provider_id, last_to_status in rows:
+            if provider_id is not None:
+                providers.add(provider_id)
+            if status != last_to_status:
+                found[(ViolationKind.STATUS_EVENT_MISMATCH, booking_id, None)] = (
+                    f"Booking status is {status.value} but last event is "
+                    f"{last_to_status.value}."
+                )
+            if status in TERMINAL_STATUSES and provider_id is not None:
+                found[(ViolationKind.TERMINAL_WITH_PROVIDER, booking_id, None)] = (
+                    f"{status.value} booking still holds provider {provider_id}."
+                )
+    return found, providers
+
+
+def _overlapping(windows: list[tuple]) -> list[int]:
+    """
+    IDs of bookings whose (start, end) windows overlap another in the list.
+    """
+    overlapping = set()
+    latest_end = None
+    latest_id = None
+    for start, end, booking_id in sorted(windows):
+        if latest_end is not None and start < latest_end:
+            overlapping.update((latest_id, booking_id))
+        if latest_end is None or end > latest_end:
+            latest_end, latest_id = end, booking_id
+    return sorted(overlapping)
+
+
+def _active_by_provider(db: Session, provider_ids: list[int]) -> list:
+    rows = []
+    for ids in _chunks(provider_ids):
+        rows.extend(
+            db.execute(
+                select(
+                    Booking.provider_id,
+                    Booking.id,
+                    Booking.status,
+                    Booking.scheduled_start,
+                    Booking.scheduled_end,
+                ).where(Booking.provider_id.in_(ids), Booking.status.in_(ACTIVE_STATUSES))
+            ).all()
+        )
+    return rows
+
+
+def _check_providers(provider_ids: list[int]) -> dict:
+    """
+    Provider-level invariants: at most one immediate (unscheduled or
+    IN_PROGRESS) active booking, and no overlapping scheduled windows.
+    A provider may hold bookings on any shard, so every shard is read.
+    """
+    found: dict[tuple, str] = {}
+    if not provider_ids:
+        return found
+    active: dict[int, list] = {}
+    # Shard by shard: this already runs inside run_audit's scatter() pool
+    for shard in range(SHARD_COUNT):
+        with shard_session(shard) as shard_db:
+            for row in _active_by_provider(shard_db, provider_ids):
+                active.setdefault(row.provider_id, []).append(row)
+    for provider_id, bookings in active.items():
+        problems = []
+        immediate = [
+            b.id
+            for b in bookings
+            if b.scheduled_start is None or b.status == BookingStatus.IN_PROGRESS
+        ]
+        if len(immediate) > 1:
+            problems.append(
+                f"Provider holds {len(immediate)} active bookings: {sorted(immediate)}."
+            )
+        overlapping = _overlapping(
+            [
+                (b.scheduled_start, b.scheduled_end, b.id)
+                for b in bookings
+                if b.scheduled_start is not None
+            ]
+        )
+        if overlapping:
+            problems.append(f"Overlapping scheduled bookings: {overlapping}.")
+        if problems:
+            found[(ViolationKind.PROVIDER_DOUBLE_BOOKED, None, provider_id)] = " ".join(
+                problems
+            )
+    return found
+
+
+def _reconcile(
+    db: Session,
+    booking_ids: list[int],
+    provider_ids: list[int],
+    found: dict,
+    now: datetime,
+) -> tuple[int, int]:
+    """
+    Syncs open violations for the checked subjects with what was found:
+    new ones are inserted, ones that no longer hold are resolved.
+    """
+    resolved = 0
+    scopes = [
+        (
+            ids,
+            ConsistencyViolation.kind.in_(BOOKING_KINDS),
+            ConsistencyViolation.booking_id,
+        )
+        for ids in _chunks(booking_ids)
+    ] + [
+        (
+            ids,
+            ConsistencyViolation.kind == ViolationKind.PROVIDER_DOUBLE_BOOKED,
+            ConsistencyViolation.provider_id,
+        )
+        for ids in _chunks(provider_ids)
+    ]
+    for ids, kind_filter, subject in scopes:
+        open_violations = db.scalars(
+            select(ConsistencyViolation).where(
+                ConsistencyViolation.resolved_at.is_(None),
+                kind_filter,
+                subject.in_(ids),
+            )
+        ).all()
+        for violation in open_violations:
+            key = (violation.kind, violation.booking_id, violation.provider_id)
+            detail = found.pop(key, None)
+            if detail is None:
+                violation.resolved_at = now
+                resolved += 1
+            else:
+                violation.detail = detail
+
+    for (kind, booking_id, provider_id), detail in found.items():
+        db.add(
+            ConsistencyViolation(
+                kind=kind, booking_id=booking_id, provider_id=provider_id, detail=detail
+            )
+        )
+    return len(found), resolved
+
+
+def _reconcile_providers(
+    provider_ids: list[int], found: dict, now: datetime
+) -> tuple[int, int]:
+    """
+    Provider violations span shards, so they are kept in the main database
+    only. Shards audited in parallel reconcile them one at a time.
+    """
+    with _provider_lock, shard_session(0) as main_db:
+        counts = _reconcile(main_db, [], provider_ids, found, now)
+        main_db.commit()
+    return counts
+
+
+@retry_on_lock
+def _audit_batch(db: Session, batch_size: int) -> Optional[dict]:
+    """
+    Audits the next batch of events after the checkpoint and commits; None
+    once caught up. One retryable unit: a lock error (on this shard or the
+    main database) re-reads the batch, and reconciling again is a no-op.
+    """
+    cursor = get_checkpoint(db, AUDITOR_JOB)
+
+    # 1. What changed since the checkpoint
+    events = db.execute(
+        select(BookingEvent.id, BookingEvent.booking_id, BookingEvent.provider_id)
+        .where(BookingEvent.id > cursor)
+        .order_by(BookingEvent.id)
+        .limit(batch_size)
+    ).all()
+    if not events:
+        return None
+    booking_ids = sorted({e.booking_id for e in events})
+    provider_ids = {e.provider_id for e in events if e.provider_id is not None}
+
+    # 2. Check invariants for the touched subjects only
+    found, current_providers = _check_bookings(db, booking_ids)
+    # Providers with an open double-booking are always re-checked: the
+    # event that releases one of their bookings no longer names them.
+    with shard_session(0) as main_db:
+        open_double_booked = main_db.scalars(
+            select(ConsistencyViolation.provider_id).where(
+                ConsistencyViolation.resolved_at.is_(None),
+                ConsistencyViolation.kind == ViolationKind.PROVIDER_DOUBLE_BOOKED,
+            )
+        ).all()
+    provider_ids = sorted(provider_ids | current_providers | set(open_double_booked))
+
+    # 3. Record provider violations, then record, resolve and advance the
+    # checkpoint in one transaction
+    now = datetime.now(timezone.utc)
+    provider_new, provider_resolved = _reconcile_providers(
+        provider_ids, _check_providers(provider_ids), now
+    )
+    new, resolved = _reconcile(db, booking_ids, [], found, now)
+    set_checkpoint(db, AUDITOR_JOB, events[-1].id)
+    db.commit()
+    return {
+        "events_scanned": len(events),
+        "bookings_checked": len(booking_ids),
+        "providers_checked": len(provider_ids),
+        "new_violations": new + provider_new,
+        "resolved": resolved + provider_resolved,
+    }
+
+
+def audit_incremental(db: Session, max_batches: Optional[int] = None) -> dict:
+    """
+    Checks invariants only for bookings (and their providers) touched by
+    events since the last checkpoint, one batch of events per transaction.
+    """
+    batch_size = config.AUDITOR_BATCH_EVENTS
+    result = {
+        "events_scanned": 0,
+        "bookings_checked": 0,
+        "providers_checked": 0,
+        "new_violations": 0,
+        "resolved": 0,
+    }
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = _audit_batch(db, batch_size)
+        if batch is None:
+            break
+        for key, count in batch.items():
+            result[key] += count
+        batches += 1
+        if batch["events_scanned"] < batch_size:
+            break
+
+    result["checkpoint"] = get_checkpoint(db, AUDITOR_JOB)
+    metrics.incr("auditor.events_scanned", result["events_scanned"])
+    metrics.incr("auditor.new_violations", result["new_violations"])
+    metrics.set_gauge(
+        "auditor.open_violations",
+        db.execute(
+            select(func.count(ConsistencyViolation.id)).where(
+                ConsistencyViolation.resolved_at.is_(None)
+            )
+        ).scalar(),
+    )
+    return result
+
+
+def list_violations(
+    db: Session, include_resolved: bool = False, limit: int = 100, offset: int = 0
+) -> list[ConsistencyViolation]:
+    """
+    Returns recorded violations, newest first.
+    """
+    query = select(ConsistencyViolation)
+    if not include_resolved:
+        query = query.where(ConsistencyViolation.resolved_at.is_(None))
+    return db.scalars(
+        query.order_by(ConsistencyViolation.id.desc()).limit(limit).offset(offset)
+    ).all()
+
+
+def list_violations_all_shards(
+    include_resolved: bool = False, limit: int = 100, offset: int = 0
+) -> list[ConsistencyViolation]:
+    """
+    Scatter-gather of `list_violations` across shards, newest first.
+    """
+    per_shard = scatter(
+        lambda db: list_violations(
+            db, include_resolved=include_resolved, limit=limit + offset
+        )
+    )
+    merged = sorted(
+        (v for shard in per_shard for v in shard),
+        key=lambda v: v.created_at,
+        reverse=True,
+    )
+    return merged[offset : offset + limit]
+
+
+def run_audit() -> list[dict]:
+    """
+    Entry point for the background worker. Runs on every shard.
+    """
+    return scatter(audit_incremental)
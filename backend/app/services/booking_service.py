@@ -1,85 +1,195 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from app.core import config
+from app.core.cache import BoundedSet
+from app.core.retry import retry_on_lock
+from app.core.tracing import traced
+from app.core.database import SHARD_COUNT, scatter
 from app.models.booking import Booking, BookingStatus
 from app.models.customer import Customer
 from app.models.booking_event import BookingEvent, ActorRole
 from app.models.provider import Provider
 from app.schemas.booking import CreateBookingRequest
+from app.services import archive_service, outbox_service, schedule_service
 
 
-def create_booking(db: Session, request: CreateBookingRequest) -> Booking:
+# Transition rules shared by the single-booking and bulk admin paths
+RETRYABLE_STATUSES = (BookingStatus.REJECTED, BookingStatus.FAILED)
+OVERRIDE_PROTECTED_STATUSES = (BookingStatus.COMPLETED,)
+
+
+def retry_priority():
     """
-    Creates a new booking for a customer.
-    Simulates identity by checking/creating the customer based on actor_id.
+    SQL expression for a booking's priority after a retry (set-based paths).
+    """
+    return func.coalesce(Booking.priority, 0) + config.RETRY_PRIORITY_BOOST
+
+
+# Customer IDs known to exist in the DB. Repeat customers skip the upsert entirely.
+# Customers are never deleted, so entries never go stale; the bound only caps memory.
+KNOWN_CUSTOMERS_MAX = 100_000
+_known_customers = BoundedSet(maxsize=KNOWN_CUSTOMERS_MAX)
+
+
+def _insert_ignore(db: Session, model):
+    """
+    Returns a dialect-specific INSERT for `model` that supports ON CONFLICT DO NOTHING.
+    """
+    if db.get_bind(mapper=model).dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+
+@traced
+def ensure_customer(db: Session, customer_id: int, name: str) -> None:
+    """
+    Makes sure a customer row exists without a read-then-write race.
+    Uses an atomic INSERT .. ON CONFLICT DO NOTHING, skipped for known customers.
+    The caller is responsible for committing and then calling `remember_customer`.
+    """
+    if customer_id in _known_customers:
+        return
+    db.execute(
+        _insert_ignore(db, Customer)
+        .values(id=customer_id, name=name)
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+
+
+def ensure_customers(db: Session, names: dict[int, str]) -> None:
+    """
+    Set-based `ensure_customer` for many customers (customer_id -> name).
+    """
+    missing = [
+        {"id": customer_id, "name": name}
+        for customer_id, name in names.items()
+        if customer_id not in _known_customers
+    ]
+    if missing:
+        db.execute(
+            _insert_ignore(db, Customer)
+            .values(missing)
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+
+
+def remember_customer(customer_id: int) -> None:
+    """
+    Records a customer as persisted. Only call after the upsert has committed.
+    """
+    _known_customers.add(customer_id)
+
+
+def new_booking_fields(request: CreateBookingRequest) -> dict:
+    """
+    Validated, normalized column values for a new booking.
+    Raises 403 for non-customers and 400 for a bad service window.
     """
-    # 1. Validate Role
     if request.actor_role != ActorRole.CUSTOMER:
         raise HTTPException(
             status_code=403, detail="Only customers can create bookings."
         )
+    scheduled_start, scheduled_end = schedule_service.validate_window(
+        request.scheduled_start, request.scheduled_end
+    )
+    dispatch_deadline = request.dispatch_deadline
+    if dispatch_deadline is not None:
+        dispatch_deadline = schedule_service.to_naive_utc(dispatch_deadline)
+    return {
+        "customer_id": request.actor_id,
+        "status": BookingStatus.PENDING,
+        "provider_id": None,  # No provider assigned yet
+        "scheduled_start": scheduled_start,
+        "scheduled_end": scheduled_end,
+        "priority": request.priority,
+        # A scheduled booking must be dispatched before its window starts
+        "dispatch_deadline": dispatch_deadline or scheduled_start,
+        "required_skill": (
+            request.required_skill.strip().lower() or None
+            if request.required_skill
+            else None
+        ),
+        "latitude": request.latitude,
+        "longitude": request.longitude,
+    }
+
+
+@traced
+@retry_on_lock
+def create_booking(db: Session, request: CreateBookingRequest) -> Booking:
+    """
+    Creates a new booking for a customer.
+    Simulates identity by upserting the customer based on actor_id.
+    """
+    # 1. Validate Role and window
+    fields = new_booking_fields(request)
 
-    # 2. Simulate Identity (Customer Lookup / Creation)
+    # 2. Simulate Identity (Customer Upsert)
     # in a real app, this would come from an Auth token
-    customer = db.query(Customer).filter(Customer.id == request.actor_id).first()
-    if not customer:
-        customer = Customer(id=request.actor_id, name=request.customer_name)
-        db.add(customer)
-        # Flush to ensure customer exists in simulation before booking references it
-        # (Though we provided ID manually so it's fine, but good practice)
-        db.flush()
-
-    # 3. Create Booking (PENDING state)
-    new_booking = Booking(
-        customer_id=customer.id,
-        status=BookingStatus.PENDING,
-        provider_id=None,  # No provider assigned yet
-    )
+    ensure_customer(db, request.actor_id, request.customer_name)
+
+    # 3. Create Booking (PENDING state), optionally for a future window
+    new_booking = Booking(**fields)
     db.add(new_booking)
-    db.flush()  # Flush to generate booking.id for the event
 
     # 4. Create Booking Event (Observability)
-    # Log the initial state transition (NULL -> PENDING)
+    # Log the initial state transition (NULL -> PENDING).
+    # Linked through the relationship so the unit of work fills in booking_id.
     event = BookingEvent(
-        booking_id=new_booking.id,
+        booking=new_booking,
         from_status=None,
         to_status=BookingStatus.PENDING,
         actor_role=ActorRole.CUSTOMER,
-        actor_id=customer.id,
+        actor_id=request.actor_id,
+        provider_id=None,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, request.actor_id)
 
     # 5. Commit Transaction
     db.commit()
+    remember_customer(request.actor_id)
     db.refresh(new_booking)
     return new_booking
 
 
+@traced
 def get_booking_by_id(db: Session, booking_id: int) -> Booking:
     """
-    Fetches a booking by ID. Raises 404 if not found.
+    Fetches a booking by ID, falling back to the archive. Raises 404 if not
+    found, 409 if it is still in the intake queue.
     """
+    # Checked first: the writer may persist it between a miss and the check.
+    # Imported here because intake_service imports this module.
+    from app.services.intake_service import raise_if_queued
+
+    raise_if_queued(booking_id)
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    if not booking:
+        booking = archive_service.get_archived_booking(db, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
 
 
-def get_booking_events(db: Session, booking_id: int) -> list[BookingEvent]:
+@traced
+def get_booking_for_update(db: Session, booking_id: int) -> Booking:
     """
-    Fetches all events for a booking, ordered by creation time.
+    Fetches a live booking for a state transition. Archived bookings are read-only.
     """
-    # Verify booking exists first
-    get_booking_by_id(db, booking_id)
-
-    # Return events ordered by oldest first
-    return (
-        db.query(BookingEvent)
-        .filter(BookingEvent.booking_id == booking_id)
-        .order_by(BookingEvent.created_at.asc())
-        .all()
-    )
+    booking = get_booking_by_id(db, booking_id)
+    if archive_service.is_archived(booking):
+        raise HTTPException(
+            status_code=400, detail="Archived bookings cannot be modified."
+        )
+    return booking
 
 
+@traced
+@retry_on_lock
 def assign_provider(
     db: Session, booking_id: int, provider_id: int, actor_role: ActorRole
 ) -> Booking:
@@ -94,7 +204,7 @@ def assign_provider(
         )
 
     # 2. Fetch Booking and validate status
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
     if booking.status not in [BookingStatus.PENDING, BookingStatus.REJECTED]:
         raise HTTPException(
             status_code=400,
@@ -107,21 +217,38 @@ def assign_provider(
     # Explicitly raise 404 as per refinement requirements
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
-
-    # 4. Check Provider Availability (BUSY check)
-    busy_booking = (
-        db.query(Booking)
-        .filter(
-            Booking.provider_id == provider_id,
-            Booking.status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]),
-        )
-        .first()
-    )
-    if busy_booking:
+    if booking.required_skill and booking.required_skill not in (provider.skills or []):
         raise HTTPException(
-            status_code=403, detail="Provider is currently BUSY with another booking."
+            status_code=400,
+            detail=f"Provider lacks the required skill '{booking.required_skill}'.",
         )
 
+    # 4. Check Provider Availability
+    # Scheduled bookings: working hours + interval index of reserved windows,
+    # and no immediate work if the window is under way or about to start.
+    # Immediate bookings: BUSY check on every shard (the provider may hold a
+    # booking of another customer), and no scheduled window under way.
+    if booking.scheduled_start is not None:
+        schedule_service.check_assignment(booking, provider_id)
+        if schedule_service.starts_soon(booking) and is_provider_busy(
+            db, provider_id
+        ):
+            raise HTTPException(
+                status_code=403,
+                detail="Provider is BUSY with an immediate booking when the window starts.",
+            )
+    else:
+        if is_provider_busy(db, provider_id):
+            raise HTTPException(
+                status_code=403, detail="Provider is currently BUSY with another booking."
+            )
+        reserved = schedule_service.reserved_now(provider_id)
+        if reserved:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Provider is in a scheduled booking's window: {reserved}.",
+            )
+
     # 5. Assign Provider & Update Status
     previous_status = booking.status
     booking.provider_id = provider_id
@@ -134,32 +261,23 @@ def assign_provider(
         to_status=BookingStatus.ASSIGNED,
         actor_role=actor_role,
         actor_id=None,  # SYSTEM/ADMIN might not have ID in this context
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def get_assigned_bookings_for_provider(db: Session, provider_id: int) -> list[Booking]:
-    """
-    Returns bookings assigned to a specific provider.
-    No state changes.
-    """
-    return (
-        db.query(Booking)
-        .filter(Booking.provider_id == provider_id)
-        .filter(Booking.status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]))
-        .all()
-    )
-
-
-def provider_accept_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+@traced
+def apply_accept(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Provider accepts an assigned booking.
+    Raises before changing anything; does not commit (see transition_service).
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # Validate: Status and Ownership
     if booking.status != BookingStatus.ASSIGNED:
@@ -181,19 +299,33 @@ def provider_accept_booking(db: Session, booking_id: int, actor_id: int) -> Book
         to_status=BookingStatus.IN_PROGRESS,
         actor_role=ActorRole.PROVIDER,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
+
+    return booking
 
+
+@traced
+@retry_on_lock
+def provider_accept_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+    """
+    Provider accepts an assigned booking.
+    """
+    booking = apply_accept(db, booking_id, actor_id)
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def provider_reject_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+@traced
+def apply_reject(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Provider rejects an assigned booking.
+    Raises before changing anything; does not commit (see transition_service).
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # Validate: Status and Ownership
     if booking.status != BookingStatus.ASSIGNED:
@@ -216,19 +348,33 @@ def provider_reject_booking(db: Session, booking_id: int, actor_id: int) -> Book
         to_status=BookingStatus.REJECTED,
         actor_role=ActorRole.PROVIDER,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
+    return booking
+
+
+@traced
+@retry_on_lock
+def provider_reject_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+    """
+    Provider rejects an assigned booking.
+    """
+    booking = apply_reject(db, booking_id, actor_id)
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def complete_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+@traced
+def apply_complete(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Provider completes an IN_PROGRESS booking.
+    Raises before changing anything; does not commit (see transition_service).
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # Validate: Status and Ownership
     if booking.status != BookingStatus.IN_PROGRESS:
@@ -250,19 +396,33 @@ def complete_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
         to_status=BookingStatus.COMPLETED,
         actor_role=ActorRole.PROVIDER,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
+
+    return booking
+
 
+@traced
+@retry_on_lock
+def complete_booking(db: Session, booking_id: int, actor_id: int) -> Booking:
+    """
+    Provider completes an IN_PROGRESS booking.
+    """
+    booking = apply_complete(db, booking_id, actor_id)
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def cancel_booking_by_customer(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Customer cancels a booking.
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # Validate: Ownership
     if booking.customer_id != actor_id:
@@ -295,21 +455,25 @@ def cancel_booking_by_customer(db: Session, booking_id: int, actor_id: int) -> B
         to_status=BookingStatus.CANCELLED,
         actor_role=ActorRole.CUSTOMER,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def cancel_booking_by_admin(
     db: Session, booking_id: int, actor_id: int, reason: str = None
 ) -> Booking:
     """
     Admin cancels a booking forcefully.
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # Validate: Status (Terminal check)
     if booking.status in [
@@ -335,14 +499,18 @@ def cancel_booking_by_admin(
         to_status=BookingStatus.CANCELLED,
         actor_role=ActorRole.ADMIN,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def retry_booking(
     db: Session, booking_id: int, actor_role: ActorRole, actor_id: int
 ) -> Booking:
@@ -356,12 +524,12 @@ def retry_booking(
             status_code=403, detail="Only ADMIN or SYSTEM can retry bookings."
         )
 
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # 2. Validate Status
     # [FIX] STRICT: Only REJECTED or FAILED bookings can be retried.
     # CANCELLED is terminal and cannot be retried.
-    if booking.status not in [BookingStatus.REJECTED, BookingStatus.FAILED]:
+    if booking.status not in RETRYABLE_STATUSES:
         raise HTTPException(
             status_code=400, detail="Only REJECTED or FAILED bookings can be retried."
         )
@@ -369,6 +537,8 @@ def retry_booking(
     previous_status = booking.status
     booking.status = BookingStatus.PENDING
     booking.provider_id = None  # Reset provider
+    # Retried bookings jump ahead of fresh ones in the dispatch queue
+    booking.priority = (booking.priority or 0) + config.RETRY_PRIORITY_BOOST
 
     # Log Event
     event = BookingEvent(
@@ -377,14 +547,18 @@ def retry_booking(
         to_status=BookingStatus.PENDING,
         actor_role=actor_role,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def admin_force_assign(
     db: Session, booking_id: int, provider_id: int, actor_id: int
 ) -> Booking:
@@ -392,10 +566,10 @@ def admin_force_assign(
     Admin forces assignment of a booking to a provider.
     Bypasses availability checks. DANGEROUS.
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # [FIX] Protect COMPLETED bookings from override
-    if booking.status == BookingStatus.COMPLETED:
+    if booking.status in OVERRIDE_PROTECTED_STATUSES:
         raise HTTPException(
             status_code=400, detail="Completed bookings cannot be overridden."
         )
@@ -416,22 +590,26 @@ def admin_force_assign(
         to_status=BookingStatus.ASSIGNED,
         actor_role=ActorRole.ADMIN,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def admin_force_cancel(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Admin forces cancellation of a booking.
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # [FIX] Protect COMPLETED bookings from override
-    if booking.status == BookingStatus.COMPLETED:
+    if booking.status in OVERRIDE_PROTECTED_STATUSES:
         raise HTTPException(
             status_code=400, detail="Completed bookings cannot be overridden."
         )
@@ -448,22 +626,26 @@ def admin_force_cancel(db: Session, booking_id: int, actor_id: int) -> Booking:
         to_status=BookingStatus.CANCELLED,
         actor_role=ActorRole.ADMIN,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
+@traced
+@retry_on_lock
 def admin_mark_failed(db: Session, booking_id: int, actor_id: int) -> Booking:
     """
     Admin marks a booking as FAILED.
     """
-    booking = get_booking_by_id(db, booking_id)
+    booking = get_booking_for_update(db, booking_id)
 
     # [FIX] Protect COMPLETED bookings from override
-    if booking.status == BookingStatus.COMPLETED:
+    if booking.status in OVERRIDE_PROTECTED_STATUSES:
         raise HTTPException(
             status_code=400, detail="Completed bookings cannot be overridden."
         )
@@ -479,24 +661,63 @@ def admin_mark_failed(db: Session, booking_id: int, actor_id: int) -> Booking:
         to_status=BookingStatus.FAILED,
         actor_role=ActorRole.ADMIN,
         actor_id=actor_id,
+        provider_id=booking.provider_id,
     )
     db.add(event)
+    outbox_service.enqueue_event(db, event, booking.customer_id)
 
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def is_provider_busy(db: Session, provider_id: int) -> bool:
-    """
-    Checks if a provider is currently BUSY (has ASSIGNED or IN_PROGRESS booking).
-    """
+def busy_criteria() -> list:
+    # Scheduled ASSIGNED bookings only reserve their window (see schedule_service)
+    return [
+        Booking.status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]),
+        or_(
+            Booking.scheduled_start.is_(None),
+            Booking.status == BookingStatus.IN_PROGRESS,
+        ),
+    ]
+
+
+def _is_busy_on_shard(db: Session, provider_id: int) -> bool:
     busy_booking = (
-        db.query(Booking)
-        .filter(
-            Booking.provider_id == provider_id,
-            Booking.status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]),
-        )
+        db.query(Booking.id)
+        .filter(Booking.provider_id == provider_id, *busy_criteria())
         .first()
     )
     return busy_booking is not None
+
+
+@traced
+def is_provider_busy(db: Session, provider_id: int) -> bool:
+    """
+    Checks if a provider is currently BUSY: an IN_PROGRESS booking, or an
+    ASSIGNED immediate one. With sharding, every shard is checked.
+    """
+    if SHARD_COUNT == 1:
+        return _is_busy_on_shard(db, provider_id)
+    return any(scatter(lambda shard_db: _is_busy_on_shard(shard_db, provider_id)))
+
+
+@traced
+def get_busy_provider_ids(db: Session) -> set[int]:
+    """
+    IDs of all BUSY providers (see `is_provider_busy`), on any shard.
+    One grouped query per shard instead of one busy check per provider.
+    """
+
+    def query(shard_db: Session) -> set[int]:
+        rows = (
+            shard_db.query(Booking.provider_id)
+            .filter(Booking.provider_id.isnot(None), *busy_criteria())
+            .distinct()
+            .all()
+        )
+        return {provider_id for (provider_id,) in rows}
+
+    if SHARD_COUNT == 1:
+        return query(db)
+    return set().union(*scatter(query))
@@ -0,0 +1,293 @@
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter, shard_for_booking
+from app.core.retry import retry_on_lock
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import ActorRole
+from app.services.booking_service import (
+    OVERRIDE_PROTECTED_STATUSES,
+    RETRYABLE_STATUSES,
+    retry_priority,
+)
+from app.services import outbox_service
+
+# Skip reasons reported back to the caller, mirroring the single-booking errors
+SKIP_PROTECTED = "Completed bookings cannot be overridden."
+SKIP_NOT_RETRYABLE = "Only REJECTED or FAILED bookings can be retried."
+SKIP_CONCURRENT = "Booking changed concurrently."
+SKIP_NOT_FOUND = "Booking not found"
+SKIP_FILTERED = "Booking does not match the filters."
+
+# IDs per existence check, below SQLite's bound-parameter limit
+_ID_CHUNK = 500
+
+
+def _build_criteria(
+    booking_ids: Optional[list[int]],
+    statuses: Optional[list[BookingStatus]],
+    provider_id: Optional[int],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> list:
+    criteria = []
+    if booking_ids is not None:
+        criteria.append(Booking.id.in_(booking_ids))
+    if statuses:
+        criteria.append(Booking.status.in_(statuses))
+    if provider_id is not None:
+        criteria.append(Booking.provider_id == provider_id)
+    if created_from is not None:
+        criteria.append(Booking.created_at >= created_from)
+    if created_to is not None:
+        criteria.append(Booking.created_at < created_to)
+    if not criteria:
+        # Refuse to touch every booking by accident
+        raise HTTPException(
+            status_code=400,
+            detail="Bulk actions require booking_ids or at least one filter.",
+        )
+    return criteria
+
+
+def _transition_chunk(
+    db: Session,
+    rows: list,
+    to_status: BookingStatus,
+    allowed: tuple[BookingStatus, ...] | None,
+    blocked: tuple[BookingStatus, ...],
+    skip_reason: str,
+    actor_role: ActorRole,
+    actor_id: Optional[int],
+    skipped: Counter,
+    extra_values: Optional[dict] = None,
+) -> int:
+    """
+    Applies one chunk as set-based UPDATEs (one per current status, so each
+    event records the true from_status) plus a single bulk event (and outbox) insert.
+    Does not commit.
+    """
+    ids_by_status: dict[BookingStatus, list[int]] = {}
+    for row in rows:
+        eligible = row.status not in blocked and (
+            allowed is None or row.status in allowed
+        )
+        if eligible:
+            ids_by_status.setdefault(row.status, []).append(row.id)
+        else:
+            skipped[skip_reason] += 1
+
+    events = []
+    for from_status, ids in ids_by_status.items():
+        # Re-check status in the WHERE clause; rows changed since the read are skipped
+        changed = db.execute(
+            update(Booking.__table__)
+            .where(Booking.id.in_(ids), Booking.status == from_status)
+            .values(status=to_status, provider_id=None, **(extra_values or {}))
+            .returning(Booking.id)
+        ).scalars().all()
+        skipped[SKIP_CONCURRENT] += len(ids) - len(changed)
+        events.extend(
+            {
+                "booking_id": booking_id,
+                "from_status": from_status,
+                "to_status": to_status,
+                "actor_role": actor_role,
+                "actor_id": actor_id,
+                "provider_id": None,
+            }
+            for booking_id in changed
+        )
+
+    outbox_service.insert_events(
+        db, events, {row.id: row.customer_id for row in rows}
+    )
+    return len(events)
+
+
+@retry_on_lock
+def _process_chunk(
+    db: Session, criteria: list, last_id: int, skipped: Counter, **transition
+) -> tuple[list, int]:
+    """
+    Reads and transitions the next chunk after `last_id`, then commits.
+    One retryable unit: a lock error re-reads the chunk from scratch.
+    """
+    chunk_skipped: Counter = Counter()
+    rows = db.execute(
+        select(Booking.id, Booking.status, Booking.customer_id)
+        .where(*criteria, Booking.id > last_id)
+        .order_by(Booking.id)
+        .limit(config.BULK_CHUNK_SIZE)
+    ).all()
+    if not rows:
+        return rows, 0
+    changed = _transition_chunk(db, rows, skipped=chunk_skipped, **transition)
+    db.commit()
+    skipped.update(chunk_skipped)
+    return rows, changed
+
+
+def _count_existing(db: Session, booking_ids: list[int]) -> int:
+    ids = sorted(set(booking_ids))
+    return sum(
+        db.execute(
+            select(func.count())
+            .select_from(Booking)
+            .where(Booking.id.in_(ids[i : i + _ID_CHUNK]))
+        ).scalar()
+        for i in range(0, len(ids), _ID_CHUNK)
+    )
+
+
+def _bulk_transition(
+    db: Session,
+    name: str,
+    to_status: BookingStatus,
+    allowed: tuple[BookingStatus, ...] | None,
+    blocked: tuple[BookingStatus, ...],
+    skip_reason: str,
+    actor_role: ActorRole,
+    actor_id: Optional[int],
+    extra_values: Optional[dict] = None,
+    **filters,
+) -> dict:
+    criteria = _build_criteria(**filters)
+    chunk_size = config.BULK_CHUNK_SIZE
+    skipped: Counter = Counter()
+    matched = changed = 0
+    last_id = 0
+
+    # Keyset pagination over the primary key; one transaction per chunk
+    # keeps write-lock hold time bounded regardless of the total size.
+    while True:
+        rows, chunk_changed = _process_chunk(
+            db,
+            criteria,
+            last_id,
+            skipped,
+            to_status=to_status,
+            allowed=allowed,
+            blocked=blocked,
+            skip_reason=skip_reason,
+            actor_role=actor_role,
+            actor_id=actor_id,
+            extra_values=extra_values,
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        matched += len(rows)
+        changed += chunk_changed
+        if len(rows) < chunk_size:
+            break
+
+    booking_ids = filters.get("booking_ids")
+    if booking_ids is not None:
+        unmatched = len(set(booking_ids)) - matched
+        missing = unmatched
+        if unmatched and len(criteria) > 1:
+            # Other filters also apply: only IDs absent from the table are not found
+            missing = len(set(booking_ids)) - _count_existing(db, booking_ids)
+        skipped[SKIP_NOT_FOUND] += missing
+        skipped[SKIP_FILTERED] += unmatched - missing
+
+    metrics.incr(f"bulk.{name}.changed", changed)
+    return {
+        "action": name,
+        "matched": matched,
+        "changed": changed,
+        "skipped": {reason: count for reason, count in skipped.items() if count},
+    }
+
+
+def bulk_force_cancel(db: Session, actor_id: int, **filters) -> dict:
+    """
+    Set-based equivalent of `admin_force_cancel` for every matching booking.
+    """
+    return _bulk_transition(
+        db,
+        "force_cancel",
+        BookingStatus.CANCELLED,
+        allowed=None,
+        blocked=OVERRIDE_PROTECTED_STATUSES,
+        skip_reason=SKIP_PROTECTED,
+        actor_role=ActorRole.ADMIN,
+        actor_id=actor_id,
+        **filters,
+    )
+
+
+def bulk_mark_failed(db: Session, actor_id: int, **filters) -> dict:
+    """
+    Set-based equivalent of `admin_mark_failed` for every matching booking.
+    """
+    return _bulk_transition(
+        db,
+        "mark_failed",
+        BookingStatus.FAILED,
+        allowed=None,
+        blocked=OVERRIDE_PROTECTED_STATUSES,
+        skip_reason=SKIP_PROTECTED,
+        actor_role=ActorRole.ADMIN,
+        actor_id=actor_id,
+        **filters,
+    )
+
+
+def bulk_retry(
+    db: Session, actor_role: ActorRole, actor_id: int, **filters
+) -> dict:
+    """
+    Set-based equivalent of `retry_booking` for every matching booking.
+    Role: ADMIN or SYSTEM.
+    """
+    if actor_role not in [ActorRole.ADMIN, ActorRole.SYSTEM]:
+        raise HTTPException(
+            status_code=403, detail="Only ADMIN or SYSTEM can retry bookings."
+        )
+    return _bulk_transition(
+        db,
+        "retry",
+        BookingStatus.PENDING,
+        allowed=RETRYABLE_STATUSES,
+        blocked=(),
+        skip_reason=SKIP_NOT_RETRYABLE,
+        actor_role=actor_role,
+        actor_id=actor_id,
+        extra_values={"priority": retry_priority()},
+        **filters,
+    )
+
+
+def run_on_all_shards(action, booking_ids: Optional[list[int]] = None, **kwargs) -> dict:
+    """
+    Runs a bulk action on every shard and merges the reports.
+    An ID list is split so each shard only sees the IDs it owns.
+    """
+
+    def run(db: Session) -> Optional[dict]:
+        ids = booking_ids
+        if ids is not None:
+            ids = [i for i in ids if shard_for_booking(i) == db.info["shard"]]
+            # Shard 0 always reports, so an empty result still has a shape
+            if not ids and db.info["shard"] != 0:
+                return None
+        return action(db, booking_ids=ids, **kwargs)
+
+    reports = [r for r in scatter(run) if r is not None]
+    skipped: Counter = Counter()
+    for report in reports:
+        skipped.update(report["skipped"])
+    return {
+        "action": reports[0]["action"],
+        "matched": sum(r["matched"] for r in reports),
+        "changed": sum(r["changed"] for r in reports),
+        "skipped": dict(skipped),
+    }
@@ -0,0 +1,69 @@
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.booking_event import BookingEvent
+from app.models.job_checkpoint import JobCheckpoint
+
+
+def get_checkpoint(db: Session, name: str) -> int:
+    """
+    Returns the last booking_events.id processed by job `name` (0 if never run).
+    """
+    checkpoint = db.get(JobCheckpoint, name)
+    return checkpoint.last_event_id if checkpoint else 0
+
+
+def set_checkpoint(db: Session, name: str, last_event_id: int) -> None:
+    """
+    Moves job `name` forward to `last_event_id`. Does not commit, so the
+    caller can advance the checkpoint atomically with the work it covers.
+    """
+    checkpoint = db.get(JobCheckpoint, name)
+    if checkpoint is None:
+        db.add(JobCheckpoint(name=name, last_event_id=last_event_id))
+    else:
+        checkpoint.last_event_id = last_event_id
+
+
+def max_event_id(db: Session) -> int:
+    return db.execute(select(func.max(BookingEvent.id))).scalar() or 0
+
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def load_booking_changes(
+    db: Session, cursor: Optional[int], columns: tuple, *initial_criteria
+) -> tuple[int, list[int], list]:
+    """
+    Feed for in-memory indexes that follow the event log on one shard.
+    With `cursor=None` returns every booking matching `initial_criteria`;
+    otherwise the bookings touched by events after `cursor`.
+    Returns (new cursor, touched booking IDs, rows of `columns`). Touched
+    bookings missing from rows were archived.
+    """
+    if cursor is None:
+        new_cursor = max_event_id(db)
+        rows = db.execute(select(*columns).where(*initial_criteria)).all()
+        return new_cursor, [], rows
+
+    changed = db.execute(
+        select(BookingEvent.booking_id, func.max(BookingEvent.id))
+        .where(BookingEvent.id > cursor)
+        .group_by(BookingEvent.booking_id)
+    ).all()
+    if not changed:
+        return cursor, [], []
+    touched = [booking_id for booking_id, _ in changed]
+    rows = []
+    for i in range(0, len(touched), _IN_CHUNK):
+        rows.extend(
+            db.execute(
+                select(*columns).where(Booking.id.in_(touched[i : i + _IN_CHUNK]))
+            ).all()
+        )
+    return max(last_id for _, last_id in changed), touched, rows
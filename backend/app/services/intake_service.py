@@ -0,0 +1,418 @@
+import glob
+import json
+import logging
+import os
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import SHARD_COUNT, shard_for_customer, shard_session
+from app.core.retry import retry_on_lock
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import ActorRole
+from app.schemas.booking import CreateBookingRequest
+from app.services import booking_service, outbox_service
+
+logger = logging.getLogger(__name__)
+
+# Asynchronous booking intake (INTAKE_ASYNC_ENABLED).
+# POST /bookings/ validates the request, takes a booking ID from a block
+# reserved in the shard's ID sequence, appends the booking to a local
+# journal and answers 202 with that ID. The "booking-intake" worker inserts
+# journaled bookings in large batches, one transaction per shard.
+#
+# The journal is a series of NDJSON segment files in INTAKE_DIR. Each writer
+# pass seals the segment being appended to; a sealed segment is deleted once
+# every booking in it is persisted. On startup, leftover segments are read
+# back and persisted again; bookings whose ID already exists are skipped.
+
+_DATETIME_FIELDS = ("scheduled_start", "scheduled_end", "dispatch_deadline", "created_at")
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _encode(entry: dict) -> str:
+    return json.dumps(
+        {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in entry.items()
+        }
+    )
+
+
+def _decode(line: str) -> dict:
+    entry = json.loads(line)
+    for key in _DATETIME_FIELDS:
+        if entry.get(key) is not None:
+            entry[key] = datetime.fromisoformat(entry[key])
+    entry["status"] = BookingStatus(entry["status"])
+    return entry
+
+
+class IdBlocks:
+    """
+    Booking IDs handed out from blocks reserved in each shard's bookings
+    sequence, so an ID is known before the row exists. Synchronous creates
+    keep using AUTOINCREMENT, which always continues above reserved blocks.
+    Unused IDs of a block are lost on restart (a gap, never a reuse).
+    """
+
+    def __init__(self):
+        self._next = [0] * SHARD_COUNT
+        self._end = [0] * SHARD_COUNT
+        self._lock = threading.Lock()
+
+    def take(self, shard: int) -> int:
+        with self._lock:
+            if self._next[shard] >= self._end[shard]:
+                self._next[shard], self._end[shard] = self._reserve(shard)
+            booking_id = self._next[shard]
+            self._next[shard] += 1
+            return booking_id
+
+    @staticmethod
+    @retry_on_lock
+    def _reserve_in(db: Session) -> tuple[int, int]:
+        size = config.INTAKE_ID_BLOCK_SIZE
+        # The UPDATE takes the write lock first, so the read below is ours alone
+        updated = db.execute(
+            text("UPDATE sqlite_sequence SET seq = seq + :size WHERE name = 'bookings'"),
+            {"size": size},
+        ).rowcount
+        if not updated:
+            db.execute(
+                text("INSERT INTO sqlite_sequence (name, seq) VALUES ('bookings', :size)"),
+                {"size": size},
+            )
+        end = db.execute(
+            text("SELECT seq FROM sqlite_sequence WHERE name = 'bookings'")
+        ).scalar_one()
+        db.commit()
+        return end - size + 1, end + 1
+
+    def _reserve(self, shard: int) -> tuple[int, int]:
+        with shard_session(shard) as db:
+            start, end = self._reserve_in(db)
+        metrics.incr("intake.id_blocks")
+        return start, end
+
+
+class Journal:
+    """
+    Append-only segment files. Appends are fsynced as a group when
+    INTAKE_FSYNC is on: one fsync covers every line written before it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._segment = self._last_segment()
+        self._written = 0
+        self._synced = 0
+
+    @staticmethod
+    def _path(segment: int) -> str:
+        return os.path.join(config.INTAKE_DIR, f"intake-{segment:010d}.ndjson")
+
+    @staticmethod
+    def segments() -> list[int]:
+        paths = glob.glob(os.path.join(config.INTAKE_DIR, "intake-*.ndjson"))
+        return sorted(int(os.path.basename(p)[7:17]) for p in paths)
+
+    def _last_segment(self) -> int:
+        segments = self.segments()
+        return segments[-1] if segments else 0
+
+    def append(self, line: str, on_written: Callable[[int], None]) -> None:
+        """
+        Durably appends one line. `on_written(segment)` runs before the
+        segment can be sealed, so its bookings are counted before deletion.
+        """
+        with self._lock:
+            if self._file is None:
+                os.makedirs(config.INTAKE_DIR, exist_ok=True)
+                self._segment += 1
+                self._file = open(self._path(self._segment), "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._written += 1
+            position = self._written
+            on_written(self._segment)
+        if config.INTAKE_FSYNC:
+            with self._sync_lock:
+                # Someone else's fsync (or a seal) may already cover this line
+                if self._synced < position:
+                    with self._lock:
+                        target, fileno = self._written, self._file.fileno()
+                    os.fsync(fileno)
+                    self._synced = target
+
+    def seal(self) -> Optional[int]:
+        """
+        Closes the current segment; the next append starts a new one.
+        Returns the sealed segment, or None if nothing was appended.
+        """
+        with self._sync_lock, self._lock:
+            if self._file is None:
+                return None
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._synced = self._written
+            return self._segment
+
+    def dead_letter(self, line: str) -> None:
+        """
+        Durably appends a booking that could not be persisted to
+        dead-letter.ndjson, kept for inspection and never replayed.
+        """
+        os.makedirs(config.INTAKE_DIR, exist_ok=True)
+        path = os.path.join(config.INTAKE_DIR, "dead-letter.ndjson")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def delete(self, segment: int) -> None:
+        try:
+            os.remove(self._path(segment))
+        except FileNotFoundError:
+            pass
+
+
+class BookingIntake:
+    """
+    Journaled bookings not yet in the database, per shard, and the writer
+    that persists them.
+    """
+
+    def __init__(self):
+        self.ids = IdBlocks()
+        self.journal = Journal()
+        self._pending = [deque() for _ in range(SHARD_COUNT)]
+        self._pending_ids: set[int] = set()
+        # Bookings not yet persisted per segment; sealed segments go at 0
+        self._outstanding: Counter = Counter()
+        self._sealed: set[int] = set()
+        self._lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+
+    def accept(self, request: CreateBookingRequest) -> dict:
+        """
+        Validates and journals a new booking. Returns its reference right away.
+        """
+        fields = booking_service.new_booking_fields(request)
+        shard = shard_for_customer(request.actor_id)
+        entry = {
+            **fields,
+            "id": self.ids.take(shard),
+            "customer_name": request.customer_name,
+            "created_at": _utcnow(),
+        }
+        self.journal.append(
+            _encode(entry), lambda segment: self._add(shard, segment, entry)
+        )
+        metrics.incr("intake.accepted")
+        return {"id": entry["id"], "status": "QUEUED", "location": f"/bookings/{entry['id']}"}
+
+    def _add(self, shard: int, segment: int, entry: dict) -> None:
+        entry["segment"] = segment
+        with self._lock:
+            self._pending[shard].append(entry)
+            self._pending_ids.add(entry["id"])
+            self._outstanding[segment] += 1
+            metrics.set_gauge("intake.pending", len(self._pending_ids))
+
+    def is_pending(self, booking_id: int) -> bool:
+        return booking_id in self._pending_ids
+
+    def recover(self) -> int:
+        """
+        Loads journal segments left by a previous run. Returns the bookings found.
+        """
+        found = 0
+        for segment in self.journal.segments():
+            with open(self.journal._path(segment), encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = _decode(line)
+                    except ValueError:
+                        # Torn last line of a crash: never acknowledged to a client
+                        continue
+                    self._add(shard_for_customer(entry["customer_id"]), segment, entry)
+                    found += 1
+            self._sealed.add(segment)
+            if not self._outstanding[segment]:
+                self.journal.delete(segment)
+        metrics.incr("intake.recovered", found)
+        return found
+
+    def run_writer(self) -> dict:
+        """
+        One writer pass: seals the current segment, then persists everything
+        pending, INTAKE_BATCH_SIZE bookings per transaction.
+        """
+        with self._writer_lock:
+            sealed = self.journal.seal()
+            if sealed is not None:
+                with self._lock:
+                    self._sealed.add(sealed)
+            persisted = skipped = dead_lettered = 0
+            for shard in range(SHARD_COUNT):
+                while True:
+                    with self._lock:
+                        batch = list(
+                            islice(self._pending[shard], config.INTAKE_BATCH_SIZE)
+                        )
+                    if not batch:
+                        break
+                    with shard_session(shard) as db:
+                        try:
+                            inserted = _persist(db, batch)
+                        except HTTPException:
+                            # Gave up on lock contention; retried on the next pass
+                            metrics.incr("intake.batch_retry_later")
+                            break
+                        except Exception:
+                            # A bad entry must not block the shard's queue forever
+                            logger.exception("Intake batch failed on shard %s", shard)
+                            db.rollback()
+                            try:
+                                inserted, dead = self._persist_one_by_one(db, batch)
+                            except HTTPException:
+                                metrics.incr("intake.batch_retry_later")
+                                break
+                        else:
+                            dead = 0
+                    self._done(shard, batch)
+                    persisted += inserted
+                    dead_lettered += dead
+                    skipped += len(batch) - inserted - dead
+            metrics.incr("intake.persisted", persisted)
+            return {
+                "persisted": persisted,
+                "skipped_existing": skipped,
+                "dead_lettered": dead_lettered,
+            }
+
+    def _persist_one_by_one(self, db: Session, batch: list[dict]) -> tuple[int, int]:
+        """
+        Persists a failed batch entry by entry. Entries that still fail are
+        moved to the dead-letter file. Returns (inserted, dead-lettered).
+        """
+        inserted = dead = 0
+        for entry in batch:
+            try:
+                inserted += _persist(db, [entry])
+            except HTTPException:
+                raise
+            except Exception:
+                db.rollback()
+                logger.exception("Dead-lettering journaled booking %s", entry["id"])
+                # str() as a fallback: the bad value may not be JSON-encodable
+                self.journal.dead_letter(
+                    json.dumps(
+                        {k: v for k, v in entry.items() if k != "segment"}, default=str
+                    )
+                )
+                metrics.incr("intake.dead_lettered")
+                dead += 1
+        return inserted, dead
+
+    def _done(self, shard: int, batch: list[dict]) -> None:
+        with self._lock:
+            for _ in batch:
+                self._pending[shard].popleft()
+            for entry in batch:
+                self._pending_ids.discard(entry["id"])
+                self._outstanding[entry["segment"]] -= 1
+            finished = [
+                segment for segment in self._sealed if self._outstanding[segment] <= 0
+            ]
+            for segment in finished:
+                self._sealed.discard(segment)
+                del self._outstanding[segment]
+            metrics.set_gauge("intake.pending", len(self._pending_ids))
+        for segment in finished:
+            self.journal.delete(segment)
+
+
+@retry_on_lock
+def _persist(db: Session, batch: list[dict]) -> int:
+    """
+    Inserts a batch of journaled bookings with their creation events and
+    commits once. Bookings that already exist (a replayed journal) are skipped.
+    """
+    existing = set(
+        db.execute(
+            select(Booking.id).where(Booking.id.in_([entry["id"] for entry in batch]))
+        ).scalars()
+    )
+    new = [entry for entry in batch if entry["id"] not in existing]
+    if new:
+        booking_service.ensure_customers(
+            db, {entry["customer_id"]: entry["customer_name"] for entry in new}
+        )
+        db.execute(
+            insert(Booking),
+            [
+                {
+                    key: value
+                    for key, value in entry.items()
+                    if key not in ("customer_name", "segment")
+                }
+                | {"updated_at": entry["created_at"]}
+                for entry in new
+            ],
+        )
+        outbox_service.insert_events(
+            db,
+            [
+                {
+                    "booking_id": entry["id"],
+                    "from_status": None,
+                    "to_status": BookingStatus.PENDING,
+                    "actor_role": ActorRole.CUSTOMER,
+                    "actor_id": entry["customer_id"],
+                    "provider_id": None,
+                    "created_at": entry["created_at"],
+                    "updated_at": entry["created_at"],
+                }
+                for entry in new
+            ],
+            {entry["id"]: entry["customer_id"] for entry in new},
+        )
+    db.commit()
+    for entry in new:
+        booking_service.remember_customer(entry["customer_id"])
+    return len(new)
+
+
+booking_intake = BookingIntake()
+
+
+def raise_if_queued(booking_id: int) -> None:
+    """
+    Raises 409 while the booking is journaled but not yet in the database:
+    it exists, so a 404 would be wrong, and the client can retry shortly.
+    """
+    if booking_intake.is_pending(booking_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Booking is still queued; retry shortly.",
+            headers={"Retry-After": "1"},
+        )
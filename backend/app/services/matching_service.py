@@ -0,0 +1,313 @@
+import heapq
+import math
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter, shard_session
+from app.models.booking import Booking, BookingStatus
+from app.models.provider import Provider
+from app.services.booking_service import busy_criteria, get_booking_by_id
+from app.services.checkpoint_service import load_booking_changes
+from app.services.schedule_service import schedule_index
+
+ANY_SKILL = "*"
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle (haversine) distance.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize_skills(skills: Optional[list[str]]) -> list[str]:
+    return sorted({s.strip().lower() for s in skills or [] if s and s.strip()})
+
+
+class ProviderMatchIndex:
+    """
+    In-memory grid of located providers per skill (plus ANY_SKILL for all),
+    and the set of BUSY providers.
+
+    Grid cells are MATCH_GRID_CELL_DEGREES square; a k-nearest search visits
+    rings of cells around the booking until no unvisited cell can hold a
+    closer provider. BUSY state follows booking_events like the schedule
+    index; provider profiles are re-validated after PROVIDER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.cell_degrees = config.MATCH_GRID_CELL_DEGREES
+        self.providers: dict[int, tuple[float, float, Optional[float], tuple]] = {}
+        self.grids: dict[str, dict[tuple[int, int], list[int]]] = {}
+        self.providers_loaded_at: Optional[float] = None
+        self.providers_version: tuple = ()
+
+        self.cursors: dict[int, int] = {}
+        self.busy_bookings: dict[int, int] = {}  # booking_id -> provider_id
+        self.busy_count: dict[int, int] = {}  # provider_id -> active immediate bookings
+        self.refreshed_at: Optional[float] = None
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    # Providers
+
+    def invalidate_providers(self) -> None:
+        with self._lock:
+            self.providers_loaded_at = None
+
+    def _ensure_providers(self) -> None:
+        now = time.monotonic()
+        if (
+            self.providers_loaded_at is not None
+            and now - self.providers_loaded_at < config.PROVIDER_CACHE_TTL_SECONDS
+        ):
+            return
+        with shard_session(0) as db:
+            # Profile edits bump updated_at, new providers bump the count / max id
+            version = tuple(
+                db.execute(
+                    select(
+                        func.count(Provider.id),
+                        func.max(Provider.id),
+                        func.max(Provider.updated_at),
+                    )
+                ).one()
+            )
+            if self.providers_loaded_at is not None and version == self.providers_version:
+                self.providers_loaded_at = now
+                return
+            rows = db.execute(
+                select(
+                    Provider.id,
+                    Provider.latitude,
+                    Provider.longitude,
+                    Provider.service_radius_km,
+                    Provider.skills,
+                ).where(Provider.latitude.isnot(None), Provider.longitude.isnot(None))
+            ).all()
+
+        providers = {}
+        grids: dict[str, dict[tuple[int, int], list[int]]] = {}
+        for provider_id, lat, lon, radius, skills in rows:
+            skills = tuple(normalize_skills(skills))
+            providers[provider_id] = (lat, lon, radius, skills)
+            cell = self._cell(lat, lon)
+            for skill in (ANY_SKILL, *skills):
+                grids.setdefault(skill, {}).setdefault(cell, []).append(provider_id)
+        self.providers = providers
+        self.grids = grids
+        self.providers_version = version
+        self.providers_loaded_at = now
+        metrics.incr("matching.provider_reloads")
+
+    # BUSY state
+
+    def _set_busy(self, booking_id: int, provider_id: Optional[int]) -> None:
+        previous = self.busy_bookings.pop(booking_id, None)
+        if previous is not None:
+            self.busy_count[previous] -= 1
+            if not self.busy_count[previous]:
+                del self.busy_count[previous]
+        if provider_id is not None:
+            self.busy_bookings[booking_id] = provider_id
+            self.busy_count[provider_id] = self.busy_count.get(provider_id, 0) + 1
+
+    @staticmethod
+    def _load_changes(db: Session, cursor: Optional[int]):
+        return load_booking_changes(
+            db,
+            cursor,
+            (Booking.id, Booking.status, Booking.provider_id, Booking.scheduled_start),
+            Booking.provider_id.isnot(None),
+            *busy_criteria(),
+        )
+
+    def refresh(self, max_age: float = 0) -> None:
+        """
+        Applies booking changes from every shard, unless the last refresh is
+        younger than `max_age` seconds.
+        """
+        with self._lock:
+            self._ensure_providers()
+            now = time.monotonic()
+            if self.refreshed_at is not None and now - self.refreshed_at < max_age:
+                return
+            results = scatter(
+                lambda db: (
+                    db.info.get("shard", 0),
+                    self._load_changes(db, self.cursors.get(db.info.get("shard", 0))),
+                )
+            )
+            for shard, (cursor, touched, rows) in results:
+                present = set()
+                for booking_id, status, provider_id, scheduled_start in rows:
+                    present.add(booking_id)
+                    busy = provider_id is not None and (
+                        status == BookingStatus.IN_PROGRESS
+                        or (status == BookingStatus.ASSIGNED and scheduled_start is None)
+                    )
+                    self._set_busy(booking_id, provider_id if busy else None)
+                for booking_id in touched:
+                    if booking_id not in present:
+                        self._set_busy(booking_id, None)
+                self.cursors[shard] = cursor
+            self.refreshed_at = now
+
+    # Search
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        skill: Optional[str],
+        k: int,
+        accept=None,
+    ) -> list[tuple[float, int]]:
+        """
+        Up to `k` (distance_km, provider_id) pairs, nearest first, for located
+        providers with `skill` that are within their own service radius and
+        the global MATCH_MAX_RADIUS_KM, and pass `accept(provider_id)`.
+        """
+        with self._lock:
+            grid = self.grids.get(skill or ANY_SKILL)
+            if not grid or k <= 0:
+                return []
+            center_row, center_col = self._cell(lat, lon)
+            # Smallest cell side in km near this latitude bounds unseen distances
+            cell_km = (
+                self.cell_degrees
+                * KM_PER_DEGREE
+                * max(math.cos(math.radians(min(abs(lat) + self.cell_degrees, 89.9))), 0.01)
+            )
+            max_km = config.MATCH_MAX_RADIUS_KM
+            best: list[tuple[float, int]] = []  # max-heap via negated distance
+            ring = 0
+            while True:
+                for row, col in _ring_cells(center_row, center_col, ring):
+                    for provider_id in grid.get((row, col), ()):
+                        p_lat, p_lon, radius, _ = self.providers[provider_id]
+                        d = distance_km(lat, lon, p_lat, p_lon)
+                        if d > max_km or (radius is not None and d > radius):
+                            continue
+                        if len(best) == k and -best[0][0] <= d:
+                            continue
+                        if accept is not None and not accept(provider_id):
+                            continue
+                        entry = (-d, -provider_id)
+                        if len(best) < k:
+                            heapq.heappush(best, entry)
+                        else:
+                            heapq.heapreplace(best, entry)
+                # Anything outside rings 0..ring is at least ring * cell_km away
+                bound = ring * cell_km
+                if bound > max_km or (len(best) == k and -best[0][0] <= bound):
+                    break
+                ring += 1
+            return sorted((-d, -p) for d, p in best)
+
+    def is_busy(self, provider_id: int) -> bool:
+        return provider_id in self.busy_count
+
+
+def _ring_cells(row: int, col: int, ring: int):
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+# One index per process
+match_index = ProviderMatchIndex()
+
+
+def get_candidates(db: Session, booking_id: int, k: int = 5) -> dict:
+    """
+    The k nearest providers that have the booking's required skill and are free:
+    not BUSY for immediate bookings; inside working hours and without an
+    overlapping reservation for scheduled ones.
+    """
+    booking = get_booking_by_id(db, booking_id)
+    if booking.status not in [BookingStatus.PENDING, BookingStatus.REJECTED]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot match booking in status {booking.status}. Must be PENDING or REJECTED.",
+        )
+    if booking.latitude is None or booking.longitude is None:
+        raise HTTPException(
+            status_code=400, detail="Booking has no location to match providers against."
+        )
+
+    match_index.refresh(max_age=config.MATCH_REFRESH_INTERVAL_SECONDS)
+    if booking.scheduled_start is None:
+        accept = lambda provider_id: not match_index.is_busy(provider_id)  # noqa: E731
+    else:
+        start, end = booking.scheduled_start, booking.scheduled_end
+        schedule_index.refresh()
+
+        def accept(provider_id: int) -> bool:
+            return schedule_index.within_hours(
+                provider_id, start, end
+            ) and not schedule_index.overlapping(provider_id, start, end)
+
+    started = time.perf_counter()
+    nearest = match_index.nearest(
+        booking.latitude, booking.longitude, booking.required_skill, k, accept
+    )
+    metrics.set_gauge(
+        "matching.last_search_ms", round((time.perf_counter() - started) * 1000, 3)
+    )
+    return {
+        "booking_id": booking.id,
+        "required_skill": booking.required_skill,
+        "candidates": [
+            {"provider_id": provider_id, "distance_km": round(d, 3)}
+            for d, provider_id in nearest
+        ],
+    }
+
+
+def update_provider_profile(
+    db: Session,
+    provider_id: int,
+    skills: Optional[list[str]],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    service_radius_km: Optional[float],
+) -> Provider:
+    """
+    Replaces a provider's matching profile.
+    """
+    provider = db.get(Provider, provider_id)
+    if not provider:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=400, detail="latitude and longitude must be given together."
+        )
+    provider.skills = normalize_skills(skills)
+    provider.latitude = latitude
+    provider.longitude = longitude
+    provider.service_radius_km = service_radius_km
+    db.commit()
+    db.refresh(provider)
+    match_index.invalidate_providers()
+    return provider
@@ -0,0 +1,280 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter
+from app.core.retry import backoff_seconds, retry_on_lock
+from app.models.booking_event import BookingEvent
+from app.models.outbox_message import OutboxMessage
+from app.services import summary_service
+
+# Bounds concurrent webhook calls across all shards
+_delivery_pool = ThreadPoolExecutor(
+    max_workers=max(1, config.OUTBOX_CONCURRENCY), thread_name_prefix="outbox"
+)
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _payload(event: dict, customer_id: Optional[int]) -> str:
+    return json.dumps(
+        {
+            "event_id": event["id"],
+            "booking_id": event["booking_id"],
+            "customer_id": customer_id,
+            "provider_id": event["provider_id"],
+            "from_status": event["from_status"].value if event["from_status"] else None,
+            "to_status": event["to_status"].value,
+            "actor_role": event["actor_role"].value,
+            "actor_id": event["actor_id"],
+        }
+    )
+
+
+def enqueue_event(db: Session, event: BookingEvent, customer_id: int) -> None:
+    """
+    Adds the outbox message and booking_summary update for an event that
+    was just `db.add`ed. Flushes so the event has its ID. Does not commit:
+    both are written in the same transaction as the event.
+    """
+    if not (config.OUTBOX_ENABLED or config.BOOKING_SUMMARY_ENABLED):
+        return
+    db.flush()
+    row = {
+        "id": event.id,
+        "booking_id": event.booking_id,
+        "provider_id": event.provider_id,
+        "from_status": event.from_status,
+        "to_status": event.to_status,
+        "actor_role": event.actor_role,
+        "actor_id": event.actor_id,
+        "created_at": event.created_at,
+    }
+    summary_service.apply_events(db, [row])
+    if not config.OUTBOX_ENABLED:
+        return
+    db.add(
+        OutboxMessage(
+            event_id=event.id,
+            booking_id=event.booking_id,
+            payload=_payload(row, customer_id),
+        )
+    )
+
+
+def insert_events(
+    db: Session, events: list[dict], customer_ids: dict[int, int]
+) -> None:
+    """
+    Bulk-inserts event rows together with their outbox messages and
+    booking_summary updates.
+    `customer_ids` maps booking_id -> customer_id. Does not commit.
+    """
+    if not events:
+        return
+    if not config.OUTBOX_ENABLED:
+        db.execute(insert(BookingEvent), events)
+        summary_service.apply_events(db, events)
+        return
+    event_ids = db.execute(
+        insert(BookingEvent).returning(BookingEvent.id, sort_by_parameter_order=True),
+        events,
+    ).scalars().all()
+    db.execute(
+        insert(OutboxMessage),
+        [
+            {
+                "event_id": event_id,
+                "booking_id": event["booking_id"],
+                "payload": _payload(
+                    {**event, "id": event_id}, customer_ids.get(event["booking_id"])
+                ),
+            }
+            for event_id, event in zip(event_ids, events)
+        ],
+    )
+    summary_service.apply_events(db, events)
+
+
+def _deliver(message_id: int, payload: str) -> Optional[str]:
+    """
+    POSTs one message to every target. Returns None on success, else the error.
+    """
+    for url in config.WEBHOOK_TARGETS:
+        request = urllib.request.Request(
+            url,
+            data=payload.encode(),
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                # Receivers de-duplicate on this: delivery is at-least-once
+                "X-Outbox-Message-Id": str(message_id),
+            },
+        )
+        try:
+            with urllib.request.urlopen(
+                request, timeout=config.WEBHOOK_TIMEOUT_SECONDS
+            ) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            return f"{url}: HTTP {e.code}"
+        except Exception as e:
+            return f"{url}: {e}"
+    return None
+
+
+@retry_on_lock
+def _claim_batch(db: Session, now: datetime) -> list:
+    """
+    Leases up to OUTBOX_BATCH_SIZE due messages by pushing their
+    next_attempt_at forward, so concurrent dispatchers skip them.
+    Commits; re-run from scratch on lock contention.
+    """
+    due_ids = db.scalars(
+        select(OutboxMessage.id)
+        .where(OutboxMessage.dead_at.is_(None), OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.id)
+        .limit(config.OUTBOX_BATCH_SIZE)
+    ).all()
+    if not due_ids:
+        return []
+    claimed = db.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.id.in_(due_ids),
+            OutboxMessage.dead_at.is_(None),
+            OutboxMessage.next_attempt_at <= now,
+        )
+        .values(
+            next_attempt_at=now + timedelta(seconds=config.OUTBOX_LEASE_SECONDS)
+        )
+        .returning(OutboxMessage.id, OutboxMessage.payload, OutboxMessage.attempts)
+    ).all()
+    db.commit()
+    return sorted(claimed)
+
+
+@retry_on_lock
+def _record_results(db: Session, claimed: list, errors: list[Optional[str]]) -> dict:
+    # Commits. Idempotent per batch (attempts derive from the claimed rows), so
+    # it can be re-run on lock contention without redelivering anything.
+    now = _utcnow()
+    delivered_ids = [row.id for row, error in zip(claimed, errors) if error is None]
+    retried = dead = 0
+    if delivered_ids:
+        db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(delivered_ids)))
+    for row, error in zip(claimed, errors):
+        if error is None:
+            continue
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": error[:500]}
+        if attempts >= config.OUTBOX_MAX_ATTEMPTS:
+            values["dead_at"] = now
+            dead += 1
+        else:
+            values["next_attempt_at"] = now + timedelta(
+                seconds=backoff_seconds(
+                    attempts,
+                    config.OUTBOX_BACKOFF_BASE_SECONDS,
+                    config.OUTBOX_BACKOFF_MAX_SECONDS,
+                )
+            )
+            retried += 1
+        db.execute(
+            update(OutboxMessage).where(OutboxMessage.id == row.id).values(**values)
+        )
+    db.commit()
+    return {"delivered": len(delivered_ids), "retried": retried, "dead": dead}
+
+
+def outbox_stats(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Pending and dead-lettered message counts, and the age of the oldest
+    pending message (the delivery lag).
+    """
+    now = now or _utcnow()
+    pending, oldest = db.execute(
+        select(func.count(OutboxMessage.id), func.min(OutboxMessage.created_at)).where(
+            OutboxMessage.dead_at.is_(None)
+        )
+    ).one()
+    dead = db.scalar(
+        select(func.count(OutboxMessage.id)).where(OutboxMessage.dead_at.isnot(None))
+    )
+    return {
+        "pending": pending,
+        "dead": dead,
+        "lag_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0,
+    }
+
+
+def dispatch_outbox(db: Session, max_batches: Optional[int] = None) -> dict:
+    """
+    Drains due outbox messages batch by batch: lease, deliver concurrently,
+    then delete the delivered ones and reschedule failures with backoff.
+    Messages are dead-lettered after OUTBOX_MAX_ATTEMPTS.
+    """
+    result = {"delivered": 0, "retried": 0, "dead": 0}
+    started = time.perf_counter()
+    batches = 0
+    while config.WEBHOOK_TARGETS and (max_batches is None or batches < max_batches):
+        # 1. Lease a batch (committed, so a crash only delays redelivery)
+        claimed = _claim_batch(db, _utcnow())
+        if not claimed:
+            break
+
+        # 2. Deliver with bounded concurrency
+        errors = list(
+            _delivery_pool.map(lambda row: _deliver(row.id, row.payload), claimed)
+        )
+
+        # 3. Record outcomes
+        for key, count in _record_results(db, claimed, errors).items():
+            result[key] += count
+        batches += 1
+        if len(claimed) < config.OUTBOX_BATCH_SIZE:
+            break
+
+    elapsed = time.perf_counter() - started
+    metrics.incr("outbox.delivered", result["delivered"])
+    metrics.incr("outbox.failed_attempts", result["retried"] + result["dead"])
+    metrics.incr("outbox.dead", result["dead"])
+    if result["delivered"]:
+        metrics.set_gauge(
+            "outbox.delivered_per_second", round(result["delivered"] / elapsed, 1)
+        )
+    stats = outbox_stats(db)
+    metrics.set_gauge("outbox.pending", stats["pending"])
+    metrics.set_gauge("outbox.lag_seconds", stats["lag_seconds"])
+    return {**result, **stats}
+
+
+def requeue_dead(db: Session) -> int:
+    """
+    Gives dead-lettered messages a fresh set of attempts.
+    """
+    count = db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.dead_at.isnot(None))
+        .values(dead_at=None, attempts=0, next_attempt_at=_utcnow())
+    ).rowcount
+    db.commit()
+    return count
+
+
+def run_dispatcher() -> list[dict]:
+    """
+    Entry point for the background worker. Runs on every shard.
+    """
+    return scatter(dispatch_outbox)
@@ -0,0 +1,222 @@
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Integer, and_, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.cache import CachedValue
+from app.core.database import scatter, shard_session
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import ActorRole, BookingEvent
+from app.models.provider import Provider
+
+# Provider leaderboard for GET /admin/providers/stats.
+# Each shard answers three grouped queries over the last
+# PROVIDER_STATS_WINDOW_DAYS of booking_events (transition counts, a
+# seconds-to-accept histogram) and live bookings (current load). Shard
+# results are merged in Python; histograms merge exactly, so the median is
+# exact to the second. The "provider-stats" worker refreshes the cached
+# result, so requests never run these queries themselves.
+
+events = BookingEvent.__table__
+bookings = Booking.__table__
+
+LOAD_STATUSES = (BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS)
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _event_provider():
+    # Events written before provider_id existed only name the acting provider
+    return func.coalesce(
+        events.c.provider_id,
+        case((events.c.actor_role == ActorRole.PROVIDER, events.c.actor_id)),
+    )
+
+
+def _transition_counts(db: Session, since: datetime) -> list:
+    """
+    (provider_id, kind, count) for assigned/accepted/rejected/completed.
+    A rejection releases the booking, so its provider is the actor.
+    """
+    kind = case(
+        (events.c.to_status == BookingStatus.ASSIGNED, "assigned"),
+        (events.c.to_status == BookingStatus.IN_PROGRESS, "accepted"),
+        (events.c.to_status == BookingStatus.COMPLETED, "completed"),
+        (
+            and_(
+                events.c.to_status == BookingStatus.REJECTED,
+                events.c.actor_role == ActorRole.PROVIDER,
+            ),
+            "rejected",
+        ),
+    )
+    provider = case(
+        (events.c.to_status == BookingStatus.REJECTED, events.c.actor_id),
+        else_=_event_provider(),
+    )
+    return db.execute(
+        select(provider, kind, func.count())
+        .where(
+            events.c.created_at >= since,
+            events.c.to_status.in_(
+                [
+                    BookingStatus.ASSIGNED,
+                    BookingStatus.IN_PROGRESS,
+                    BookingStatus.COMPLETED,
+                    BookingStatus.REJECTED,
+                ]
+            ),
+        )
+        .group_by(provider, kind)
+    ).all()
+
+
+def _accept_histogram(db: Session, since: datetime) -> list:
+    """
+    (provider_id, whole seconds from assignment to accept, count).
+    Only ASSIGNED and IN_PROGRESS events are windowed: an accept always
+    follows the assignment it answers.
+    """
+    window = {"partition_by": events.c.booking_id, "order_by": events.c.id}
+    steps = (
+        select(
+            _event_provider().label("provider_id"),
+            events.c.to_status,
+            events.c.created_at,
+            func.lag(events.c.to_status).over(**window).label("previous_status"),
+            func.lag(events.c.created_at).over(**window).label("previous_at"),
+        )
+        .where(
+            events.c.created_at >= since,
+            events.c.to_status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]),
+        )
+        .subquery()
+    )
+    seconds = cast(
+        (func.julianday(steps.c.created_at) - func.julianday(steps.c.previous_at))
+        * 86400,
+        Integer,
+    )
+    return db.execute(
+        select(steps.c.provider_id, seconds, func.count())
+        .where(
+            steps.c.to_status == BookingStatus.IN_PROGRESS,
+            steps.c.previous_status == BookingStatus.ASSIGNED,
+        )
+        .group_by(steps.c.provider_id, seconds)
+    ).all()
+
+
+def _current_load(db: Session) -> list:
+    return db.execute(
+        select(bookings.c.provider_id, func.count())
+        .where(bookings.c.status.in_(LOAD_STATUSES))
+        .group_by(bookings.c.provider_id)
+    ).all()
+
+
+def _shard_stats(db: Session, since: datetime) -> tuple[list, list, list]:
+    return (
+        _transition_counts(db, since),
+        _accept_histogram(db, since),
+        _current_load(db),
+    )
+
+
+def _nth(histogram: Counter, n: int) -> int:
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen > n:
+            return value
+
+
+def _median(histogram: Counter) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    return (_nth(histogram, (total - 1) // 2) + _nth(histogram, total // 2)) / 2
+
+
+def _rate(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+
+def compute_provider_stats(now: Optional[datetime] = None) -> dict:
+    """
+    Per-provider throughput over the window, best first (most completed).
+    """
+    clock = time.perf_counter()
+    now = now or _utcnow()
+    since = now - timedelta(days=config.PROVIDER_STATS_WINDOW_DAYS)
+
+    counts = defaultdict(Counter)
+    histograms = defaultdict(Counter)
+    load = Counter()
+    for shard_counts, shard_histogram, shard_load in scatter(
+        lambda db: _shard_stats(db, since)
+    ):
+        for provider_id, kind, count in shard_counts:
+            if provider_id is not None and kind is not None:
+                counts[provider_id][kind] += count
+        for provider_id, seconds, count in shard_histogram:
+            if provider_id is not None and seconds is not None:
+                histograms[provider_id][seconds] += count
+        for provider_id, count in shard_load:
+            if provider_id is not None:
+                load[provider_id] += count
+
+    with shard_session(0) as db:
+        providers = db.execute(select(Provider.id, Provider.name)).all()
+
+    entries = []
+    for provider_id, name in providers:
+        provider_counts = counts.get(provider_id, Counter())
+        assigned = provider_counts["assigned"]
+        entries.append(
+            {
+                "provider_id": provider_id,
+                "name": name,
+                "assigned": assigned,
+                "accepted": provider_counts["accepted"],
+                "rejected": provider_counts["rejected"],
+                "completed": provider_counts["completed"],
+                "acceptance_rate": _rate(provider_counts["accepted"], assigned),
+                "rejection_rate": _rate(provider_counts["rejected"], assigned),
+                "median_seconds_to_accept": _median(histograms.get(provider_id, Counter())),
+                "active_bookings": load[provider_id],
+            }
+        )
+    entries.sort(
+        key=lambda e: (-e["completed"], -(e["acceptance_rate"] or 0), e["provider_id"])
+    )
+
+    metrics.incr("provider_stats.refreshes")
+    metrics.set_gauge(
+        "provider_stats.compute_ms", round((time.perf_counter() - clock) * 1000, 1)
+    )
+    return {
+        "generated_at": now,
+        "window_days": config.PROVIDER_STATS_WINDOW_DAYS,
+        "providers": entries,
+    }
+
+
+# One cached leaderboard per process
+provider_stats = CachedValue(compute_provider_stats, config.PROVIDER_STATS_TTL_SECONDS)
+
+
+def get_provider_stats() -> dict:
+    """
+    The cached leaderboard, computed here only on a cold start or once the
+    background refresh has fallen more than PROVIDER_STATS_TTL_SECONDS behind.
+    """
+    stats = provider_stats.get()
+    return {**stats, "age_seconds": round(provider_stats.age() or 0.0, 3)}
@@ -0,0 +1,179 @@
+import bisect
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.database import scatter
+from app.core.heap import IndexedHeap
+from app.models.booking import Booking, BookingStatus
+from app.services.checkpoint_service import load_booking_changes
+
+# Sorts after every real deadline
+_NO_DEADLINE = datetime.max
+AGE_PERCENTILES = (50, 90, 99)
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class PendingQueue:
+    """
+    In-memory dispatch queue of PENDING bookings, most urgent first:
+    higher priority, then earlier dispatch deadline, then longest waiting.
+
+    Backed by an indexed heap so bookings leaving PENDING are removed in
+    O(log n), plus two sorted lists (by queued time and by deadline) so depth,
+    age percentiles and overdue counts never touch the bookings table.
+    Built from the DB on first use, then kept current from booking_events
+    (one cursor per shard), like the schedule index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cursors: dict[int, int] = {}
+        self.heap = IndexedHeap()
+        self.entries: dict[int, tuple[int, Optional[datetime], datetime]] = {}
+        self.by_queued_at: list[tuple[datetime, int]] = []
+        self.by_deadline: list[tuple[datetime, int]] = []
+
+    def _drop(self, booking_id: int) -> None:
+        entry = self.entries.pop(booking_id, None)
+        if entry is None:
+            return
+        _, deadline, queued_at = entry
+        self.heap.remove(booking_id)
+        _remove_sorted(self.by_queued_at, (queued_at, booking_id))
+        if deadline is not None:
+            _remove_sorted(self.by_deadline, (deadline, booking_id))
+
+    def _put(
+        self,
+        booking_id: int,
+        priority: int,
+        deadline: Optional[datetime],
+        queued_at: datetime,
+    ) -> None:
+        entry = (priority, deadline, queued_at)
+        if self.entries.get(booking_id) == entry:
+            return
+        self._drop(booking_id)
+        self.entries[booking_id] = entry
+        self.heap.push(booking_id, (-priority, deadline or _NO_DEADLINE, queued_at))
+        bisect.insort(self.by_queued_at, (queued_at, booking_id))
+        if deadline is not None:
+            bisect.insort(self.by_deadline, (deadline, booking_id))
+
+    @staticmethod
+    def _load_changes(db: Session, cursor: Optional[int]):
+        return load_booking_changes(
+            db,
+            cursor,
+            (
+                Booking.id,
+                Booking.status,
+                Booking.priority,
+                Booking.dispatch_deadline,
+                Booking.updated_at,
+            ),
+            Booking.status == BookingStatus.PENDING,
+        )
+
+    def refresh(self) -> None:
+        """
+        Applies booking changes from every shard since the last refresh.
+        """
+        with self._lock:
+            results = scatter(
+                lambda db: (
+                    db.info.get("shard", 0),
+                    self._load_changes(db, self.cursors.get(db.info.get("shard", 0))),
+                )
+            )
+            for shard, (cursor, touched, rows) in results:
+                present = set()
+                for booking_id, status, priority, deadline, updated_at in rows:
+                    present.add(booking_id)
+                    if status == BookingStatus.PENDING:
+                        # updated_at of a PENDING booking is when it (re)entered PENDING
+                        self._put(booking_id, priority or 0, deadline, updated_at)
+                    else:
+                        self._drop(booking_id)
+                for booking_id in touched:
+                    if booking_id not in present:
+                        self._drop(booking_id)
+                self.cursors[shard] = cursor
+            metrics.set_gauge("queue.depth", len(self.entries))
+
+    def next(self, limit: int) -> list[dict]:
+        """
+        The `limit` most urgent PENDING bookings, without removing them.
+        """
+        with self._lock:
+            result = []
+            for _, booking_id in self.heap.peek(limit):
+                priority, deadline, queued_at = self.entries[booking_id]
+                result.append(
+                    {
+                        "booking_id": booking_id,
+                        "priority": priority,
+                        "dispatch_deadline": deadline,
+                        "queued_at": queued_at,
+                    }
+                )
+            return result
+
+    def stats(self, now: Optional[datetime] = None) -> dict:
+        now = now or _utcnow()
+        with self._lock:
+            depth = len(self.entries)
+            by_priority: dict[int, int] = {}
+            for priority, _, _ in self.entries.values():
+                by_priority[priority] = by_priority.get(priority, 0) + 1
+            ages = {}
+            if depth:
+                # by_queued_at is sorted oldest first, so the p-th percentile
+                # age is read straight off the list
+                for p in AGE_PERCENTILES:
+                    queued_at, _ = self.by_queued_at[
+                        max(0, depth - 1 - (depth - 1) * p // 100)
+                    ]
+                    ages[f"p{p}"] = round((now - queued_at).total_seconds(), 3)
+                ages["max"] = round((now - self.by_queued_at[0][0]).total_seconds(), 3)
+            return {
+                "depth": depth,
+                "by_priority": dict(sorted(by_priority.items(), reverse=True)),
+                "overdue": bisect.bisect_left(self.by_deadline, (now,)),
+                "age_seconds": ages,
+                "oldest_booking_id": self.by_queued_at[0][1] if depth else None,
+            }
+
+
+def _remove_sorted(items: list, value) -> None:
+    i = bisect.bisect_left(items, value)
+    if i < len(items) and items[i] == value:
+        del items[i]
+
+
+# One queue per process
+pending_queue = PendingQueue()
+
+
+def get_next_bookings(limit: int = 10) -> list[dict]:
+    """
+    Next-most-urgent PENDING bookings for whatever assigns providers.
+    """
+    pending_queue.refresh()
+    return pending_queue.next(limit)
+
+
+def get_queue_stats() -> dict:
+    """
+    Queue depth, priority mix, overdue count and age percentiles.
+    """
+    pending_queue.refresh()
+    return pending_queue.stats()
@@ -0,0 +1,139 @@
+from itertools import groupby
+from operator import itemgetter
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.database import ARCHIVE_ENABLED, SHARD_COUNT, scatter
+from app.models.archive import archived_booking_events, archived_bookings
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import BookingEvent
+from app.models.provider import Provider
+
+# Read-only query layer for the GET endpoints. Selects Core rows and hands
+# plain dicts to the response models: no ORM instances, identity map,
+# attribute instrumentation or relationship loaders on the read path.
+# Writes keep going through booking_service and the ORM.
+
+bookings_table = Booking.__table__
+events_table = BookingEvent.__table__
+
+PROVIDER_COLUMNS = (
+    Provider.id,
+    Provider.name,
+    Provider.skills,
+    Provider.latitude,
+    Provider.longitude,
+    Provider.service_radius_km,
+)
+
+
+def _dicts(result) -> list[dict]:
+    # zip over plain tuples is several times cheaper than dict(RowMapping)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result.all()]
+
+
+def _events_by_booking(
+    db: Session, table, booking_ids: list[int]
+) -> dict[int, list[dict]]:
+    rows = _dicts(
+        db.execute(
+            select(table)
+            .where(table.c.booking_id.in_(booking_ids))
+            .order_by(table.c.booking_id, table.c.created_at, table.c.id)
+        )
+    )
+    return {
+        booking_id: list(group)
+        for booking_id, group in groupby(rows, key=itemgetter("booking_id"))
+    }
+
+
+def _find_booking(db: Session, booking_id: int) -> tuple[Optional[dict], object]:
+    """
+    (booking row, events table it lives with); the archive is checked second.
+    """
+    row = (
+        db.execute(select(bookings_table).where(bookings_table.c.id == booking_id))
+        .mappings()
+        .first()
+    )
+    if row is not None:
+        return dict(row), events_table
+    if ARCHIVE_ENABLED:
+        row = (
+            db.execute(
+                select(archived_bookings).where(archived_bookings.c.id == booking_id)
+            )
+            .mappings()
+            .first()
+        )
+        if row is not None:
+            return dict(row), archived_booking_events
+    return None, None
+
+
+def get_booking(db: Session, booking_id: int) -> dict:
+    """
+    Booking with its events, live or archived. Raises 404 if not found.
+    """
+    booking, table = _find_booking(db, booking_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    booking["events"] = _events_by_booking(db, table, [booking_id]).get(booking_id, [])
+    return booking
+
+
+def get_booking_events(db: Session, booking_id: int) -> list[dict]:
+    """
+    Events of a booking, oldest first. Raises 404 if the booking does not exist.
+    """
+    exists = db.execute(
+        select(bookings_table.c.id).where(bookings_table.c.id == booking_id)
+    ).first()
+    table = events_table
+    if exists is None:
+        _, table = _find_booking(db, booking_id)
+        if table is None:
+            raise HTTPException(status_code=404, detail="Booking not found")
+    return _events_by_booking(db, table, [booking_id]).get(booking_id, [])
+
+
+def get_provider_bookings(db: Session, provider_id: int) -> list[dict]:
+    """
+    ASSIGNED and IN_PROGRESS bookings of a provider, with events, on any shard.
+    """
+
+    def query(shard_db: Session) -> list[dict]:
+        bookings = _dicts(
+            shard_db.execute(
+                select(bookings_table)
+                .where(
+                    bookings_table.c.provider_id == provider_id,
+                    bookings_table.c.status.in_(
+                        [BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]
+                    ),
+                )
+                .order_by(bookings_table.c.id)
+            )
+        )
+        if bookings:
+            booking_ids = [booking["id"] for booking in bookings]
+            events = _events_by_booking(shard_db, events_table, booking_ids)
+            for booking in bookings:
+                booking["events"] = events.get(booking["id"], [])
+        return bookings
+
+    if SHARD_COUNT == 1:
+        return query(db)
+    return sorted(
+        (booking for shard in scatter(query) for booking in shard),
+        key=lambda b: b["id"],
+    )
+
+
+def list_providers(db: Session) -> list[dict]:
+    return _dicts(db.execute(select(*PROVIDER_COLUMNS)))
@@ -0,0 +1,351 @@
+import array
+import json
+import os
+import struct
+import sys
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import String, bindparam, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import BookingEvent, ActorRole
+from app.services import summary_service
+
+# Compact status encoding: 0 means "no events seen for this booking"
+STATUS_BY_CODE: list[Optional[BookingStatus]] = [None, *BookingStatus]
+CODE_BY_STATUS: dict[str, int] = {s.value: i for i, s in enumerate(STATUS_BY_CODE) if s}
+
+# Provider slot sentinels (real provider IDs are non-negative)
+NO_PROVIDER = -1
+UNKNOWN_PROVIDER = -2  # Legacy ASSIGNED event written before events carried provider_id
+
+# Statuses in which a booking keeps its provider
+_HOLDING_CODES = {
+    CODE_BY_STATUS[s]
+    for s in (BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS, BookingStatus.COMPLETED)
+}
+
+_SNAPSHOT_MAGIC = b"BKSNAP1\n"
+MAX_REPORTED_MISMATCHES = 100
+
+
+class BookingStateTable:
+    """
+    Columnar, array-backed booking state folded from the event log.
+    Booking IDs index into two parallel arrays relative to `base`, so memory
+    is ~9 bytes per booking instead of one ORM object each.
+    """
+
+    __slots__ = ("base", "status", "provider", "last_event_id")
+
+    def __init__(self):
+        self.base: Optional[int] = None
+        self.status = array.array("b")
+        self.provider = array.array("q")
+        self.last_event_id = 0
+
+    def __len__(self) -> int:
+        return sum(1 for code in self.status if code)
+
+    def _grow(self, booking_id: int) -> int:
+        if self.base is None:
+            self.base = booking_id
+        if booking_id < self.base:
+            # Rare: an older booking shows up late. Prepend empty slots.
+            pad = self.base - booking_id
+            self.status = array.array("b", bytes(pad)) + self.status
+            self.provider = array.array("q", [NO_PROVIDER]) * pad + self.provider
+            self.base = booking_id
+        index = booking_id - self.base
+        missing = index + 1 - len(self.status)
+        if missing > 0:
+            # Over-allocate so appends stay amortised O(1)
+            missing = max(missing, len(self.status) // 2, 1024)
+            self.status.frombytes(bytes(missing))
+            self.provider.extend(array.array("q", [NO_PROVIDER]) * missing)
+        return index
+
+    def get(self, booking_id: int) -> Optional[tuple[BookingStatus, Optional[int]]]:
+        """
+        Returns (status, provider_id) for a booking, or None if it has no events.
+        provider_id is UNKNOWN_PROVIDER when the log cannot tell.
+        """
+        if self.base is None:
+            return None
+        index = booking_id - self.base
+        if index < 0 or index >= len(self.status) or not self.status[index]:
+            return None
+        provider = self.provider[index]
+        return (
+            STATUS_BY_CODE[self.status[index]],
+            None if provider == NO_PROVIDER else provider,
+        )
+
+    def items(self) -> Iterator[tuple[int, int, int]]:
+        """
+        Yields (booking_id, status_code, provider_slot) for every known booking.
+        """
+        base = self.base or 0
+        provider = self.provider
+        for index, code in enumerate(self.status):
+            if code:
+                yield base + index, code, provider[index]
+
+    def fold(self, rows) -> int:
+        """
+        Applies event rows (id, booking_id, to_status, actor_role, actor_id,
+        provider_id) in ID order. Returns the number of rows applied.
+        """
+        status = self.status
+        provider = self.provider
+        code_by_status = CODE_BY_STATUS
+        holding = _HOLDING_CODES
+        provider_role = ActorRole.PROVIDER.value
+        assigned_code = code_by_status[BookingStatus.ASSIGNED.value]
+        applied = 0
+        last_event_id = self.last_event_id
+
+        for event_id, booking_id, to_status, actor_role, actor_id, event_provider in rows:
+            index = booking_id - self.base if self.base is not None else -1
+            if index < 0 or index >= len(status):
+                index = self._grow(booking_id)
+                status, provider = self.status, self.provider
+
+            code = code_by_status[to_status]
+            status[index] = code
+            if event_provider is not None:
+                provider[index] = event_provider
+            elif code not in holding:
+                provider[index] = NO_PROVIDER
+            elif actor_role == provider_role:
+                # Legacy accept/complete events: the acting provider owns it
+                provider[index] = actor_id
+            elif code == assigned_code:
+                provider[index] = UNKNOWN_PROVIDER
+            last_event_id = event_id
+            applied += 1
+
+        self.last_event_id = last_event_id
+        return applied
+
+    def save(self, path: str) -> None:
+        """
+        Writes a snapshot atomically (temp file + rename).
+        """
+        header = json.dumps(
+            {
+                "last_event_id": self.last_event_id,
+                "base": self.base,
+                "length": len(self.status),
+                "byteorder": sys.byteorder,
+            }
+        ).encode()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(self.status.tobytes())
+            f.write(self.provider.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BookingStateTable":
+        table = cls()
+        with open(path, "rb") as f:
+            if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a booking state snapshot")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len))
+            length = header["length"]
+            table.status.frombytes(f.read(length))
+            table.provider.frombytes(f.read(length * table.provider.itemsize))
+        if header["byteorder"] != sys.byteorder:
+            table.provider.byteswap()
+        table.base = header["base"]
+        table.last_event_id = header["last_event_id"]
+        return table
+
+
+def _event_stream_query():
+    t = BookingEvent.__table__
+    # type_coerce to String skips Enum result processing; we only need the raw names
+    return (
+        select(
+            t.c.id,
+            t.c.booking_id,
+            type_coerce(t.c.to_status, String),
+            type_coerce(t.c.actor_role, String),
+            t.c.actor_id,
+            t.c.provider_id,
+        )
+        .where(t.c.id > bindparam("cursor"))
+        .order_by(t.c.id)
+        .limit(bindparam("chunk"))
+    )
+
+
+def replay_events(
+    db: Session,
+    table: BookingStateTable,
+    snapshot_path: Optional[str] = None,
+) -> int:
+    """
+    Streams events after `table.last_event_id` in ID order and folds them in.
+    Writes a snapshot every REPLAY_CHECKPOINT_EVERY events (and at the end)
+    when `snapshot_path` is given. Returns the number of events applied.
+    """
+    conn = db.connection()
+    stmt = _event_stream_query()
+    chunk = config.REPLAY_CHUNK_SIZE
+    applied = since_checkpoint = 0
+
+    while True:
+        rows = conn.execute(stmt, {"cursor": table.last_event_id, "chunk": chunk}).all()
+        if not rows:
+            break
+        n = table.fold(rows)
+        applied += n
+        since_checkpoint += n
+        if snapshot_path and since_checkpoint >= config.REPLAY_CHECKPOINT_EVERY:
+            table.save(snapshot_path)
+            since_checkpoint = 0
+        if len(rows) < chunk:
+            break
+
+    if snapshot_path and applied:
+        table.save(snapshot_path)
+    return applied
+
+
+def _find_mismatches(db: Session, table: BookingStateTable) -> Iterator[dict]:
+    """
+    Compares the folded state with the bookings table, chunk by chunk.
+    """
+    t = Booking.__table__
+    conn = db.connection()
+    chunk = config.REPLAY_CHUNK_SIZE
+    cursor = 0
+    while True:
+        rows = conn.execute(
+            select(t.c.id, type_coerce(t.c.status, String), t.c.provider_id)
+            .where(t.c.id > cursor)
+            .order_by(t.c.id)
+            .limit(chunk)
+        ).all()
+        if not rows:
+            break
+        for booking_id, status, provider_id in rows:
+            expected = table.get(booking_id)
+            if expected is None:
+                yield {"booking_id": booking_id, "issue": "no_events"}
+                continue
+            expected_status, expected_provider = expected
+            status_ok = expected_status.value == status
+            provider_ok = (
+                expected_provider == UNKNOWN_PROVIDER or expected_provider == provider_id
+            )
+            if not (status_ok and provider_ok):
+                yield {
+                    "booking_id": booking_id,
+                    "issue": "mismatch",
+                    "status": status,
+                    "expected_status": expected_status.value,
+                    "provider_id": provider_id,
+                    "expected_provider_id": expected_provider,
+                }
+        cursor = rows[-1][0]
+        if len(rows) < chunk:
+            break
+
+
+def _apply_fixes(db: Session, fixes: list[dict]) -> None:
+    t = Booking.__table__
+    db.connection().execute(
+        update(t)
+        .where(t.c.id == bindparam("b_id"))
+        # Keep updated_at: a repair is not a lifecycle transition
+        .values(
+            status=bindparam("b_status"),
+            provider_id=bindparam("b_provider"),
+            updated_at=t.c.updated_at,
+        ),
+        fixes,
+    )
+    summary_service.refresh(db, [fix["b_id"] for fix in fixes])
+    db.commit()
+
+
+def run_replay(
+    db: Session,
+    rebuild: bool = False,
+    resume: bool = True,
+    snapshot_path: Optional[str] = None,
+) -> dict:
+    """
+    Rebuilds booking state from `booking_events` and verifies (or, with
+    `rebuild=True`, repairs) the `bookings` table against it.
+    Resumes from the last snapshot unless `resume=False`.
+    """
+    snapshot_path = snapshot_path or config.REPLAY_SNAPSHOT_PATH
+    started = time.perf_counter()
+
+    # 1. Load checkpoint
+    if resume and os.path.exists(snapshot_path):
+        table = BookingStateTable.load(snapshot_path)
+    else:
+        table = BookingStateTable()
+    resumed_from = table.last_event_id
+
+    # 2. Fold new events
+    applied = replay_events(db, table, snapshot_path)
+    replay_seconds = time.perf_counter() - started
+
+    # 3. Compare against bookings (and repair in chunks if asked)
+    mismatches = 0
+    no_events = 0
+    samples: list[dict] = []
+    fixes: list[dict] = []
+    for issue in _find_mismatches(db, table):
+        if issue["issue"] == "no_events":
+            no_events += 1
+        else:
+            mismatches += 1
+            if rebuild:
+                provider = issue["expected_provider_id"]
+                if provider == UNKNOWN_PROVIDER:
+                    provider = issue["provider_id"]
+                fixes.append(
+                    {
+                        "b_id": issue["booking_id"],
+                        "b_status": BookingStatus(issue["expected_status"]),
+                        "b_provider": provider,
+                    }
+                )
+                if len(fixes) >= config.REPLAY_CHUNK_SIZE:
+                    _apply_fixes(db, fixes)
+                    fixes = []
+        if len(samples) < MAX_REPORTED_MISMATCHES:
+            samples.append(issue)
+    if fixes:
+        _apply_fixes(db, fixes)
+
+    elapsed = time.perf_counter() - started
+    metrics.incr("replay.events_applied", applied)
+    metrics.set_gauge("replay.last_event_id", table.last_event_id)
+    return {
+        "resumed_from_event_id": resumed_from,
+        "last_event_id": table.last_event_id,
+        "events_applied": applied,
+        "bookings": len(table),
+        "mismatches": mismatches,
+        "bookings_without_events": no_events,
+        "repaired": mismatches if rebuild else 0,
+        "samples": samples,
+        "replay_seconds": round(replay_seconds, 3),
+        "events_per_minute": int(applied / replay_seconds * 60) if replay_seconds else 0,
+        "elapsed_seconds": round(elapsed, 3),
+    }
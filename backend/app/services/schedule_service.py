@@ -0,0 +1,383 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter, shard_session
+from app.models.booking import Booking, BookingStatus
+from app.models.provider import Provider
+from app.models.provider_working_hours import ProviderWorkingHours
+from app.services.checkpoint_service import load_booking_changes
+
+# Scheduled bookings in these statuses reserve their window on the provider
+ACTIVE_STATUSES = (BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS)
+MINUTES_PER_DAY = 24 * 60
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def validate_window(
+    start: Optional[datetime], end: Optional[datetime]
+) -> tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Normalizes a requested window to naive UTC. (None, None) means unscheduled.
+    """
+    if start is None and end is None:
+        return None, None
+    if start is None or end is None:
+        raise HTTPException(
+            status_code=400,
+            detail="scheduled_start and scheduled_end must be given together.",
+        )
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if end <= start:
+        raise HTTPException(
+            status_code=400, detail="scheduled_end must be after scheduled_start."
+        )
+    return start, end
+
+
+def _day_minutes(start: datetime, end: datetime) -> Optional[tuple[int, int, int]]:
+    """
+    (weekday, start minute, end minute) of a window within one day, else None.
+    A window ending exactly at midnight counts as ending at minute 1440.
+    """
+    start_minute = start.hour * 60 + start.minute
+    if end.date() == start.date():
+        # Round partial minutes outwards so the whole window is covered
+        end_minute = end.hour * 60 + end.minute + (1 if end.second or end.microsecond else 0)
+    elif end == datetime.combine(start.date() + timedelta(days=1), datetime.min.time()):
+        end_minute = MINUTES_PER_DAY
+    else:
+        return None
+    return start.weekday(), start_minute, end_minute
+
+
+class ScheduleIndex:
+    """
+    In-memory interval index of active scheduled bookings plus provider calendars.
+
+    - `by_provider` answers "does this provider overlap [start, end)?" for assignment
+    - `by_start` (sorted by window start) answers "who is booked during
+      [start, end)?" across all providers with a bisect instead of a scan
+    - calendars are grouped by identical (start, end) ranges per weekday, so
+      the available-provider set is a union of a few precomputed sets
+
+    Bookings are kept current incrementally from booking_events (one cursor per
+    shard), so changes made by other processes, the sweeper or bulk actions
+    are picked up. Calendars are re-validated after CALENDAR_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.cursors: dict[int, int] = {}
+        self.intervals: dict[int, tuple[int, datetime, datetime]] = {}
+        self.by_provider: dict[int, dict[int, tuple[datetime, datetime]]] = {}
+        self.by_start: list[tuple[datetime, int]] = []
+        self.max_duration = timedelta(0)
+
+        self.calendar_loaded_at: Optional[float] = None
+        self.calendar_version: tuple = ()
+        self.hours: dict[int, list[tuple[int, int, int]]] = {}
+        self.shapes: list[dict[tuple[int, int], set[int]]] = [{} for _ in range(7)]
+        self.always_available: set[int] = set()
+
+    # Bookings
+
+    def _drop(self, booking_id: int) -> None:
+        entry = self.intervals.pop(booking_id, None)
+        if entry is None:
+            return
+        provider_id, start, _ = entry
+        provider = self.by_provider.get(provider_id)
+        if provider is not None:
+            provider.pop(booking_id, None)
+            if not provider:
+                del self.by_provider[provider_id]
+        i = bisect.bisect_left(self.by_start, (start, booking_id))
+        if i < len(self.by_start) and self.by_start[i] == (start, booking_id):
+            del self.by_start[i]
+
+    def _put(self, booking_id: int, provider_id: int, start: datetime, end: datetime) -> None:
+        if self.intervals.get(booking_id) == (provider_id, start, end):
+            return
+        self._drop(booking_id)
+        self.intervals[booking_id] = (provider_id, start, end)
+        self.by_provider.setdefault(provider_id, {})[booking_id] = (start, end)
+        bisect.insort(self.by_start, (start, booking_id))
+        self.max_duration = max(self.max_duration, end - start)
+
+    def _apply(self, touched_ids, rows) -> None:
+        present = set()
+        for booking_id, status, provider_id, start, end in rows:
+            present.add(booking_id)
+            if status in ACTIVE_STATUSES and provider_id is not None and start is not None:
+                self._put(booking_id, provider_id, start, end)
+            else:
+                self._drop(booking_id)
+        for booking_id in touched_ids:
+            if booking_id not in present:
+                self._drop(booking_id)  # Archived
+
+    @staticmethod
+    def _load_changes(db: Session, cursor: Optional[int]):
+        return load_booking_changes(
+            db,
+            cursor,
+            (
+                Booking.id,
+                Booking.status,
+                Booking.provider_id,
+                Booking.scheduled_start,
+                Booking.scheduled_end,
+            ),
+            Booking.status.in_(ACTIVE_STATUSES),
+            Booking.provider_id.isnot(None),
+            Booking.scheduled_start.isnot(None),
+        )
+
+    def refresh(self) -> None:
+        """
+        Applies booking changes from every shard since the last refresh.
+        """
+        with self._lock:
+            results = scatter(
+                lambda db: (
+                    db.info.get("shard", 0),
+                    self._load_changes(db, self.cursors.get(db.info.get("shard", 0))),
+                )
+            )
+            for shard, (cursor, touched, rows) in results:
+                self._apply(touched, rows)
+                self.cursors[shard] = cursor
+            metrics.set_gauge("schedule.indexed_bookings", len(self.intervals))
+
+    def overlapping(
+        self, provider_id: int, start: datetime, end: datetime
+    ) -> list[int]:
+        """
+        IDs of the provider's active scheduled bookings overlapping [start, end).
+        """
+        with self._lock:
+            bookings = self.by_provider.get(provider_id, {})
+            return sorted(
+                booking_id
+                for booking_id, (other_start, other_end) in bookings.items()
+                if other_start < end and start < other_end
+            )
+
+    def _booked_between(self, start: datetime, end: datetime) -> set[int]:
+        # Only windows starting in [start - longest window, end) can overlap
+        lo = bisect.bisect_left(self.by_start, (start - self.max_duration,))
+        hi = bisect.bisect_left(self.by_start, (end,))
+        booked = set()
+        for _, booking_id in self.by_start[lo:hi]:
+            provider_id, _, other_end = self.intervals[booking_id]
+            if other_end > start:
+                booked.add(provider_id)
+        return booked
+
+    # Calendars
+
+    def invalidate_calendars(self) -> None:
+        with self._lock:
+            self.calendar_loaded_at = None
+
+    def _ensure_calendars(self) -> None:
+        # After the TTL a cheap (count, max id) fingerprint decides whether to
+        # reload; calendars are replaced (delete + insert), so edits change it.
+        now = time.monotonic()
+        if (
+            self.calendar_loaded_at is not None
+            and now - self.calendar_loaded_at < config.CALENDAR_CACHE_TTL_SECONDS
+        ):
+            return
+        with shard_session(0) as db:
+            version = tuple(
+                db.execute(
+                    select(
+                        func.count(ProviderWorkingHours.id),
+                        func.max(ProviderWorkingHours.id),
+                    )
+                ).one()
+            ) + tuple(
+                db.execute(select(func.count(Provider.id), func.max(Provider.id))).one()
+            )
+            if self.calendar_loaded_at is not None and version == self.calendar_version:
+                self.calendar_loaded_at = now
+                return
+            provider_ids = db.scalars(select(Provider.id)).all()
+            rows = db.execute(
+                select(
+                    ProviderWorkingHours.provider_id,
+                    ProviderWorkingHours.weekday,
+                    ProviderWorkingHours.start_minute,
+                    ProviderWorkingHours.end_minute,
+                )
+            ).all()
+        hours: dict[int, list[tuple[int, int, int]]] = {}
+        shapes: list[dict[tuple[int, int], set[int]]] = [{} for _ in range(7)]
+        for provider_id, weekday, start_minute, end_minute in rows:
+            hours.setdefault(provider_id, []).append((weekday, start_minute, end_minute))
+            shapes[weekday].setdefault((start_minute, end_minute), set()).add(provider_id)
+        self.hours = hours
+        self.shapes = shapes
+        self.always_available = set(provider_ids) - set(hours)
+        self.calendar_version = version
+        self.calendar_loaded_at = now
+        metrics.incr("schedule.calendar_reloads")
+
+    def within_hours(self, provider_id: int, start: datetime, end: datetime) -> bool:
+        with self._lock:
+            self._ensure_calendars()
+            hours = self.hours.get(provider_id)
+            if not hours:
+                return True
+            day = _day_minutes(start, end)
+            if day is None:
+                return False
+            weekday, start_minute, end_minute = day
+            return any(
+                w == weekday and a <= start_minute and end_minute <= b
+                for w, a, b in hours
+            )
+
+    def available(self, start: datetime, end: datetime) -> list[int]:
+        """
+        Providers whose calendar covers [start, end) and who have no
+        overlapping scheduled booking. Call `refresh` first.
+        """
+        with self._lock:
+            self._ensure_calendars()
+            candidates = set(self.always_available)
+            day = _day_minutes(start, end)
+            if day is not None:
+                weekday, start_minute, end_minute = day
+                for (a, b), provider_ids in self.shapes[weekday].items():
+                    if a <= start_minute and end_minute <= b:
+                        candidates |= provider_ids
+            return sorted(candidates - self._booked_between(start, end))
+
+
+# One index per process
+schedule_index = ScheduleIndex()
+
+
+def check_assignment(booking: Booking, provider_id: int) -> None:
+    """
+    Validates assigning a scheduled booking to a provider: the window must be
+    inside the provider's working hours and must not overlap their other
+    active scheduled bookings.
+    """
+    start, end = booking.scheduled_start, booking.scheduled_end
+    if not schedule_index.within_hours(provider_id, start, end):
+        raise HTTPException(
+            status_code=400,
+            detail="Requested window is outside the provider's working hours.",
+        )
+    schedule_index.refresh()
+    conflicts = [
+        i for i in schedule_index.overlapping(provider_id, start, end) if i != booking.id
+    ]
+    if conflicts:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Provider already has a booking overlapping the requested window: {conflicts}.",
+        )
+
+
+def starts_soon(booking: Booking) -> bool:
+    """
+    True if the booking's window is under way or starts within
+    IMMEDIATE_BOOKING_HOLD_SECONDS, so the provider's immediate work conflicts.
+    """
+    now = _utcnow()
+    hold = timedelta(seconds=config.IMMEDIATE_BOOKING_HOLD_SECONDS)
+    return booking.scheduled_start <= now + hold and now < booking.scheduled_end
+
+
+def reserved_now(provider_id: int) -> list[int]:
+    """
+    IDs of the provider's active scheduled bookings whose window is under way.
+    """
+    now = _utcnow()
+    schedule_index.refresh()
+    return schedule_index.overlapping(provider_id, now, now + timedelta(microseconds=1))
+
+
+def get_available_providers(
+    start: datetime, end: datetime, limit: int = 100
+) -> dict:
+    """
+    Providers free for [start, end), from the in-memory index.
+    """
+    start, end = validate_window(start, end)
+    schedule_index.refresh()
+    provider_ids = schedule_index.available(start, end)
+    return {
+        "start": start,
+        "end": end,
+        "count": len(provider_ids),
+        "provider_ids": provider_ids[:limit],
+    }
+
+
+def get_working_hours(db: Session, provider_id: int) -> list[ProviderWorkingHours]:
+    if not db.get(Provider, provider_id):
+        raise HTTPException(status_code=404, detail="Provider not found")
+    return db.scalars(
+        select(ProviderWorkingHours)
+        .where(ProviderWorkingHours.provider_id == provider_id)
+        .order_by(ProviderWorkingHours.weekday, ProviderWorkingHours.start_minute)
+    ).all()
+
+
+def set_working_hours(
+    db: Session, provider_id: int, entries: list[tuple[int, int, int]]
+) -> list[ProviderWorkingHours]:
+    """
+    Replaces a provider's weekly calendar with (weekday, start_minute, end_minute)
+    ranges. An empty list makes the provider available around the clock.
+    """
+    if not db.get(Provider, provider_id):
+        raise HTTPException(status_code=404, detail="Provider not found")
+    for weekday, start_minute, end_minute in entries:
+        if not 0 <= weekday <= 6:
+            raise HTTPException(status_code=400, detail="weekday must be 0 (Mon) to 6 (Sun).")
+        if not 0 <= start_minute < end_minute <= MINUTES_PER_DAY:
+            raise HTTPException(
+                status_code=400,
+                detail="Working hours need 0 <= start_minute < end_minute <= 1440.",
+            )
+
+    db.execute(
+        delete(ProviderWorkingHours).where(ProviderWorkingHours.provider_id == provider_id)
+    )
+    db.add_all(
+        ProviderWorkingHours(
+            provider_id=provider_id,
+            weekday=weekday,
+            start_minute=start_minute,
+            end_minute=end_minute,
+        )
+        for weekday, start_minute, end_minute in entries
+    )
+    db.commit()
+    schedule_index.invalidate_calendars()
+    return get_working_hours(db, provider_id)
@@ -0,0 +1,259 @@
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.core.database import scatter, shard_session
+from app.models.booking import Booking, BookingStatus
+from app.models.search import SearchKind, index_name
+
+# Name search over the FTS5 indexes in app/models/search.py.
+# Prefix search matches every query word as a word prefix ("jo sm" finds
+# "John Smith"). Fuzzy search matches any trigram of the query, so substrings
+# and most typos match and names sharing more trigrams rank higher. It also
+# reranks names sharing each query word's first letters by edit distance, so
+# transpositions ("alcie") and misspelt short names match too. Candidates
+# are preselected by bm25 in each index, then ranked by a similarity computed
+# from the query and the name alone (bm25 depends on each index's statistics,
+# so its scores from different shards or tables do not compare). Each hit
+# carries its active bookings from every shard.
+
+ACTIVE_STATUSES = (
+    BookingStatus.PENDING,
+    BookingStatus.ASSIGNED,
+    BookingStatus.IN_PROGRESS,
+)
+
+_WORD = re.compile(r"\w+")
+
+# bm25 candidates fetched per index for each result wanted, before reranking
+_CANDIDATE_FACTOR = 4
+
+# Typo pass of fuzzy search: candidates from the prefix index sharing each query
+# word's first letters, kept if a name word is within a small edit distance.
+# Short words (up to _TYPO_SHORT letters) keep 1 letter and allow 1 edit.
+_TYPO = "typo"
+_TYPO_SHORT = 4
+
+
+def _typo_prefix(term: str) -> str:
+    return term[: 1 if len(term) <= _TYPO_SHORT else 2]
+
+
+def _typo_max_distance(term: str) -> int:
+    return 1 if len(term) <= _TYPO_SHORT else 2
+
+
+def _trigrams(words: list[str]) -> set[str]:
+    return {word[i : i + 3] for word in words for i in range(len(word) - 2)}
+
+
+def _terms(query: str, fuzzy: bool) -> tuple[list[str], str]:
+    """
+    (search terms, index kind): query words for a prefix search, their
+    trigrams for a fuzzy one.
+    """
+    words = _WORD.findall(query.lower())
+    if fuzzy:
+        trigrams = _trigrams(words)
+        if trigrams:
+            return sorted(trigrams), "fts_trigram"
+        # Nothing of 3+ characters: a prefix search is the closest match
+    return words, "fts"
+
+
+def _fold(text: str) -> str:
+    # Lowercase without diacritics, like the unicode61 tokenizer's remove_diacritics
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """
+    Damerau-Levenshtein distance (optimal string alignment): insertions,
+    deletions, substitutions and adjacent transpositions each cost 1.
+    """
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+def _similarity(terms: list[str], kind: str, name: str) -> float:
+    """
+    How well `name` matches the query, between 0 and 1 (1 is the exact name).
+    Prefix: each query word's share of the name word it prefixes, over the
+    larger of the query and name word counts. Fuzzy: the overlap (Jaccard)
+    of query and name trigrams. Typo: like prefix, with each query word
+    credited 1 - distance / length for its closest name word.
+    """
+    if kind == _TYPO:
+        words = _WORD.findall(_fold(name))
+        if not words:
+            return 0.0
+        covered = 0.0
+        for term in map(_fold, terms):
+            distance, word = min((_edit_distance(term, word), word) for word in words)
+            if distance <= _typo_max_distance(term):
+                covered += 1 - distance / max(len(term), len(word))
+        return covered / max(len(terms), len(words), 1)
+    if kind == "fts_trigram":
+        name_trigrams = _trigrams(_WORD.findall(name.lower()))
+        query_trigrams = set(terms)
+        return len(query_trigrams & name_trigrams) / len(query_trigrams | name_trigrams)
+    words = _WORD.findall(_fold(name))
+    covered = 0.0
+    for term in map(_fold, terms):
+        lengths = [len(word) for word in words if word.startswith(term)]
+        if lengths:
+            covered += len(term) / min(lengths)
+    return covered / max(len(terms), len(words), 1)
+
+
+def _match_expression(db: Session, table: str, terms: list[str], kind: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression for one shard's index. Quoting every term keeps
+    FTS5 operators in the input from being parsed.
+
+    Fuzzy queries use only this shard's SEARCH_FUZZY_TERMS rarest trigrams
+    that occur at all: a trigram found in most names ("son") would make
+    every row a candidate, and one absent everywhere is a typo.
+    """
+    if kind == "fts":
+        return " AND ".join(f'"{term}"*' for term in terms)
+    if kind == _TYPO:
+        return " AND ".join(f'"{_typo_prefix(term)}"*' for term in terms)
+    vocab = f"{index_name(table, kind)}_vocab"
+    counts = []
+    for term in terms:
+        # One lookup per term: fts5vocab only seeks on term equality
+        doc = db.execute(
+            text(f"SELECT doc FROM {vocab} WHERE term = :term"), {"term": term}
+        ).scalar()
+        if doc:
+            counts.append((doc, term))
+    rarest = sorted(counts)[: config.SEARCH_FUZZY_TERMS]
+    return " OR ".join(f'"{term}"' for _, term in rarest) or None
+
+
+def _search_table(
+    db: Session, table: str, terms: list[str], kind: str, limit: int
+) -> list[dict]:
+    """
+    The `limit` best bm25 matches in one table, each with its similarity score.
+    """
+    expression = _match_expression(db, table, terms, kind)
+    if expression is None:
+        return []
+    index = index_name(table, "fts" if kind == _TYPO else kind)
+    rows = db.execute(
+        text(
+            f"SELECT t.id, t.name FROM {index} "
+            f"JOIN {table} AS t ON t.id = {index}.rowid "
+            f"WHERE {index} MATCH :expression ORDER BY {index}.rank LIMIT :limit"
+        ),
+        {"expression": expression, "limit": limit},
+    ).all()
+    hits = [
+        {"id": row.id, "name": row.name, "score": _similarity(terms, kind, row.name)}
+        for row in rows
+    ]
+    # The typo pass only keeps names with a word close enough to the query
+    return [hit for hit in hits if hit["score"] > 0] if kind == _TYPO else hits
+
+
+def _active_bookings(db: Session, column, ids: list[int]) -> dict[int, list[int]]:
+    rows = db.execute(
+        select(column, Booking.id)
+        .where(column.in_(ids), Booking.status.in_(ACTIVE_STATUSES))
+        .order_by(Booking.id)
+    ).all()
+    found = defaultdict(list)
+    for owner_id, booking_id in rows:
+        found[owner_id].append(booking_id)
+    return found
+
+
+def _search_customers(terms: list[str], kind: str, limit: int) -> list[dict]:
+    # Customers and their bookings live on the same shard: search and join there
+    def query(db: Session) -> list[dict]:
+        hits = _search_table(db, "customers", terms, kind, limit)
+        if hits:
+            active = _active_bookings(db, Booking.customer_id, [h["id"] for h in hits])
+            for hit in hits:
+                hit["active_booking_ids"] = active.get(hit["id"], [])
+        return hits
+
+    return [hit for shard in scatter(query) for hit in shard]
+
+
+def _search_providers(terms: list[str], kind: str, limit: int) -> list[dict]:
+    with shard_session(0) as db:
+        hits = _search_table(db, "providers", terms, kind, limit)
+    if hits:
+        ids = [hit["id"] for hit in hits]
+        active = defaultdict(list)
+        for shard in scatter(lambda db: _active_bookings(db, Booking.provider_id, ids)):
+            for provider_id, booking_ids in shard.items():
+                active[provider_id].extend(booking_ids)
+        for hit in hits:
+            hit["active_booking_ids"] = sorted(active.get(hit["id"], []))
+    return hits
+
+
+def search(
+    query: str,
+    kind: Optional[SearchKind] = None,
+    fuzzy: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    """
+    Ranked, paginated customer and/or provider matches for `query`.
+    Each index returns its best bm25 candidates for offset + limit results;
+    they are merged by similarity, so deep pages cost more than early ones.
+    Fuzzy queries add a typo pass (edit distance) for transpositions and
+    misspelt short names, which share few or no trigrams with the name.
+    """
+    terms, index_kind = _terms(query, fuzzy)
+    passes = [(terms, index_kind, (offset + limit) * _CANDIDATE_FACTOR)]
+    if index_kind == "fts_trigram":
+        passes.append((_WORD.findall(query.lower()), _TYPO, config.SEARCH_TYPO_CANDIDATES))
+    best: dict[tuple, dict] = {}
+    if terms:
+        for search_kind in (kind,) if kind else tuple(SearchKind):
+            searcher = (
+                _search_customers
+                if search_kind == SearchKind.CUSTOMER
+                else _search_providers
+            )
+            for pass_terms, pass_kind, wanted in passes:
+                for hit in searcher(pass_terms, pass_kind, wanted):
+                    # A name found by both passes keeps its better score
+                    key = (search_kind, hit["id"])
+                    if key not in best or hit["score"] > best[key]["score"]:
+                        best[key] = {"kind": search_kind, **hit}
+    results = list(best.values())
+    if results:
+        # Equal scores: shortest name first
+        results.sort(
+            key=lambda hit: (-hit["score"], len(hit["name"]), hit["kind"], hit["id"])
+        )
+    for hit in results:
+        hit["score"] = round(hit["score"], 4)
+    return {
+        "query": query,
+        "fuzzy": fuzzy,
+        "limit": limit,
+        "offset": offset,
+        "results": results[offset : offset + limit],
+    }
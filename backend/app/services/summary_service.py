@@ -0,0 +1,310 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, case, delete, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter
+from app.core.retry import retry_on_lock
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import BookingEvent
+from app.models.booking_summary import BookingSummary
+from app.models.customer import Customer
+from app.models.provider import Provider
+
+# booking_summary read model (CQRS projection) for the admin dashboard.
+# apply_events() runs wherever events are written (outbox_service), so the
+# row changes in the same transaction as its booking. It reads the booking's
+# current columns and the customer name from the same shard; provider names
+# come from the main database. rebuild() recomputes a shard from scratch.
+
+summary = BookingSummary.__table__
+bookings = Booking.__table__
+customers = Customer.__table__
+events = BookingEvent.__table__
+
+# A move back to PENDING from these is a retry
+RETRY_FROM_STATUSES = (BookingStatus.REJECTED, BookingStatus.FAILED)
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+_SOURCE_COLUMNS = [
+    "booking_id",
+    "customer_id",
+    "customer_name",
+    "provider_id",
+    "provider_name",
+    "status",
+    "priority",
+    "scheduled_start",
+    "created_at",
+    "last_transition_at",
+    "last_actor_role",
+    "last_actor_id",
+    "retries",
+    "transitions",
+]
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _insert(db: Session):
+    if db.get_bind(mapper=BookingSummary).dialect.name == "postgresql":
+        return postgresql_insert(summary)
+    return sqlite_insert(summary)
+
+
+def _provider_names(db: Session, provider_ids: set) -> dict[int, str]:
+    provider_ids.discard(None)
+    if not provider_ids:
+        return {}
+    # Providers are bound to the main database, whichever shard `db` is on
+    return dict(
+        db.execute(
+            select(Provider.id, Provider.name).where(Provider.id.in_(provider_ids))
+        ).all()
+    )
+
+
+def _upsert(db: Session):
+    """
+    One summary row from the booking's current columns plus one event's
+    details (bound per event, so it runs as an executemany).
+    """
+    source = (
+        select(
+            bookings.c.id,
+            bookings.c.customer_id,
+            customers.c.name,
+            bookings.c.provider_id,
+            bindparam("provider_name", type_=summary.c.provider_name.type),
+            bookings.c.status,
+            bookings.c.priority,
+            bookings.c.scheduled_start,
+            bookings.c.created_at,
+            bindparam("at", type_=summary.c.last_transition_at.type),
+            bindparam("actor_role", type_=summary.c.last_actor_role.type),
+            bindparam("actor_id", type_=summary.c.last_actor_id.type),
+            bindparam("retry", type_=summary.c.retries.type),
+            literal(1),
+        )
+        .select_from(
+            bookings.outerjoin(customers, customers.c.id == bookings.c.customer_id)
+        )
+        .where(bookings.c.id == bindparam("booking_id"))
+    )
+    statement = _insert(db).from_select(_SOURCE_COLUMNS, source)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[summary.c.booking_id],
+        set_={
+            "provider_id": excluded.provider_id,
+            "provider_name": excluded.provider_name,
+            "status": excluded.status,
+            "priority": excluded.priority,
+            "scheduled_start": excluded.scheduled_start,
+            "last_transition_at": excluded.last_transition_at,
+            "last_actor_role": excluded.last_actor_role,
+            "last_actor_id": excluded.last_actor_id,
+            "retries": summary.c.retries + excluded.retries,
+            "transitions": summary.c.transitions + 1,
+        },
+    )
+
+
+def apply_events(db: Session, new_events: list[dict]) -> None:
+    """
+    Moves the summary rows of these events' bookings forward, in event order.
+    The bookings' own changes must already be flushed. Does not commit.
+    """
+    if not config.BOOKING_SUMMARY_ENABLED or not new_events:
+        return
+    names = _provider_names(db, {event["provider_id"] for event in new_events})
+    now = _utcnow()
+    db.execute(
+        _upsert(db),
+        [
+            {
+                "booking_id": event["booking_id"],
+                "provider_name": names.get(event["provider_id"]),
+                "at": event.get("created_at") or now,
+                "actor_role": event["actor_role"],
+                "actor_id": event["actor_id"],
+                "retry": int(
+                    event["from_status"] in RETRY_FROM_STATUSES
+                    and event["to_status"] == BookingStatus.PENDING
+                ),
+            }
+            for event in new_events
+        ],
+    )
+
+
+def refresh(db: Session, booking_ids: list[int]) -> None:
+    """
+    Re-reads the booking columns of rows whose bookings changed without a
+    transition (replay repairs). Last-transition details and counts are kept.
+    Does not commit.
+    """
+    if not config.BOOKING_SUMMARY_ENABLED or not booking_ids:
+        return
+    current = {
+        column: select(bookings.c[column])
+        .where(bookings.c.id == summary.c.booking_id)
+        .scalar_subquery()
+        for column in ("status", "provider_id", "priority", "scheduled_start")
+    }
+    for i in range(0, len(booking_ids), _IN_CHUNK):
+        chunk = booking_ids[i : i + _IN_CHUNK]
+        db.execute(
+            update(summary).where(summary.c.booking_id.in_(chunk)).values(**current)
+        )
+        providers = db.execute(
+            select(summary.c.booking_id, summary.c.provider_id).where(
+                summary.c.booking_id.in_(chunk)
+            )
+        ).all()
+        names = _provider_names(db, {provider_id for _, provider_id in providers})
+        db.execute(
+            update(summary)
+            .where(summary.c.booking_id == bindparam("id"))
+            .values(provider_name=bindparam("name")),
+            [
+                {"id": booking_id, "name": names.get(provider_id)}
+                for booking_id, provider_id in providers
+            ],
+        )
+
+
+def forget(db: Session, booking_ids: list[int]) -> None:
+    """
+    Drops the rows of bookings leaving the hot tables (archived). Does not commit.
+    """
+    db.execute(delete(summary).where(summary.c.booking_id.in_(booking_ids)))
+
+
+@retry_on_lock
+def rebuild(db: Session) -> int:
+    """
+    Recomputes every summary row of one shard from bookings, customers and
+    booking_events, then fills in provider names. Commits (one transaction,
+    re-run on lock contention). Returns the row count.
+    """
+    per_booking = (
+        select(
+            events.c.booking_id,
+            func.max(events.c.id).label("last_id"),
+            func.count().label("transitions"),
+            func.sum(
+                case(
+                    (
+                        and_(
+                            events.c.from_status.in_(RETRY_FROM_STATUSES),
+                            events.c.to_status == BookingStatus.PENDING,
+                        ),
+                        1,
+                    ),
+                    else_=0,
+                )
+            ).label("retries"),
+        )
+        .group_by(events.c.booking_id)
+        .subquery()
+    )
+    last_event = events.alias("last_event")
+    source = select(
+        bookings.c.id,
+        bookings.c.customer_id,
+        customers.c.name,
+        bookings.c.provider_id,
+        literal(None),
+        bookings.c.status,
+        bookings.c.priority,
+        bookings.c.scheduled_start,
+        bookings.c.created_at,
+        last_event.c.created_at,
+        last_event.c.actor_role,
+        last_event.c.actor_id,
+        per_booking.c.retries,
+        per_booking.c.transitions,
+    ).select_from(
+        bookings.outerjoin(customers, customers.c.id == bookings.c.customer_id)
+        .join(per_booking, per_booking.c.booking_id == bookings.c.id)
+        .join(last_event, last_event.c.id == per_booking.c.last_id)
+    )
+    db.execute(delete(summary))
+    rows = db.execute(_insert(db).from_select(_SOURCE_COLUMNS, source)).rowcount
+
+    provider_ids = set(
+        db.execute(select(summary.c.provider_id).distinct()).scalars()
+    )
+    names = _provider_names(db, provider_ids)
+    if names:
+        db.execute(
+            update(summary)
+            .where(summary.c.provider_id == bindparam("id"))
+            .values(provider_name=bindparam("name")),
+            [{"id": provider_id, "name": name} for provider_id, name in names.items()],
+        )
+    db.commit()
+    metrics.incr("summary.rebuilt_rows", rows)
+    return rows
+
+
+def backfill(db: Session) -> int:
+    """
+    Rebuilds a shard whose summary is empty while it has bookings (new
+    table, or the projection was switched off). Returns the rows written.
+    """
+    if db.execute(select(summary.c.booking_id).limit(1)).first() is not None:
+        return 0
+    if db.execute(select(bookings.c.id).limit(1)).first() is None:
+        return 0
+    return rebuild(db)
+
+
+def list_summaries(
+    status: Optional[BookingStatus] = None,
+    provider_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    before_at: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Dashboard page, most recent transition first. Keyset pagination: pass
+    the last row's last_transition_at and booking_id as before_at/before_id.
+    Every filter combination reads one booking_summary index in order.
+    """
+    criteria = []
+    if status is not None:
+        criteria.append(summary.c.status == status)
+    if provider_id is not None:
+        criteria.append(summary.c.provider_id == provider_id)
+    if customer_id is not None:
+        criteria.append(summary.c.customer_id == customer_id)
+    if before_at is not None:
+        criteria.append(
+            tuple_(summary.c.last_transition_at, summary.c.booking_id)
+            < tuple_(before_at, before_id if before_id is not None else 2**62)
+        )
+    query = (
+        select(summary)
+        .where(*criteria)
+        .order_by(summary.c.last_transition_at.desc(), summary.c.booking_id.desc())
+        .limit(limit)
+    )
+
+    def page(shard_db: Session) -> list[dict]:
+        return [dict(row) for row in shard_db.execute(query).mappings()]
+
+    rows = [row for shard in scatter(page) for row in shard]
+    rows.sort(key=lambda r: (r["last_transition_at"], r["booking_id"]), reverse=True)
+    return rows[:limit]
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import scatter
+from app.core.retry import retry_on_lock
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_event import ActorRole
+from app.services import outbox_service
+from app.services.booking_service import retry_priority
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _sweep_batch(
+    db: Session,
+    from_status: BookingStatus,
+    cutoff: datetime,
+    limit: int,
+    steps: list[BookingStatus],
+) -> tuple[int, int]:
+    """
+    Moves up to `limit` bookings stuck in `from_status` since before `cutoff`
+    through `steps`, logging one SYSTEM event per step.
+    Returns (bookings transitioned, providers released). Does not commit.
+    """
+    # A scheduled booking cannot go stale before its window starts
+    not_before_window = or_(
+        Booking.scheduled_start.is_(None), Booking.scheduled_start < cutoff
+    )
+
+    # 1. Find candidates via ix_bookings_status_updated_at
+    candidates = db.execute(
+        select(Booking.id, Booking.provider_id, Booking.customer_id)
+        .where(
+            Booking.status == from_status,
+            Booking.updated_at < cutoff,
+            not_before_window,
+        )
+        .order_by(Booking.updated_at)
+        .limit(limit)
+    ).all()
+    if not candidates:
+        return 0, 0
+    provider_by_booking = {row.id: row.provider_id for row in candidates}
+    customer_by_booking = {row.id: row.customer_id for row in candidates}
+
+    # Auto-retried bookings jump ahead in the dispatch queue, like manual retries
+    final_values = {}
+    if steps[-1] == BookingStatus.PENDING:
+        final_values["priority"] = retry_priority()
+
+    # 2. Set-based transition, re-checking the predicate so rows touched
+    # concurrently by a provider or admin are left alone
+    swept_ids = db.execute(
+        update(Booking.__table__)
+        .where(
+            Booking.id.in_(provider_by_booking),
+            Booking.status == from_status,
+            Booking.updated_at < cutoff,
+            not_before_window,
+        )
+        .values(status=steps[-1], provider_id=None, **final_values)
+        .returning(Booking.id)
+    ).scalars().all()
+    if not swept_ids:
+        return 0, 0
+
+    # 3. Log Events (one row per step, per booking) and their outbox messages
+    events = []
+    for booking_id in swept_ids:
+        previous_status = from_status
+        for to_status in steps:
+            events.append(
+                {
+                    "booking_id": booking_id,
+                    "from_status": previous_status,
+                    "to_status": to_status,
+                    "actor_role": ActorRole.SYSTEM,
+                    "actor_id": None,
+                    "provider_id": None,
+                }
+            )
+            previous_status = to_status
+    outbox_service.insert_events(db, events, customer_by_booking)
+
+    released = sum(1 for i in swept_ids if provider_by_booking.get(i) is not None)
+    return len(swept_ids), released
+
+
+@retry_on_lock
+def _sweep_chunk(db: Session, *args) -> tuple[int, int]:
+    """
+    One `_sweep_batch`, committed. One retryable unit: a lock error re-selects
+    the batch from scratch.
+    """
+    result = _sweep_batch(db, *args)
+    db.commit()
+    return result
+
+
+def sweep_stale_bookings(
+    db: Session,
+    now: Optional[datetime] = None,
+    assigned_before: Optional[datetime] = None,
+    in_progress_before: Optional[datetime] = None,
+) -> dict:
+    """
+    Reclaims bookings whose provider never acted within the configured SLAs.
+    - ASSIGNED older than ASSIGNED_TIMEOUT_SECONDS -> REJECTED (-> PENDING if auto-retry)
+    - IN_PROGRESS older than IN_PROGRESS_TIMEOUT_SECONDS -> FAILED
+    Explicit cutoffs override the ones derived from `now` (the marketplace
+    simulator, whose clock is not the wall clock).
+    Commits once per batch to keep write locks short.
+    """
+    now = now or _utcnow()
+    batch_size = config.SWEEPER_BATCH_SIZE
+
+    assigned_steps = [BookingStatus.REJECTED]
+    if config.SWEEPER_AUTO_RETRY:
+        assigned_steps.append(BookingStatus.PENDING)
+
+    plans = [
+        (
+            "assigned",
+            BookingStatus.ASSIGNED,
+            assigned_before or now - timedelta(seconds=config.ASSIGNED_TIMEOUT_SECONDS),
+            assigned_steps,
+        ),
+        (
+            "in_progress",
+            BookingStatus.IN_PROGRESS,
+            in_progress_before
+            or now - timedelta(seconds=config.IN_PROGRESS_TIMEOUT_SECONDS),
+            [BookingStatus.FAILED],
+        ),
+    ]
+
+    result = {"assigned": 0, "in_progress": 0, "providers_released": 0}
+    for key, from_status, cutoff, steps in plans:
+        while True:
+            swept, released = _sweep_chunk(db, from_status, cutoff, batch_size, steps)
+            result[key] += swept
+            result["providers_released"] += released
+            if swept < batch_size:
+                break
+
+    metrics.incr("sweeper.runs")
+    metrics.incr("sweeper.assigned_reclaimed", result["assigned"])
+    metrics.incr("sweeper.in_progress_failed", result["in_progress"])
+    metrics.incr("sweeper.providers_released", result["providers_released"])
+    metrics.set_gauge("sweeper.last_run_reclaimed", result["assigned"] + result["in_progress"])
+    return result
+
+
+def run_sweep() -> list[dict]:
+    """
+    Entry point for the background worker. Runs on every shard.
+    """
+    return scatter(sweep_stale_bookings)
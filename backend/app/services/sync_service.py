@@ -0,0 +1,173 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, select, union
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.database import (
+    SHARD_COUNT,
+    SHARD_ID_SPAN,
+    scatter,
+    shard_for_customer,
+    shard_session,
+)
+from app.models.booking import Booking
+from app.models.booking_event import BookingEvent
+from app.services.checkpoint_service import max_event_id
+
+CUSTOMER = "customer"
+PROVIDER = "provider"
+
+# Fields a booking can change after creation; everything else is immutable
+MUTABLE_COLUMNS = (Booking.status, Booking.provider_id, Booking.priority, Booking.updated_at)
+FULL_COLUMNS = (
+    Booking.status,
+    Booking.customer_id,
+    Booking.provider_id,
+    Booking.scheduled_start,
+    Booking.scheduled_end,
+    Booking.priority,
+    Booking.dispatch_deadline,
+    Booking.required_skill,
+    Booking.latitude,
+    Booking.longitude,
+    Booking.created_at,
+    Booking.updated_at,
+)
+
+
+def parse_cursor(cursor: Optional[str]) -> dict[int, int]:
+    """
+    A sync cursor is the last event ID seen per shard, comma separated (a plain
+    event ID with one shard). Event IDs encode their shard, so order is free.
+    """
+    if not cursor:
+        return {}
+    positions = {}
+    try:
+        event_ids = [int(part) for part in cursor.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed sync cursor.")
+    for event_id in event_ids:
+        shard = event_id // SHARD_ID_SPAN
+        if event_id < 0 or shard >= SHARD_COUNT:
+            raise HTTPException(status_code=400, detail="Malformed sync cursor.")
+        positions[shard] = max(positions.get(shard, 0), event_id)
+    return positions
+
+
+def format_cursor(positions: dict[int, int]) -> str:
+    return ",".join(str(positions[shard]) for shard in sorted(positions)) or "0"
+
+
+def _scope_bookings(scope: str, actor_id: int):
+    if scope == CUSTOMER:
+        return select(Booking.id).where(Booking.customer_id == actor_id)
+    # Every booking the provider has held, so they also hear about bookings
+    # taken away from them (reject, timeout, reassignment). Current holders
+    # cover events written before booking_events.provider_id existed.
+    return union(
+        select(BookingEvent.booking_id).where(BookingEvent.provider_id == actor_id),
+        select(Booking.id).where(Booking.provider_id == actor_id),
+    )
+
+
+def _shard_delta(
+    db: Session, scope: str, actor_id: int, since: int, limit: int, compact: bool
+) -> tuple[int, bool, list[dict]]:
+    """
+    (new cursor, has_more, bookings) for one shard. Bookings are ordered by
+    their last event, so a page boundary never skips a change.
+    """
+    # 1. Range scan of the event log after the cursor, restricted to the scope.
+    # Bounded by the log head read first: committed event IDs only grow, so
+    # nothing at or below it can show up later.
+    head = max_event_id(db)
+    last_event_id = func.max(BookingEvent.id)
+    changed = db.execute(
+        select(
+            BookingEvent.booking_id,
+            last_event_id,
+            # A creation event (from_status NULL) after the cursor: client lacks it
+            func.max(case((BookingEvent.from_status.is_(None), 1), else_=0)),
+        )
+        .where(
+            BookingEvent.id > since,
+            BookingEvent.id <= head,
+            BookingEvent.booking_id.in_(_scope_bookings(scope, actor_id)),
+        )
+        .group_by(BookingEvent.booking_id)
+        .order_by(last_event_id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+    if not changed:
+        # Nothing in scope: skip past everything else written so far
+        return max(since, head), False, []
+
+    # 2. Current state of the changed bookings
+    rows = {
+        row.id: row
+        for row in db.execute(
+            select(Booking.id, *FULL_COLUMNS).where(
+                Booking.id.in_([booking_id for booking_id, _, _ in changed])
+            )
+        )
+    }
+
+    bookings = []
+    for booking_id, event_id, created in changed:
+        row = rows.get(booking_id)
+        if row is None:
+            continue  # Archived since
+        fields = FULL_COLUMNS if created or not compact else MUTABLE_COLUMNS
+        item = {"id": booking_id, "last_event_id": event_id}
+        item.update({column.key: getattr(row, column.key) for column in fields})
+        bookings.append(item)
+
+    return (changed[-1][1] if has_more else max(since, head)), has_more, bookings
+
+
+def get_delta(
+    scope: str,
+    actor_id: int,
+    since: Optional[str] = None,
+    limit: int = 500,
+    compact: bool = False,
+) -> dict:
+    """
+    Bookings in the customer's / provider's scope that changed after the
+    cursor, with the cursor to pass next time. Reads only the event log
+    tail (plus the changed rows), so reconnecting clients get a delta
+    instead of a full reload.
+    """
+    if scope not in (CUSTOMER, PROVIDER):
+        raise HTTPException(status_code=400, detail="scope must be 'customer' or 'provider'.")
+    positions = parse_cursor(since)
+
+    def run(db: Session):
+        shard = db.info.get("shard", 0)
+        return shard, _shard_delta(
+            db, scope, actor_id, positions.get(shard, 0), limit, compact
+        )
+
+    if scope == CUSTOMER:
+        # A customer's bookings all live on one shard
+        shard = shard_for_customer(actor_id)
+        with shard_session(shard) as db:
+            results = [run(db)]
+    else:
+        results = scatter(run)
+
+    has_more = False
+    bookings = []
+    for shard, (cursor, shard_has_more, shard_bookings) in results:
+        positions[shard] = cursor
+        has_more = has_more or shard_has_more
+        bookings.extend(shard_bookings)
+
+    metrics.incr(f"sync.requests.{'compact' if compact else 'full'}")
+    metrics.incr("sync.bookings_sent", len(bookings))
+    return {"cursor": format_cursor(positions), "has_more": has_more, "bookings": bookings}
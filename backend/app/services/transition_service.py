@@ -0,0 +1,103 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core import config, metrics
+from app.core.database import shard_for_booking, shard_session
+from app.core.retry import retry_on_lock
+from app.models.booking_event import ActorRole
+from app.services import booking_service
+
+# Offline provider actions, each the uncommitted core of the single-booking endpoint
+ACTIONS = {
+    "accept": booking_service.apply_accept,
+    "reject": booking_service.apply_reject,
+    "complete": booking_service.apply_complete,
+}
+
+
+def _result(
+    item: dict, status_code: int, detail: Optional[str] = None, booking_status=None
+) -> dict:
+    return {
+        "booking_id": item["booking_id"],
+        "action": item["action"],
+        "ok": status_code == 200,
+        "status_code": status_code,
+        "detail": detail,
+        "booking_status": booking_status,
+    }
+
+
+def _apply_item(db: Session, item: dict) -> dict:
+    """
+    Runs one item through the same rules as its single-booking endpoint.
+    A rejected item changes nothing, so the rest of the chunk carries on.
+    """
+    apply = ACTIONS.get(item["action"])
+    if apply is None:
+        return _result(item, 400, f"Unknown action '{item['action']}'.")
+    if item["actor_role"] != ActorRole.PROVIDER:
+        return _result(item, 403, "Only providers can perform this action")
+    try:
+        booking = apply(db, item["booking_id"], item["actor_id"])
+    except HTTPException as e:
+        return _result(item, e.status_code, e.detail)
+    return _result(item, 200, booking_status=booking.status)
+
+
+@retry_on_lock
+def _process_chunk(db: Session, items: list[dict]) -> list[dict]:
+    """
+    Applies a chunk of items in order and commits once.
+    One retryable unit: a lock error re-runs the whole chunk from scratch.
+    """
+    results = [_apply_item(db, item) for item in items]
+    db.commit()
+    return results
+
+
+def _chunks(items: list[dict]):
+    """
+    Consecutive runs of items on the same shard, at most TRANSITION_BATCH_CHUNK_SIZE long.
+    """
+    chunk: list[dict] = []
+    chunk_shard = None
+    for item in items:
+        shard = shard_for_booking(item["booking_id"])
+        full = len(chunk) >= config.TRANSITION_BATCH_CHUNK_SIZE
+        if chunk and (shard != chunk_shard or full):
+            yield chunk_shard, chunk
+            chunk = []
+        chunk_shard = shard
+        chunk.append(item)
+    if chunk:
+        yield chunk_shard, chunk
+
+
+def apply_batch(items: list[dict]) -> dict:
+    """
+    Applies queued provider actions strictly in order, one commit per chunk
+    instead of one request and transaction per action. Per-item failures
+    (wrong status, not the provider's booking, ...) are reported, not raised.
+    """
+    if len(items) > config.TRANSITION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch holds at most {config.TRANSITION_BATCH_MAX_ITEMS} items.",
+        )
+
+    results = []
+    for shard, chunk in _chunks(items):
+        with shard_session(shard) as db:
+            try:
+                results.extend(_process_chunk(db, chunk))
+            except HTTPException as e:
+                # Gave up on lock contention: nothing in this chunk was applied
+                results.extend(_result(item, e.status_code, e.detail) for item in chunk)
+
+    applied = sum(1 for r in results if r["ok"])
+    metrics.incr("transitions.batch.applied", applied)
+    metrics.incr("transitions.batch.failed", len(results) - applied)
+    return {"applied": applied, "failed": len(results) - applied, "results": results}
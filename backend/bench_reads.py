@@ -0,0 +1,250 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _configure(workdir: str):
+    # Must run before any app import: settings are read at import time
+    os.chdir(workdir)
+    for flag in ("SWEEPER_ENABLED", "AUDITOR_ENABLED", "ARCHIVER_ENABLED"):
+        os.environ[flag] = "0"
+    os.environ["ARCHIVE_DATABASE_PATH"] = ""
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _seed(events: int, provider_bookings: int, providers: int):
+    from sqlalchemy import insert
+
+    from app.core.database import engine
+    from app.models.booking import Booking, BookingStatus
+    from app.models.booking_event import ActorRole, BookingEvent
+    from app.models.customer import Customer
+    from app.models.provider import Provider
+
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [{"id": 1, "name": "C"}])
+        conn.execute(
+            insert(Provider),
+            [
+                {
+                    "id": i,
+                    "name": f"Provider {i}",
+                    "skills": ["plumbing"],
+                    "latitude": 52.5,
+                    "longitude": 13.4,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(1, providers + 1)
+            ],
+        )
+        # Booking 1: a long event history. Bookings 2..: held by provider 1.
+        conn.execute(
+            insert(Booking),
+            [
+                {
+                    "id": i,
+                    "customer_id": 1,
+                    "provider_id": None if i == 1 else 1,
+                    "status": BookingStatus.PENDING if i == 1 else BookingStatus.ASSIGNED,
+                    "priority": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(1, provider_bookings + 2)
+            ],
+        )
+        history = [(1, BookingStatus.PENDING)] * events + [
+            (i, BookingStatus.ASSIGNED)
+            for i in range(2, provider_bookings + 2)
+            for _ in range(3)
+        ]
+        conn.execute(
+            insert(BookingEvent),
+            [
+                {
+                    "booking_id": booking_id,
+                    "from_status": None,
+                    "to_status": status,
+                    "actor_role": ActorRole.SYSTEM,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for booking_id, status in history
+            ],
+        )
+
+
+# ORM paths as the endpoints used them before the Core read layer
+
+
+def _orm_booking(db):
+    from app.models.booking import Booking
+
+    return db.query(Booking).filter(Booking.id == 1).first()
+
+
+def _orm_events(db):
+    from app.models.booking_event import BookingEvent
+
+    return (
+        db.query(BookingEvent)
+        .filter(BookingEvent.booking_id == 1)
+        .order_by(BookingEvent.created_at.asc())
+        .all()
+    )
+
+
+def _orm_provider_bookings(db):
+    from sqlalchemy.orm import selectinload
+
+    from app.models.booking import Booking, BookingStatus
+
+    return (
+        db.query(Booking)
+        .options(selectinload(Booking.events))
+        .filter(Booking.provider_id == 1)
+        .filter(Booking.status.in_([BookingStatus.ASSIGNED, BookingStatus.IN_PROGRESS]))
+        .all()
+    )
+
+
+def _orm_providers(db):
+    from app.models.provider import Provider
+
+    return db.query(Provider).all()
+
+
+def _measure(fn, serialize, rows: int, repeat: int) -> dict:
+    """
+    Best-of-`repeat` wall time (query alone, and query + response model dump)
+    and peak traced memory.
+    """
+    from app.core.database import SessionLocal
+
+    best = best_query = float("inf")
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            value = fn(db)
+            queried = time.perf_counter()
+            serialize(value)
+            best = min(best, time.perf_counter() - started)
+            best_query = min(best_query, queried - started)
+    with SessionLocal() as db:
+        tracemalloc.start()
+        serialize(fn(db))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "query_ms": round(best_query * 1000, 1),
+        "ms": round(best * 1000, 1),
+        "us_per_row": round(best * 1e6 / rows, 2),
+        "peak_kib": peak // 1024,
+        "bytes_per_row": peak // rows,
+    }
+
+
+def run(events: int, provider_bookings: int, providers: int, repeat: int) -> list[dict]:
+    from pydantic import TypeAdapter
+
+    from app.api.providers import ProviderDTO
+    from app.schemas.booking import BookingEventResponse, BookingResponse
+    from app.services import read_service
+
+    def dump(model):
+        adapter = TypeAdapter(model)
+        return lambda value: adapter.dump_python(
+            adapter.validate_python(value, from_attributes=True), mode="json"
+        )
+
+    def provider_dtos(value):
+        # get_all_providers adds availability to every provider
+        rows = [
+            {
+                "id": p["id"] if isinstance(p, dict) else p.id,
+                "name": p["name"] if isinstance(p, dict) else p.name,
+                "availability": "AVAILABLE",
+            }
+            for p in value
+        ]
+        return dump(list[ProviderDTO])(rows)
+
+    cases = [
+        (
+            "GET /bookings/{id}",
+            events,
+            _orm_booking,
+            lambda db: read_service.get_booking(db, 1),
+            dump(BookingResponse),
+        ),
+        (
+            "GET /bookings/{id}/events",
+            events,
+            _orm_events,
+            lambda db: read_service.get_booking_events(db, 1),
+            dump(list[BookingEventResponse]),
+        ),
+        (
+            "GET /providers/{id}/bookings",
+            provider_bookings * 4,  # bookings + their events
+            _orm_provider_bookings,
+            lambda db: read_service.get_provider_bookings(db, 1),
+            dump(list[BookingResponse]),
+        ),
+        (
+            "GET /admin/providers",
+            providers,
+            _orm_providers,
+            read_service.list_providers,
+            provider_dtos,
+        ),
+    ]
+    results = []
+    for name, rows, orm_fn, core_fn, serialize in cases:
+        orm = _measure(orm_fn, serialize, rows, repeat)
+        core = _measure(core_fn, serialize, rows, repeat)
+        results.append(
+            {
+                "endpoint": name,
+                "rows": rows,
+                "orm": orm,
+                "core": core,
+                "speedup": round(orm["ms"] / core["ms"], 2),
+                "memory_ratio": round(core["peak_kib"] / max(orm["peak_kib"], 1), 2),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the ORM and Core read paths (CPU and memory per row)."
+    )
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--provider-bookings", type=int, default=5000)
+    parser.add_argument("--providers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure(workdir)
+        import app.main  # noqa: F401  (creates the schema)
+
+        _seed(args.events, args.provider_bookings, args.providers)
+        print("--- Read Path Benchmark (ORM vs Core) ---")
+        for result in run(
+            args.events, args.provider_bookings, args.providers, args.repeat
+        ):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
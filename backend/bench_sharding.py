@@ -0,0 +1,117 @@
+import argparse
+import json
+import subprocess
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _configure(workdir: str, shard_count: int):
+    # Must run before any app import: settings are read at import time
+    os.chdir(workdir)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    for flag in ("SWEEPER_ENABLED", "AUDITOR_ENABLED", "ARCHIVER_ENABLED"):
+        os.environ[flag] = "0"
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _init_worker(workdir: str, shard_count: int):
+    _configure(workdir, shard_count)
+    import app.main  # noqa: F401  (creates every shard's schema)
+
+
+def _write_bookings(customer_ids: list[int]) -> tuple[int, int]:
+    from app.core.database import shard_for_customer, shard_session
+    from app.models.booking_event import ActorRole
+    from app.schemas.booking import CreateBookingRequest
+    from app.services import booking_service
+
+    ok = errors = 0
+    for customer_id in customer_ids:
+        db = shard_session(shard_for_customer(customer_id))
+        try:
+            booking_service.create_booking(
+                db,
+                CreateBookingRequest(
+                    customer_name=f"Customer {customer_id}",
+                    actor_role=ActorRole.CUSTOMER,
+                    actor_id=customer_id,
+                ),
+            )
+            ok += 1
+        except Exception:
+            errors += 1
+        finally:
+            db.close()
+    return ok, errors
+
+
+def run(shard_count: int, writers: int, bookings: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        _init_worker(workdir, shard_count)
+        customers = list(range(1, bookings + 1))
+        batches = [customers[i::writers] for i in range(writers)]
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(
+            writers, initializer=_init_worker, initargs=(workdir, shard_count)
+        ) as pool:
+            started = time.perf_counter()
+            results = pool.map(_write_bookings, batches)
+            elapsed = time.perf_counter() - started
+    ok = sum(r[0] for r in results)
+    return {
+        "shards": shard_count,
+        "writers": writers,
+        "bookings": ok,
+        "errors": sum(r[1] for r in results),
+        "seconds": round(elapsed, 2),
+        "bookings_per_second": int(ok / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure create_booking write throughput versus shard count."
+    )
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--writers-per-shard", type=int, default=2)
+    parser.add_argument("--bookings", type=int, default=4000)
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = run(args.single, args.single * args.writers_per_shard, args.bookings)
+        print(json.dumps(result))
+        return
+
+    print("--- Sharding Write Benchmark ---")
+    baseline = None
+    for shard_count in args.shards:
+        # Each run is a fresh interpreter so SHARD_COUNT is read anew
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                str(shard_count),
+                "--writers-per-shard",
+                str(args.writers_per_shard),
+                "--bookings",
+                str(args.bookings),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result["bookings_per_second"]
+        result["speedup"] = round(result["bookings_per_second"] / baseline, 2)
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import json
+
+from app.core import config
+from app.core.database import SHARD_COUNT, shard_path, shard_session
+from app.models.provider import Provider  # Needed for relationship resolution
+from app.models.customer import Customer  # Good practice to have all models loaded
+from app.models.booking import Booking
+from app.models.booking_event import BookingEvent
+from app.services import replay_service
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay booking_events and verify or rebuild the bookings table."
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Repair mismatching bookings instead of only reporting them.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the last snapshot and replay the whole log.",
+    )
+    parser.add_argument("--snapshot", help="Snapshot file (default: REPLAY_SNAPSHOT_PATH).")
+    parser.add_argument(
+        "--shard",
+        type=int,
+        default=0,
+        choices=range(SHARD_COUNT),
+        help="Shard to replay (default: 0, the main database).",
+    )
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or shard_path(config.REPLAY_SNAPSHOT_PATH, args.shard)
+    db = shard_session(args.shard)
+    try:
+        report = replay_service.run_replay(
+            db, rebuild=args.rebuild, resume=not args.full, snapshot_path=snapshot
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2, default=str))
+    if report["mismatches"] and not args.rebuild:
+        print("⚠️ Mismatches found. Re-run with --rebuild to repair.")
+    else:
+        print("✅ Replay Complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import json
+
+from app.core.database import SHARD_COUNT, shard_session
+from app.models.provider import Provider  # Needed for relationship resolution
+from app.models.customer import Customer  # Good practice to have all models loaded
+from app.models.booking import Booking
+from app.models.booking_event import BookingEvent
+from app.models.booking_summary import BookingSummary
+from app.services import summary_service
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute the booking_summary read model from bookings and booking_events."
+    )
+    parser.add_argument(
+        "--shard",
+        type=int,
+        choices=range(SHARD_COUNT),
+        help="Shard to rebuild (default: every shard).",
+    )
+    args = parser.parse_args()
+
+    shards = range(SHARD_COUNT) if args.shard is None else [args.shard]
+    report = {}
+    for shard in shards:
+        with shard_session(shard) as db:
+            report[f"shard_{shard}"] = summary_service.rebuild(db)
+
+    print(json.dumps({"rows": report}, indent=2))
+    print("✅ booking_summary rebuilt!")
+
+
+if __name__ == "__main__":
+    main()
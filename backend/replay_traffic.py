@@ -0,0 +1,360 @@
+import argparse
+import glob
+import gzip
+import http.client
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import zlib
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+# Replays traffic recorded by CaptureMiddleware (CAPTURE_ENABLED=1) against a
+# running instance, then compares status codes and latency per route with the
+# original responses.
+#
+# - Each actor's requests are sent in their original order: an actor always
+#   maps to the same lane, and a lane sends one request at a time.
+# - A request on a booking also waits for the previous captured request on
+#   that booking (assign before the provider's accept), whoever sent it.
+# - Booking IDs created during the capture are swapped for the IDs the
+#   replay target assigned.
+
+_BOOKING_PATH = re.compile(r"^/bookings/(\d+)")
+_NUMBER = re.compile(r"/\d+")
+
+
+def load(paths: list[str]) -> list[dict]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.ndjson.gz"))))
+        else:
+            files.append(path)
+    records = []
+    for path in files:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def route_of(record: dict) -> str:
+    return f"{record['method']} {_NUMBER.sub('/{id}', record['path'])}"
+
+
+def _body_booking_ids(value) -> set[int]:
+    if isinstance(value, list):
+        return set().union(*map(_body_booking_ids, value)) if value else set()
+    if not isinstance(value, dict):
+        return set()
+    ids = set()
+    for key, item in value.items():
+        if key == "booking_id" and isinstance(item, int):
+            ids.add(item)
+        elif key == "booking_ids" and isinstance(item, list):
+            ids.update(i for i in item if isinstance(i, int))
+        else:
+            ids |= _body_booking_ids(item)
+    return ids
+
+
+def booking_refs(record: dict) -> set[int]:
+    """
+    Captured booking IDs a request reads, changes or (POST /bookings/) creates.
+    """
+    ids = _body_booking_ids(record["body"])
+    match = _BOOKING_PATH.match(record["path"])
+    if match:
+        ids.add(int(match.group(1)))
+    elif record["method"] == "POST" and isinstance(record.get("id"), int):
+        ids.add(record["id"])
+    return ids
+
+
+class Plan:
+    """
+    Records in capture order with the per-booking ordering between them,
+    and the captured -> replayed booking ID map.
+    """
+
+    def __init__(self, records: list[dict], dependency_timeout: float):
+        self.records = records
+        self.timeout = dependency_timeout
+        self.after: list[list[int]] = []
+        last: dict[int, int] = {}
+        for seq, record in enumerate(records):
+            refs = booking_refs(record)
+            self.after.append(sorted({last[i] for i in refs if i in last}))
+            for booking_id in refs:
+                last[booking_id] = seq
+        self.done = [threading.Event() for _ in records]
+        self.late = 0
+        self._ids: dict[int, int] = {}
+
+    def wait_for(self, seq: int) -> None:
+        for before in self.after[seq]:
+            if not self.done[before].wait(self.timeout):
+                self.late += 1
+
+    def finish(self, seq: int, status: int, raw: bytes) -> None:
+        record = self.records[seq]
+        original = record.get("id")
+        if (
+            record["method"] == "POST"
+            and isinstance(original, int)
+            and not _BOOKING_PATH.match(record["path"])
+            and 200 <= status < 300
+        ):
+            try:
+                replayed = json.loads(raw).get("id")
+            except (ValueError, AttributeError):
+                replayed = None
+            if isinstance(replayed, int):
+                self._ids[original] = replayed
+        self.done[seq].set()
+
+    def rewrite(self, record: dict) -> tuple[str, object]:
+        """
+        (path, body) with captured booking IDs swapped for replayed ones.
+        """
+        path = _BOOKING_PATH.sub(
+            lambda m: f"/bookings/{self._id(int(m.group(1)))}", record["path"]
+        )
+        return path, self._rewrite_body(record["body"])
+
+    def _id(self, original: int) -> int:
+        return self._ids.get(original, original)
+
+    def _rewrite_body(self, value):
+        if isinstance(value, list):
+            return [self._rewrite_body(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        rewritten = {}
+        for key, item in value.items():
+            if key == "booking_id" and isinstance(item, int):
+                item = self._id(item)
+            elif key == "booking_ids" and isinstance(item, list):
+                item = [self._id(i) if isinstance(i, int) else i for i in item]
+            else:
+                item = self._rewrite_body(item)
+            rewritten[key] = item
+        return rewritten
+
+
+class Lane(threading.Thread):
+    """
+    Sends its records in order over one keep-alive connection, each no
+    earlier than its scaled capture offset.
+    """
+
+    def __init__(self, base_url, plan, seqs, speed, started, timeout, results):
+        super().__init__(daemon=True)
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.plan = plan
+        self.seqs = seqs
+        self.speed = speed
+        self.started = started
+        self.timeout = timeout
+        self.results = results
+        self.conn = None
+
+    def _send(self, method: str, path: str, body) -> tuple[int, bytes]:
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = (body if isinstance(body, str) else json.dumps(body)).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # Stale keep-alive connection: reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def run(self):
+        t0 = self.plan.records[0]["ts"]
+        for seq in self.seqs:
+            record = self.plan.records[seq]
+            if self.speed is not None:
+                due = self.started + (record["ts"] - t0) / self.speed
+                if due > time.perf_counter():
+                    time.sleep(due - time.perf_counter())
+            self.plan.wait_for(seq)
+            path, body = self.plan.rewrite(record)
+            if record["query"]:
+                path = f"{path}?{record['query']}"
+            clock = time.perf_counter()
+            try:
+                status, raw = self._send(record["method"], path, body)
+            except (http.client.HTTPException, OSError) as e:
+                status, raw = 0, str(e).encode()
+            latency_ms = (time.perf_counter() - clock) * 1000
+            self.plan.finish(seq, status, raw)
+            self.results.append((record, status, latency_ms))
+
+
+def replay(
+    records: list[dict],
+    base_url: str,
+    speed,
+    lanes: int,
+    timeout: float,
+    dependency_timeout: float,
+) -> tuple[list, float, Plan]:
+    plan = Plan(records, dependency_timeout)
+    by_lane = defaultdict(list)
+    for seq, record in enumerate(records):
+        by_lane[zlib.crc32(record["actor"].encode()) % lanes].append(seq)
+
+    results: list = []
+    started = time.perf_counter()
+    threads = [
+        Lane(base_url, plan, seqs, speed, started, timeout, results)
+        for seqs in by_lane.values()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started, plan
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return round(values[0], 2)
+    return round(statistics.quantiles(values, n=100, method="inclusive")[q - 1], 2)
+
+
+def report(results: list, elapsed: float, captured_seconds: float, plan: Plan) -> dict:
+    routes = defaultdict(list)
+    for record, status, latency_ms in results:
+        routes[route_of(record)].append((record, status, latency_ms))
+
+    per_route = {}
+    for route, rows in sorted(routes.items(), key=lambda item: -len(item[1])):
+        original = [r["duration_ms"] for r, _, _ in rows]
+        replayed = [latency for _, _, latency in rows]
+        mismatches = defaultdict(int)
+        for r, status, _ in rows:
+            if status != r["status"]:
+                mismatches[f"{r['status']}->{status}"] += 1
+        per_route[route] = {
+            "requests": len(rows),
+            "errors": {
+                "original": sum(1 for r, _, _ in rows if r["status"] >= 400),
+                "replay": sum(1 for _, s, _ in rows if s >= 400 or s == 0),
+            },
+            "status_mismatches": dict(mismatches),
+            **{
+                f"p{q}_ms": {
+                    "original": _percentile(original, q),
+                    "replay": _percentile(replayed, q),
+                }
+                for q in (50, 95, 99)
+            },
+        }
+    total = len(results)
+    return {
+        "requests": total,
+        "status_mismatches": sum(
+            sum(route["status_mismatches"].values()) for route in per_route.values()
+        ),
+        "captured_seconds": round(captured_seconds, 2),
+        "replay_seconds": round(elapsed, 2),
+        "replay_rps": round(total / elapsed, 1) if elapsed else None,
+        # Requests sent before the booking request they follow had finished
+        "ordering_timeouts": plan.late,
+        "routes": per_route,
+    }
+
+
+def _speed(value: str):
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0 or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay captured traffic against a running instance and compare "
+        "status codes and latency with the original responses."
+    )
+    parser.add_argument(
+        "captures", nargs="+", help="Capture files or directories (e.g. captures/)."
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--speed",
+        type=_speed,
+        default=1.0,
+        help="1 (as captured), N or Nx (N times faster), or 'max' (no waits).",
+    )
+    parser.add_argument(
+        "--lanes",
+        type=int,
+        default=32,
+        help="Concurrent connections; each actor always uses the same one.",
+    )
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--dependency-timeout",
+        type=float,
+        default=10,
+        help="Seconds a request waits for the previous request on its booking.",
+    )
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    records = load(args.captures)
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        parser.error("no captured requests found")
+    captured_seconds = records[-1]["ts"] - records[0]["ts"]
+
+    speed = "max" if args.speed is None else f"{args.speed:g}x"
+    print(
+        f"--- Replaying {len(records)} requests "
+        f"({captured_seconds:.1f}s captured) at {speed} ---"
+    )
+    results, elapsed, plan = replay(
+        records,
+        args.base_url,
+        args.speed,
+        args.lanes,
+        args.timeout,
+        args.dependency_timeout,
+    )
+    result = report(results, elapsed, captured_seconds, plan)
+    for route, stats in result["routes"].items():
+        print(route, stats)
+    print({key: value for key, value in result.items() if key != "routes"})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
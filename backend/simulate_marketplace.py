@@ -0,0 +1,744 @@
+import argparse
+import bisect
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Discrete-event simulation of the marketplace against a temporary database.
+#
+# Customers, providers, the dispatcher, an admin, the sweeper and the auditor
+# are agents on a simulated clock. Every action calls the real services
+# (booking_service, queue_service, sweeper_service, auditor_service) one at a
+# time, so a simulated day runs in seconds of wall time.
+#
+# - Customers arrive as a Poisson process shaped by a load curve and cancel
+#   bookings still waiting when their patience runs out.
+# - Providers answer an assignment after a random delay: accept, reject or
+#   never answer (no-show). Accepted jobs complete after a random service
+#   time, unless the provider abandons them.
+# - The dispatcher assigns the most urgent PENDING bookings from the dispatch
+#   queue to idle providers. The admin retries REJECTED/FAILED bookings up to
+#   --max-retries times, and (--force-assign-rate) force-assigns at random.
+# - The sweeper reclaims no-shows and abandoned jobs. Stored timestamps are
+#   wall-clock, so simulated cutoffs are translated to the wall-clock moment
+#   the simulation passed them.
+#
+# The simulator keeps its own model of every booking and checks the database
+# against it, on top of the auditor's invariants (double booking,
+# status/event mismatch, terminal booking holding a provider).
+
+LOAD_CURVES = {
+    "constant": lambda x: 1.0,
+    # 0 -> peak over the run: shows where the backlog starts to grow
+    "ramp": lambda x: x,
+    "spike": lambda x: 1.0 if 0.4 <= x < 0.6 else 0.25,
+    # One day squeezed into the run: quiet at both ends, peak in the middle
+    "diurnal": lambda x: 0.55 - 0.45 * math.cos(2 * math.pi * x),
+}
+
+
+def _configure(workdir: str, shard_count: int):
+    # Must run before any app import: settings are read at import time
+    os.chdir(workdir)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    for flag in ("SWEEPER_ENABLED", "AUDITOR_ENABLED", "ARCHIVER_ENABLED"):
+        os.environ[flag] = "0"
+    os.environ["INTAKE_ASYNC_ENABLED"] = "0"
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _utcnow() -> datetime:
+    # Timestamps are stored as naive UTC (see TimestampMixin)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _percentiles(values: list[float], scale: float = 1.0) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * scale, 3)
+        for p in (50, 90, 99)
+    }
+
+
+class SimBooking:
+    """
+    What the simulation expects the database to hold for one booking.
+    """
+
+    __slots__ = (
+        "customer_id",
+        "status",
+        "provider_id",
+        "created",
+        "changed",
+        "retries",
+        "assignment",
+    )
+
+    def __init__(self, customer_id: int, now: float):
+        self.customer_id = customer_id
+        self.status = "PENDING"
+        self.provider_id = None
+        self.created = now
+        # Simulated time of the last change to the row (what updated_at means)
+        self.changed = now
+        self.retries = 0
+        # Bumped on every assignment, so a late answer to an old one is recognized
+        self.assignment = 0
+
+
+class Simulation:
+    def __init__(self, args):
+        from fastapi import HTTPException
+
+        from app.core import config
+        from app.core.database import (
+            shard_for_booking,
+            shard_for_customer,
+            shard_session,
+        )
+        from app.models.booking_event import ActorRole
+        from app.schemas.booking import CreateBookingRequest
+        from app.services import (
+            auditor_service,
+            booking_service,
+            queue_service,
+            sweeper_service,
+        )
+
+        self.HTTPException = HTTPException
+        self.config = config
+        self.shard_for_booking = shard_for_booking
+        self.shard_for_customer = shard_for_customer
+        self.shard_session = shard_session
+        self.ActorRole = ActorRole
+        self.CreateBookingRequest = CreateBookingRequest
+        self.auditor_service = auditor_service
+        self.booking_service = booking_service
+        self.queue_service = queue_service
+        self.sweeper_service = sweeper_service
+
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.curve = LOAD_CURVES[args.curve]
+        self.duration = args.minutes * 60
+        self.now = 0.0
+        self._events = []
+        self._sequence = 0
+        # Wall-clock moment the simulation reached each simulated time
+        self._sim_times: list[float] = []
+        self._wall_times: list[datetime] = []
+
+        self.bookings: dict[int, SimBooking] = {}
+        self.held: dict[int, set[int]] = {}
+        self.idle_since: dict[int, float] = {}
+        self.retryable: set[int] = set()
+
+        self.latency = defaultdict(list)
+        self.outcomes = Counter()
+        self.waits: list[float] = []
+        self.samples: list[tuple] = []
+        self.arrivals: list[float] = []
+        self.completions: list[float] = []
+        self.violations = Counter()
+        self.examples: list[str] = []
+
+    # --- Event loop -------------------------------------------------------
+
+    def _at(self, when: float, handler, *args) -> None:
+        self._sequence += 1
+        heapq.heappush(self._events, (when, self._sequence, handler, args))
+
+    def _every(self, interval: float, handler) -> None:
+        def tick():
+            handler()
+            self._at(self.now + interval, tick)
+
+        self._at(interval, tick)
+
+    def run(self) -> dict:
+        self._seed_providers()
+        self._at(self._next_arrival(0.0), self._arrive)
+        self._every(self.args.dispatch_seconds, self._dispatch)
+        self._every(self.args.admin_seconds, self._admin)
+        self._every(self.config.SWEEPER_INTERVAL_SECONDS, self._sweep)
+        self._every(self.args.audit_seconds, self._audit)
+        self._every(self.args.sample_seconds, self._sample)
+
+        started = time.perf_counter()
+        while self._events and self._events[0][0] <= self.duration:
+            when, _, handler, args = heapq.heappop(self._events)
+            if when > self.now or not self._sim_times:
+                self._sim_times.append(when)
+                self._wall_times.append(_utcnow())
+            self.now = when
+            handler(*args)
+        self.now = self.duration
+        self._audit()
+        self._final_checks()
+        return self._report(time.perf_counter() - started)
+
+    def _wall_at(self, sim_time: float) -> datetime:
+        # Rows changed before `sim_time` were stamped before this moment
+        index = bisect.bisect_left(self._sim_times, sim_time)
+        return self._wall_times[min(index, len(self._wall_times) - 1)]
+
+    def _call(self, operation: str, shard: int, fn, *args):
+        """
+        Runs one service call in its own session. Returns (result, HTTPException).
+        """
+        started = time.perf_counter()
+        try:
+            with self.shard_session(shard) as db:
+                return fn(db, *args), None
+        except self.HTTPException as exc:
+            return None, exc
+        finally:
+            self.latency[operation].append(time.perf_counter() - started)
+
+    def _violation(self, kind: str, detail: str) -> None:
+        self.violations[kind] += 1
+        if len(self.examples) < 20:
+            self.examples.append(f"[{self.now / 60:.1f} min] {kind}: {detail}")
+
+    def _expect_ok(self, operation: str, booking_id: int, error) -> bool:
+        if error is None:
+            return True
+        self._violation(
+            "UNEXPECTED_REFUSAL",
+            f"{operation} on booking {booking_id}: {error.status_code} {error.detail}",
+        )
+        return False
+
+    # --- Providers --------------------------------------------------------
+
+    def _seed_providers(self) -> None:
+        from app.models.provider import Provider
+
+        with self.shard_session(0) as db:
+            for provider_id in range(1, self.args.providers + 1):
+                db.add(Provider(id=provider_id, name=f"Provider {provider_id}"))
+                self.held[provider_id] = set()
+                self.idle_since[provider_id] = 0.0
+            db.commit()
+
+    def _hold(self, provider_id: int, booking_id: int) -> None:
+        self.held[provider_id].add(booking_id)
+        self.idle_since.pop(provider_id, None)
+
+    def _release(self, booking: SimBooking, booking_id: int) -> None:
+        provider_id = booking.provider_id
+        booking.provider_id = None
+        if provider_id is None:
+            return
+        self.held[provider_id].discard(booking_id)
+        if not self.held[provider_id]:
+            self.idle_since[provider_id] = self.now
+
+    def _set(self, booking_id: int, status: str) -> SimBooking:
+        booking = self.bookings[booking_id]
+        booking.status = status
+        booking.changed = self.now
+        if status in ("REJECTED", "FAILED", "CANCELLED"):
+            self._release(booking, booking_id)
+        if status in ("REJECTED", "FAILED"):
+            self.retryable.add(booking_id)
+        else:
+            self.retryable.discard(booking_id)
+        return booking
+
+    # --- Customers --------------------------------------------------------
+
+    def _next_arrival(self, after: float) -> float:
+        # Thinning: candidates at the peak rate, kept with the curve's share
+        rate = self.args.rate / 60
+        when = after
+        while when <= self.duration:
+            when += self.rng.expovariate(rate)
+            if self.rng.random() < self.curve(when / self.duration):
+                return when
+        return when
+
+    def _arrive(self) -> None:
+        self._at(self._next_arrival(self.now), self._arrive)
+        self.arrivals.append(self.now)
+        customer_id = self.rng.randint(1, self.args.customers)
+        request = self.CreateBookingRequest(
+            customer_name=f"Customer {customer_id}",
+            actor_role=self.ActorRole.CUSTOMER,
+            actor_id=customer_id,
+        )
+        booking, error = self._call(
+            "create",
+            self.shard_for_customer(customer_id),
+            self.booking_service.create_booking,
+            request,
+        )
+        if not self._expect_ok("create", None, error):
+            return
+        self.bookings[booking.id] = SimBooking(customer_id, self.now)
+        self.outcomes["created"] += 1
+        patience = self.rng.expovariate(1 / (self.args.patience_minutes * 60))
+        self._at(self.now + patience, self._give_up, booking.id)
+
+    def _give_up(self, booking_id: int) -> None:
+        booking = self.bookings[booking_id]
+        if booking.status not in ("PENDING", "ASSIGNED"):
+            return
+        _, error = self._call(
+            "cancel",
+            self.shard_for_booking(booking_id),
+            self.booking_service.cancel_booking_by_customer,
+            booking_id,
+            booking.customer_id,
+        )
+        if self._expect_ok("cancel", booking_id, error):
+            self._set(booking_id, "CANCELLED")
+            self.outcomes["customer_cancelled"] += 1
+
+    # --- Dispatcher & providers -------------------------------------------
+
+    def _dispatch(self) -> None:
+        idle = sorted(self.idle_since, key=self.idle_since.get)
+        if not idle:
+            return
+        started = time.perf_counter()
+        upcoming = self.queue_service.get_next_bookings(len(idle))
+        self.latency["queue"].append(time.perf_counter() - started)
+        for entry, provider_id in zip(upcoming, idle):
+            booking_id = entry["booking_id"]
+            booking = self.bookings.get(booking_id)
+            if booking is None or booking.status != "PENDING":
+                self._violation(
+                    "QUEUE_STALE",
+                    f"queue offered booking {booking_id} "
+                    f"({booking.status if booking else 'unknown'})",
+                )
+                continue
+            _, error = self._call(
+                "assign",
+                self.shard_for_booking(booking_id),
+                self.booking_service.assign_provider,
+                booking_id,
+                provider_id,
+                self.ActorRole.SYSTEM,
+            )
+            if self._expect_ok("assign", booking_id, error):
+                self._assigned(booking_id, provider_id)
+
+    def _assigned(self, booking_id: int, provider_id: int) -> None:
+        booking = self._set(booking_id, "ASSIGNED")
+        booking.provider_id = provider_id
+        booking.assignment += 1
+        self._hold(provider_id, booking_id)
+        roll = self.rng.random()
+        if roll < self.args.accept:
+            answer = self._accept
+        elif roll < self.args.accept + self.args.reject:
+            answer = self._reject
+        else:
+            self.outcomes["no_shows"] += 1
+            return
+        delay = self.rng.expovariate(1 / self.args.response_seconds)
+        self._at(self.now + delay, answer, booking_id, provider_id, booking.assignment)
+
+    def _provider_action(
+        self, operation: str, booking_id: int, provider_id: int, assignment: int
+    ) -> bool:
+        """
+        Runs a provider's accept/reject/complete. Returns whether it applied.
+        A late one (the booking was swept, cancelled or reassigned since) must
+        be refused by the service.
+        """
+        booking = self.bookings[booking_id]
+        status = "IN_PROGRESS" if operation == "complete" else "ASSIGNED"
+        current = booking.status == status and booking.provider_id == provider_id
+        if current and booking.assignment != assignment:
+            # Reassigned to the same provider: this answer is for the old assignment
+            return False
+        fn = {
+            "accept": self.booking_service.provider_accept_booking,
+            "reject": self.booking_service.provider_reject_booking,
+            "complete": self.booking_service.complete_booking,
+        }[operation]
+        _, error = self._call(
+            operation, self.shard_for_booking(booking_id), fn, booking_id, provider_id
+        )
+        if current:
+            return self._expect_ok(operation, booking_id, error)
+        if error is None:
+            self._violation(
+                "STALE_ACTION_ACCEPTED",
+                f"late {operation} by provider {provider_id} on booking {booking_id} "
+                f"({booking.status})",
+            )
+        else:
+            self.outcomes["late_actions_refused"] += 1
+        return False
+
+    def _accept(self, booking_id: int, provider_id: int, assignment: int) -> None:
+        if not self._provider_action("accept", booking_id, provider_id, assignment):
+            return
+        booking = self._set(booking_id, "IN_PROGRESS")
+        self.waits.append(self.now - booking.created)
+        if self.rng.random() < self.args.abandon:
+            self.outcomes["abandoned_jobs"] += 1
+            return
+        service = self.rng.expovariate(1 / (self.args.service_minutes * 60))
+        self._at(
+            self.now + service, self._complete, booking_id, provider_id, assignment
+        )
+
+    def _reject(self, booking_id: int, provider_id: int, assignment: int) -> None:
+        if self._provider_action("reject", booking_id, provider_id, assignment):
+            self._set(booking_id, "REJECTED")
+            self.outcomes["provider_rejections"] += 1
+
+    def _complete(self, booking_id: int, provider_id: int, assignment: int) -> None:
+        if not self._provider_action("complete", booking_id, provider_id, assignment):
+            return
+        self._set(booking_id, "COMPLETED")
+        # COMPLETED keeps its provider as a record; the provider is free again
+        self.held[provider_id].discard(booking_id)
+        if not self.held[provider_id]:
+            self.idle_since[provider_id] = self.now
+        self.completions.append(self.now)
+
+    # --- Admin ------------------------------------------------------------
+
+    def _admin(self) -> None:
+        for booking_id in sorted(self.retryable):
+            booking = self.bookings[booking_id]
+            if booking.retries >= self.args.max_retries:
+                continue
+            _, error = self._call(
+                "retry",
+                self.shard_for_booking(booking_id),
+                self.booking_service.retry_booking,
+                booking_id,
+                self.ActorRole.ADMIN,
+                1,
+            )
+            if self._expect_ok("retry", booking_id, error):
+                booking.retries += 1
+                self._set(booking_id, "PENDING")
+                self.outcomes["admin_retries"] += 1
+        self.retryable = {
+            booking_id
+            for booking_id in self.retryable
+            if self.bookings[booking_id].retries < self.args.max_retries
+        }
+
+        if self.rng.random() < self.args.force_assign_rate:
+            pending = [i for i, b in self.bookings.items() if b.status == "PENDING"]
+            if pending:
+                booking_id = self.rng.choice(pending)
+                provider_id = self.rng.randint(1, self.args.providers)
+                _, error = self._call(
+                    "force_assign",
+                    self.shard_for_booking(booking_id),
+                    self.booking_service.admin_force_assign,
+                    booking_id,
+                    provider_id,
+                    1,
+                )
+                if self._expect_ok("force_assign", booking_id, error):
+                    self.outcomes["force_assigns"] += 1
+                    self._assigned(booking_id, provider_id)
+
+    # --- Sweeper & auditor ------------------------------------------------
+
+    def _sweep(self) -> None:
+        cutoffs = {
+            "ASSIGNED": self.now - self.config.ASSIGNED_TIMEOUT_SECONDS,
+            "IN_PROGRESS": self.now - self.config.IN_PROGRESS_TIMEOUT_SECONDS,
+        }
+        expected = {
+            booking_id: booking.status
+            for booking_id, booking in self.bookings.items()
+            if booking.status in cutoffs and booking.changed < cutoffs[booking.status]
+        }
+        swept = 0
+        for shard in range(self.args.shards):
+            result, _ = self._call(
+                "sweep",
+                shard,
+                self.sweeper_service.sweep_stale_bookings,
+                None,
+                self._wall_at(cutoffs["ASSIGNED"]),
+                self._wall_at(cutoffs["IN_PROGRESS"]),
+            )
+            swept += result["assigned"] + result["in_progress"]
+        if swept != len(expected):
+            self._violation(
+                "SWEEPER_MISMATCH", f"swept {swept} bookings, expected {len(expected)}"
+            )
+        swept_to = {
+            "ASSIGNED": "PENDING" if self.config.SWEEPER_AUTO_RETRY else "REJECTED",
+            "IN_PROGRESS": "FAILED",
+        }
+        for booking_id, status in self._statuses(list(expected)).items():
+            previous = expected[booking_id]
+            if status != swept_to[previous]:
+                self._violation(
+                    "SWEEPER_MISMATCH",
+                    f"booking {booking_id} went {previous} -> {status}, "
+                    f"expected {swept_to[previous]}",
+                )
+            self._release(self._set(booking_id, status), booking_id)
+            self.outcomes[
+                "swept_no_shows" if previous == "ASSIGNED" else "swept_abandoned"
+            ] += 1
+
+    def _statuses(self, booking_ids: list[int]) -> dict[int, str]:
+        from sqlalchemy import select
+
+        from app.models.booking import Booking
+
+        by_shard = defaultdict(list)
+        for booking_id in booking_ids:
+            by_shard[self.shard_for_booking(booking_id)].append(booking_id)
+        statuses = {}
+        for shard, ids in by_shard.items():
+            with self.shard_session(shard) as db:
+                rows = db.execute(
+                    select(Booking.id, Booking.status).where(Booking.id.in_(ids))
+                ).all()
+            statuses.update({booking_id: status.value for booking_id, status in rows})
+        return statuses
+
+    def _audit(self) -> None:
+        for shard in range(self.args.shards):
+            self._call("audit", shard, self.auditor_service.audit_incremental)
+
+    def _sample(self) -> None:
+        pending = sum(1 for b in self.bookings.values() if b.status == "PENDING")
+        busy = sum(1 for held in self.held.values() if held)
+        working = len(
+            {b.provider_id for b in self.bookings.values() if b.status == "IN_PROGRESS"}
+        )
+        self.samples.append((self.now, pending, busy, working))
+        depth = self.queue_service.get_queue_stats()["depth"]
+        if depth != pending:
+            self._violation(
+                "QUEUE_DEPTH_MISMATCH",
+                f"queue holds {depth} bookings, {pending} are PENDING",
+            )
+
+    # --- Results ----------------------------------------------------------
+
+    def _final_checks(self) -> None:
+        """
+        Every booking matches the model and its booking_summary row; every
+        violation the auditor recorded during the run is reported.
+        """
+        from sqlalchemy import or_, select
+
+        from app.models.booking import Booking
+        from app.models.booking_summary import BookingSummary
+
+        for shard in range(self.args.shards):
+            with self.shard_session(shard) as db:
+                rows = db.execute(
+                    select(Booking.id, Booking.status, Booking.provider_id)
+                ).all()
+                stale_summaries = []
+                if self.config.BOOKING_SUMMARY_ENABLED:
+                    stale_summaries = db.execute(
+                        select(Booking.id)
+                        .outerjoin(
+                            BookingSummary, BookingSummary.booking_id == Booking.id
+                        )
+                        .where(
+                            or_(
+                                BookingSummary.booking_id.is_(None),
+                                BookingSummary.status != Booking.status,
+                            )
+                        )
+                    ).scalars().all()
+            for booking_id, status, provider_id in rows:
+                booking = self.bookings.get(booking_id)
+                if booking is None:
+                    self._violation("UNKNOWN_BOOKING", f"booking {booking_id}")
+                elif (status.value, provider_id) != (booking.status, booking.provider_id):
+                    self._violation(
+                        "MODEL_MISMATCH",
+                        f"booking {booking_id} is {status.value} with provider "
+                        f"{provider_id}, expected {booking.status} with provider "
+                        f"{booking.provider_id}",
+                    )
+            for booking_id in stale_summaries:
+                self._violation("SUMMARY_MISMATCH", f"booking {booking_id}")
+
+        for violation in self.auditor_service.list_violations_all_shards(
+            include_resolved=True, limit=1_000_000
+        ):
+            self._violation(violation.kind.value, violation.detail)
+
+    def _timeline(self) -> list[dict]:
+        width = self.duration / self.args.buckets
+        per_minute = 60 / width
+        rows = []
+        for bucket in range(self.args.buckets):
+            start, end = bucket * width, (bucket + 1) * width
+            samples = [s for s in self.samples if start < s[0] <= end]
+            arrivals = sum(1 for t in self.arrivals if start <= t < end)
+            completed = sum(1 for t in self.completions if start <= t < end)
+            rows.append(
+                {
+                    "minute": round(end / 60, 1),
+                    "arrivals_per_minute": round(arrivals * per_minute, 2),
+                    "completed_per_minute": round(completed * per_minute, 2),
+                    "backlog": samples[-1][1] if samples else 0,
+                    "busy": self._utilization(samples, 2),
+                    "working": self._utilization(samples, 3),
+                }
+            )
+        return rows
+
+    def _utilization(self, samples: list[tuple], column: int) -> float:
+        if not samples:
+            return 0.0
+        return round(sum(s[column] for s in samples) / len(samples) / self.args.providers, 3)
+
+    def _report(self, elapsed: float) -> dict:
+        timeline = self._timeline()
+        # Saturated: providers (nearly) all busy while the backlog keeps growing
+        saturated_at = None
+        previous_backlog = 0
+        for row in timeline:
+            if row["busy"] >= 0.95 and row["backlog"] > previous_backlog:
+                saturated_at = row["minute"]
+                break
+            previous_backlog = row["backlog"]
+        backlog = [s[1] for s in self.samples] or [0]
+        calls = sum(len(values) for values in self.latency.values())
+        return {
+            "curve": self.args.curve,
+            "peak_per_minute": self.args.rate,
+            "providers": self.args.providers,
+            "simulated_minutes": self.args.minutes,
+            "wall_seconds": round(elapsed, 2),
+            "speedup": round(self.duration / elapsed, 1),
+            "service_calls_per_second": round(calls / elapsed, 1),
+            "bookings": {
+                "created": len(self.bookings),
+                **Counter(b.status for b in self.bookings.values()),
+            },
+            "outcomes": dict(self.outcomes),
+            "completed_per_minute": round(len(self.completions) / self.args.minutes, 2),
+            "peak_completed_per_minute": max(r["completed_per_minute"] for r in timeline),
+            "backlog": {
+                "max": max(backlog),
+                "mean": round(sum(backlog) / len(backlog), 1),
+                "final": backlog[-1],
+            },
+            "utilization": {
+                "busy": self._utilization(self.samples, 2),
+                "working": self._utilization(self.samples, 3),
+            },
+            "saturated_at_minute": saturated_at,
+            "seconds_to_accept": _percentiles(self.waits),
+            "latency_ms": {
+                operation: {"count": len(values), **_percentiles(values, 1000)}
+                for operation, values in sorted(self.latency.items())
+            },
+            "violations": dict(self.violations),
+            "violation_examples": self.examples,
+            "timeline": timeline,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate customers, providers and admins against the real booking "
+        "services on a temporary database, faster than real time."
+    )
+    parser.add_argument("--minutes", type=float, default=240, help="Simulated run length.")
+    parser.add_argument("--curve", choices=sorted(LOAD_CURVES), default="ramp")
+    parser.add_argument("--rate", type=float, default=8, help="Peak bookings per minute.")
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--service-minutes", type=float, default=8, help="Mean job length.")
+    parser.add_argument(
+        "--response-seconds",
+        type=float,
+        default=45,
+        help="Mean delay before a provider answers an assignment.",
+    )
+    parser.add_argument("--accept", type=float, default=0.8, help="Share accepted.")
+    parser.add_argument(
+        "--reject", type=float, default=0.12, help="Share rejected; the rest never answer."
+    )
+    parser.add_argument(
+        "--abandon", type=float, default=0.01, help="Share of accepted jobs never completed."
+    )
+    parser.add_argument(
+        "--patience-minutes",
+        type=float,
+        default=30,
+        help="Mean wait before a customer cancels an unaccepted booking.",
+    )
+    parser.add_argument("--max-retries", type=int, default=3, help="Admin retries per booking.")
+    parser.add_argument(
+        "--force-assign-rate",
+        type=float,
+        default=0.0,
+        help="Chance per admin pass of force-assigning a booking to a random provider.",
+    )
+    parser.add_argument("--dispatch-seconds", type=float, default=5)
+    parser.add_argument("--admin-seconds", type=float, default=60)
+    parser.add_argument("--audit-seconds", type=float, default=300)
+    parser.add_argument("--sample-seconds", type=float, default=30)
+    parser.add_argument("--buckets", type=int, default=12, help="Timeline rows.")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+    if args.accept + args.reject > 1:
+        parser.error("--accept + --reject must be at most 1")
+    json_path = args.json and os.path.abspath(args.json)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure(workdir, args.shards)
+        import app.main  # noqa: F401  (creates every shard's schema)
+
+        print(
+            f"--- Simulating {args.minutes:g} min of {args.curve} load up to "
+            f"{args.rate:g}/min with {args.providers} providers ---"
+        )
+        result = Simulation(args).run()
+        os.chdir(BACKEND_DIR)
+
+    for row in result["timeline"]:
+        print(row)
+    print(
+        {
+            key: value
+            for key, value in result.items()
+            if key not in ("timeline", "violation_examples")
+        }
+    )
+    for example in result["violation_examples"]:
+        print(example)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(result, f, indent=2)
+    # Non-zero exit on any violation, so a run can gate CI
+    if result["violations"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import pytest
+
+# Read by app.core.config on import, so set before any test module loads
+os.environ.update(
+    {
+        "ADMISSION_ENABLED": "0",
+        "OUTBOX_ENABLED": "1",
+        "SWEEPER_ENABLED": "0",
+        "AUDITOR_ENABLED": "0",
+        "ARCHIVER_ENABLED": "0",
+        "PROVIDER_STATS_ENABLED": "0",
+    }
+)
+
+
+def pytest_sessionstart(session):
+    # The app creates its SQLite files (and journals, captures) relative to the
+    # working directory: give the test session its own, before anything connects
+    os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_provider():
+    """
+    Creates providers with the given IDs. Tests use their own ID ranges, as
+    the database is shared by the whole session.
+    """
+    from app.core.database import SessionLocal
+    from app.models.provider import Provider
+
+    def make(*provider_ids: int) -> None:
+        with SessionLocal() as db:
+            for provider_id in provider_ids:
+                db.add(Provider(id=provider_id, name=f"Provider {provider_id}"))
+            db.commit()
+
+    return make
@@ -0,0 +1,19 @@
+def create_booking(client, customer_id: int, **fields) -> int:
+    response = client.post(
+        "/bookings/",
+        json={
+            "customer_name": f"Customer {customer_id}",
+            "actor_role": "CUSTOMER",
+            "actor_id": customer_id,
+            **fields,
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def assign(client, booking_id: int, provider_id: int):
+    return client.post(
+        f"/bookings/{booking_id}/assign",
+        json={"provider_id": provider_id, "actor_role": "ADMIN", "actor_id": 0},
+    )
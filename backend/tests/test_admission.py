@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from app.core import config
+from app.core.admission import AdmissionMiddleware, actor_key
+
+
+async def _ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """
+    A bare app behind AdmissionMiddleware, with small buckets: 2 reads and
+    5 SYSTEM calls, neither refilled during the test.
+    """
+    monkeypatch.setattr(config, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(config, "RATE_LIMIT_READ_PER_SECOND", 0.001)
+    monkeypatch.setattr(config, "RATE_LIMIT_READ_BURST", 2)
+    monkeypatch.setattr(config, "RATE_LIMIT_SYSTEM_PER_SECOND", 0.001)
+    monkeypatch.setattr(config, "RATE_LIMIT_SYSTEM_BURST", 5)
+    return TestClient(AdmissionMiddleware(_ok))
+
+
+def _statuses(client, path: str, count: int, **params) -> list[int]:
+    return [client.get(path, params=params).status_code for _ in range(count)]
+
+
+def test_actor_key():
+    scope = {"client": ("10.0.0.1", 5000), "query_string": b""}
+
+    def key(query: bytes = b"", body: bytes = b""):
+        return actor_key({**scope, "query_string": query}, body)
+
+    assert key(b"actor_role=CUSTOMER&actor_id=7") == ("CUSTOMER", "7")
+    assert key(body=b'{"actor_role": "PROVIDER", "actor_id": 3}') == ("PROVIDER", "3")
+    # Anonymous and SYSTEM callers are keyed by address, never skipped
+    assert key(b"actor_role=CUSTOMER") == ("client", "10.0.0.1")
+    assert key() == ("client", "10.0.0.1")
+    assert key(b"actor_role=SYSTEM") == ("SYSTEM", "10.0.0.1")
+    assert key(body=b'{"actor_role": "SYSTEM", "actor_id": 1}') == ("SYSTEM", "10.0.0.1")
+
+
+def test_system_calls_get_their_own_larger_bucket(limited):
+    assert _statuses(limited, "/providers/1/bookings", 5, actor_role="SYSTEM") == [200] * 5
+    # A client cannot bypass the limiter by claiming to be SYSTEM
+    assert _statuses(limited, "/providers/1/bookings", 1, actor_role="SYSTEM") == [429]
+    assert _statuses(limited, "/admin/providers", 1, actor_role="SYSTEM") == [429]
+    # Customers keep the read bucket
+    assert _statuses(
+        limited, "/providers/1/bookings", 3, actor_role="CUSTOMER", actor_id=1
+    ) == [200, 200, 429]
+
+
+def test_anonymous_calls_share_one_bucket_per_address(limited):
+    assert _statuses(limited, "/bookings/1", 1) == [200]
+    assert _statuses(limited, "/bookings/2", 1, actor_role="CUSTOMER") == [200]
+    response = limited.get("/bookings/3")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
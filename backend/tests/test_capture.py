@@ -0,0 +1,41 @@
+import gzip
+import json
+
+import pytest
+
+from app.core import config
+from app.core.admission import actor_key
+from app.core.capture import CaptureWriter
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CAPTURE_DIR", str(tmp_path))
+    return CaptureWriter()
+
+
+def _entry(path: str, actor) -> tuple:
+    return ("GET", path, "", b"", actor, 1700000000.0, 0.002, 200, b"")
+
+
+def _captured(writer: CaptureWriter) -> list[dict]:
+    with gzip.open(writer._path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_flush_records_system_actors(writer):
+    system = actor_key({"client": ("10.0.0.1", 1), "query_string": b"actor_role=SYSTEM"}, b"")
+    writer.add(_entry("/admin/queue/next", system))
+
+    assert writer.flush() == 1
+    assert [r["actor"] for r in _captured(writer)] == ["SYSTEM:10.0.0.1"]
+
+
+def test_bad_record_does_not_drop_the_batch(writer):
+    writer.add(_entry("/bookings/1", ("CUSTOMER", "1")))
+    writer.add(_entry("/bookings/2", None))  # Cannot be encoded
+    writer.add(_entry("/bookings/3", ("CUSTOMER", "3")))
+
+    assert writer.flush() == 2
+    assert [r["path"] for r in _captured(writer)] == ["/bookings/1", "/bookings/3"]
+    assert writer.flush() == 0
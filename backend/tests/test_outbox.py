@@ -0,0 +1,101 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import delete
+
+import webhook_stub
+from app.core import config
+from app.core.database import SessionLocal
+from app.models.outbox_message import OutboxMessage
+from app.services import outbox_service
+from tests.helpers import create_booking
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    webhook_stub.py on a free port, with the outbox pointed at it and emptied.
+    `stub(fail_rate)` starts it; `stub.stats()` returns its counters.
+    """
+    servers = []
+
+    def start(fail_rate: float = 0.0) -> None:
+        webhook_stub._seen.clear()
+        webhook_stub._stats.update(received=0, duplicates=0, failed=0)
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), webhook_stub.make_handler(fail_rate, 0.0, True)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(
+            config, "WEBHOOK_TARGETS", [f"http://127.0.0.1:{server.server_port}/hook"]
+        )
+
+    start.stats = lambda: {**webhook_stub._stats, "unique": len(webhook_stub._seen)}
+    with SessionLocal() as db:
+        db.execute(delete(OutboxMessage))
+        db.commit()
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _outbox_stats() -> dict:
+    with SessionLocal() as db:
+        return outbox_service.outbox_stats(db)
+
+
+def test_delivers_every_event(client, stub):
+    stub()
+    for customer_id in range(1001, 1006):
+        create_booking(client, customer_id)
+
+    [result] = outbox_service.run_dispatcher()
+
+    assert result["delivered"] == 5
+    assert stub.stats()["unique"] == 5
+    assert _outbox_stats()["pending"] == 0
+
+
+def test_redelivers_after_a_crash_before_recording(client, stub, monkeypatch):
+    # Delivered, but the dispatcher dies before deleting the messages: once the
+    # lease runs out they are sent again (at-least-once), with the same IDs.
+    stub()
+    for customer_id in range(1011, 1014):
+        create_booking(client, customer_id)
+    monkeypatch.setattr(config, "OUTBOX_LEASE_SECONDS", 0)
+    with SessionLocal() as db:
+        claimed = outbox_service._claim_batch(db, outbox_service._utcnow())
+    for row in claimed:
+        assert outbox_service._deliver(row.id, row.payload) is None
+
+    [result] = outbox_service.run_dispatcher()
+
+    assert result["delivered"] == 3
+    assert stub.stats() == {"received": 6, "duplicates": 3, "failed": 0, "unique": 3}
+    assert _outbox_stats()["pending"] == 0
+
+
+def test_retries_then_dead_letters_and_requeues(client, stub, monkeypatch):
+    monkeypatch.setattr(config, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(config, "OUTBOX_BACKOFF_BASE_SECONDS", 0)
+    stub(fail_rate=1.0)
+    for customer_id in range(1021, 1023):
+        create_booking(client, customer_id)
+
+    results = [outbox_service.run_dispatcher()[0] for _ in range(3)]
+
+    assert [r["retried"] for r in results] == [2, 2, 0]
+    assert results[-1]["dead"] == 2
+    assert _outbox_stats()["dead"] == 2
+    assert stub.stats()["failed"] == 6
+
+    # Nothing is due once dead-lettered, until an operator requeues
+    assert outbox_service.run_dispatcher()[0]["delivered"] == 0
+    stub(fail_rate=0.0)
+    with SessionLocal() as db:
+        assert outbox_service.requeue_dead(db) == 2
+    assert outbox_service.run_dispatcher()[0]["delivered"] == 2
+    assert _outbox_stats() == {"pending": 0, "dead": 0, "lag_seconds": 0}
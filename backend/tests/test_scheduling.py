@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.helpers import assign, create_booking
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _scheduled(client, customer_id: int, start: datetime, end: datetime) -> int:
+    return create_booking(
+        client,
+        customer_id,
+        scheduled_start=start.isoformat(),
+        scheduled_end=end.isoformat(),
+    )
+
+
+def test_scheduled_window_soon_after_accepted_immediate_job(client, make_provider):
+    make_provider(3001)
+    immediate = create_booking(client, 3001)
+    assert assign(client, immediate, 3001).status_code == 200
+    accepted = client.post(
+        f"/bookings/{immediate}/accept", json={"actor_role": "PROVIDER", "actor_id": 3001}
+    )
+    assert accepted.status_code == 200
+
+    soon = _scheduled(client, 3002, _now() + timedelta(minutes=5), _now() + timedelta(hours=1))
+    response = assign(client, soon, 3001)
+    assert response.status_code == 403, response.text
+
+    # Beyond IMMEDIATE_BOOKING_HOLD_SECONDS the window is still free
+    later = _scheduled(client, 3003, _now() + timedelta(hours=3), _now() + timedelta(hours=4))
+    assert assign(client, later, 3001).status_code == 200
+
+
+def test_immediate_job_during_reserved_window(client, make_provider):
+    make_provider(3011, 3012)
+    window = _scheduled(
+        client, 3011, _now() - timedelta(minutes=10), _now() + timedelta(hours=1)
+    )
+    assert assign(client, window, 3011).status_code == 200
+
+    immediate = create_booking(client, 3012)
+    response = assign(client, immediate, 3011)
+    assert response.status_code == 403, response.text
+    assert assign(client, immediate, 3012).status_code == 200
@@ -0,0 +1,82 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local webhook receiver for the outbox dispatcher.
+# Point the API at it with WEBHOOK_TARGETS=http://127.0.0.1:8900/hook
+
+_lock = threading.Lock()
+_seen: set[str] = set()
+_stats = {"received": 0, "duplicates": 0, "failed": 0}
+
+
+def make_handler(fail_rate: float, delay: float, quiet: bool):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if delay:
+                time.sleep(delay)
+            if random.random() < fail_rate:
+                with _lock:
+                    _stats["failed"] += 1
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            message_id = self.headers.get("X-Outbox-Message-Id", "")
+            with _lock:
+                _stats["received"] += 1
+                duplicate = message_id in _seen
+                _seen.add(message_id)
+                if duplicate:
+                    _stats["duplicates"] += 1
+            if not quiet:
+                event = json.loads(body)
+                print(
+                    f"📨 booking {event['booking_id']}: "
+                    f"{event['from_status']} -> {event['to_status']}"
+                    f"{' (duplicate)' if duplicate else ''}"
+                )
+            self.send_response(204)
+            self.end_headers()
+
+        def do_GET(self):
+            # Delivery counters, for checking at-least-once behaviour
+            with _lock:
+                body = json.dumps({**_stats, "unique": len(_seen)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return WebhookHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub webhook target.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="Fraction of requests answered 503"
+    )
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(args.fail_rate, args.delay, args.quiet)
+    )
+    print(f"✅ Webhook stub listening on http://127.0.0.1:{args.port}/hook")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{_stats} unique={len(_seen)}")
+
+
+if __name__ == "__main__":
+    main()